@@ -1,15 +1,31 @@
 import streamlit as st
 import pandas as pd
+import html
 import io
-import unicodedata
-import re
-import math
 import requests
 import logging
 import time
+from contextlib import contextmanager
+from dataclasses import replace
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from typing import List, Dict, Optional
+from typing import List, Optional
+
+from filtro_rotas import hash_conteudo, obter_manifesto, poi
+from filtro_rotas.armazem import ARMAZEM, SESSAO, pegada_sessao
+from filtro_rotas.circuit import (MODO_ADJACENTE, MODO_ESPACIAL, gerar_planilha_otimizada_circuit_pro, guardar_resultado,
+                                  resultado_guardado)
+from filtro_rotas.esquema import inferir_esquema
+from filtro_rotas.exportacao import (FORMATOS, conteudo_exportacao, exportacoes_prontas, exportar, gerar_zip_gaiolas,
+                                     nome_arquivo_gaiola)
+from filtro_rotas.instrumentacao import coletar, coletor_ativo, tabela_medicoes
+from filtro_rotas.lote import resumir_gaiolas, tabela_resumo
+from filtro_rotas.normalizacao import limpar_string
+from filtro_rotas.radar import MINIMO_PACOTES_RADAR, rastrear_gaiolas
+from filtro_rotas.revisao import aproveitar_resultados, comparar_manifestos, e_revisao
+from filtro_rotas.rota import ErroProcessamento, dataframe_rota_gaiola, processar_rota_gaiola, rota_em_cache
+from filtro_rotas.tarefas import ExecutorTarefas, Tarefa
+from filtro_rotas.visualizacao import tabela_paginada
 
 # --- LOGGING ---
 logger = logging.getLogger("filtro_rotas")
@@ -44,26 +60,10 @@ st.set_page_config(
 )
 
 # --- CONSTANTES ---
-TERMOS_COMERCIAIS = [
-    'LOJA', 'MERCADO', 'MERCEARIA', 'FARMACIA', 'DROGARIA', 'SHOPPING',
-    'CLINICA', 'HOSPITAL', 'POSTO', 'OFICINA', 'RESTAURANTE', 'LANCHONETE',
-    'PADARIA', 'PANIFICADORA', 'ACADEMIA', 'ESCOLA', 'COLEGIO', 'FACULDADE',
-    'IGREJA', 'TEMPLO', 'EMPRESA', 'LTDA', 'MEI', 'SALA', 'SALAO', 'BARBEARIA',
-    'ESTACIONAMENTO', 'HOTEL', 'SUPERMERCADO', 'AMC', 'ATACADO', 'DISTRIBUIDORA',
-    'AUTOPECAS', 'VIDRAÇARIA', 'LABORATORIO', 'CLUBE', 'ASSOCIACAO', 'BOUTIQUE',
-    'MERCANTIL', 'DEPARTAMENTO', 'VARIEDADES', 'PIZZARIA', 'CHURRASCARIA',
-    'CARNES', 'PEIXARIA', 'FRUTARIA', 'HORTIFRUTI', 'FLORICULTURA'
-]
-TERMOS_ANULADORES = [
-        'FRENTE', 'LADO', 'PROXIMO', 'VIZINHO', 'DEFRONTE', 'ATRAS', 'DEPOIS', 'PERTO', 'VIZINHA',
-        'AO LADO', 'EM FRENTE', 'OPPOSTO', 'PRÓXIMO A', 'PERTO DE', 'AO LADO DE', 'DE FRENTE PARA',
-        'DE FRENTE A', 'DE FRENTE', 'EM FRENTE A', 'EM FRENTE PARA', 'OPPOSTO A', 'OPPOSTO DE',
-        'PRÓXIMO DE', 'VIZINHO A', 'VIZINHO DE', 'DEPOIS DE', 'DEPOIS A', 'ATRÁS DE', 'ATRÁS A',
-        'PROX. A', 'PROX. DE', 'AO LADO A', 'PROX', 'PROX.', 'PRÓX', 'PRÓX.', 'PERTO A'
-]
-
 # Limite de upload (bytes)
 MAX_UPLOAD_BYTES = 20 * 1024 * 1024  # 20 MB
+# Intervalo entre reruns enquanto há tarefa em segundo plano (s)
+INTERVALO_TAREFAS_S = 0.5
 
 # --- SISTEMA DE DESIGN (CSS) ---
 st.markdown("""
@@ -144,628 +144,573 @@ st.markdown("""
 st.markdown('<div class="header-container"><h1 class="main-title">Filtro de Rotas e Paradas</h1></div>', unsafe_allow_html=True)
 
 # --- INICIALIZAÇÃO DA SESSÃO ---
-if 'dados_prontos' not in st.session_state: st.session_state.dados_prontos = None
-if 'df_visual_tab1' not in st.session_state: st.session_state.df_visual_tab1 = None
+# Verdadeiro enquanto o script inteiro roda; no fim dele volta a False, e é esse valor que as
+# abas (fragmentos) enxergam quando reexecutam sozinhas
+st.session_state.execucao_completa = True
+if 'gaiola_tab1' not in st.session_state: st.session_state.gaiola_tab1 = None
 if 'modo_atual' not in st.session_state: st.session_state.modo_atual = 'unica'
 if 'resultado_multiplas' not in st.session_state: st.session_state.resultado_multiplas = None
-if 'df_cache' not in st.session_state: st.session_state.df_cache = None
-if 'planilhas_sessao' not in st.session_state: st.session_state.planilhas_sessao = {}
-if 'up_padrao_bytes' not in st.session_state: st.session_state.up_padrao_bytes = None
-
-# --- FUNÇÕES AUXILIARES (GERAIS) ---
-@st.cache_data
-def remover_acentos(texto: str) -> str:
-    return "".join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn').upper()
-
-@st.cache_data
-def limpar_string(s: str) -> str:
-    return "".join(filter(str.isalnum, str(s))).upper()
-
-def extrair_base_endereco(endereco_completo: str) -> str:
-    partes = str(endereco_completo).split(',')
-    base = partes[0].strip() + " " + partes[1].strip() if len(partes) >= 2 else partes[0].strip()
-    return limpar_string(base)
-
-def identificar_comercio(endereco: str) -> str:
-    end_limpo = remover_acentos(endereco)
-    for parte in end_limpo.split(','):
-        palavras = parte.split()
-        for i, palavra in enumerate(palavras):
-            p_limpa = "".join(filter(str.isalnum, palavra))
-            if any(termo == p_limpa for termo in TERMOS_COMERCIAIS):
-                if not any(anul in " ".join(palavras[:i]) for anul in TERMOS_ANULADORES):
-                    return "🏪 Comércio"
-    return "🏠 Residencial"
-
-def processar_gaiola_unica(df_raw: pd.DataFrame, gaiola_alvo: str, col_gaiola_idx: int) -> Optional[Dict]:
-    try:
-        target_limpo = limpar_string(gaiola_alvo)
-        df_filt = df_raw[df_raw[col_gaiola_idx].astype(str).apply(limpar_string) == target_limpo].copy()
-        if df_filt.empty: return None
-        col_end_idx = None
-        for r in range(min(15, len(df_raw))):
-            linha = [str(x).upper() for x in df_raw.iloc[r].values]
-            for i, val in enumerate(linha):
-                if any(t in val for t in ['ENDERE', 'LOGRA', 'RUA', 'ADDRESS']):
-                    col_end_idx = i; break
-            if col_end_idx is not None:
-                break
-        if col_end_idx is None:
-            try:
-                col_end_idx = df_filt.apply(lambda x: x.astype(str).map(len).mean()).idxmax()
-            except Exception:
-                col_end_idx = df_filt.columns[0]
-        df_filt['CHAVE_STOP'] = df_filt[col_end_idx].apply(extrair_base_endereco)
-        mapa_stops = {end: i + 1 for i, end in enumerate(df_filt['CHAVE_STOP'].unique())}
-        saida = pd.DataFrame()
-        saida['Parada'] = df_filt['CHAVE_STOP'].map(mapa_stops).astype(str)
-        saida['Gaiola'] = df_filt[col_gaiola_idx]
-        saida['Tipo'] = df_filt[col_end_idx].apply(identificar_comercio)
-        saida['Endereco_Completo'] = df_filt[col_end_idx].astype(str) + ", Fortaleza - CE"
-        return {'dataframe': saida, 'pacotes': len(saida), 'paradas': len(mapa_stops), 'comercios': len(saida[saida['Tipo'] == "🏪 Comércio"])}
-    except Exception as e:
-        logger.exception("Erro ao processar gaiola %s", gaiola_alvo)
-        st.error(f"⚠️ Erro ao processar gaiola {gaiola_alvo}. Ver logs para detalhes.")
+if 'manifesto' not in st.session_state: st.session_state.manifesto = None
+# A sessão guarda só referências: manifesto, rotas e planilhas ficam nos caches do processo, por hash do romaneio,
+# o ZIP fica no armazém de blobs e os downloads são gerados no clique
+if 'gaiolas_sessao' not in st.session_state: st.session_state.gaiolas_sessao = []
+if 'upload_id' not in st.session_state: st.session_state.upload_id = None
+if 'zip_gaiolas' not in st.session_state: st.session_state.zip_gaiolas = None
+if 'desempenho' not in st.session_state: st.session_state.desempenho = {}
+if 'circuit_tab3' not in st.session_state: st.session_state.circuit_tab3 = None
+if 'resultado_radar' not in st.session_state: st.session_state.resultado_radar = None
+if 'revisao' not in st.session_state: st.session_state.revisao = None
+if 'prefetch_pois' not in st.session_state: st.session_state.prefetch_pois = None
+if 'localizacao' not in st.session_state: st.session_state.localizacao = None
+if 'pedido_geo' not in st.session_state: st.session_state.pedido_geo = 0
+if 'aba_geo' not in st.session_state: st.session_state.aba_geo = None
+
+# --- TAREFAS EM SEGUNDO PLANO ---
+# Os botões pesados viram tarefas chaveadas por (hash do romaneio, parâmetros). A sessão guarda a
+# Tarefa; cada rerun (inclusive os causados por outros widgets) só confere se ela já terminou.
+
+@st.cache_resource
+def executor_tarefas() -> ExecutorTarefas:
+    # Um executor por servidor: sessões que pedem a mesma tarefa reaproveitam a mesma execução
+    return ExecutorTarefas()
+
+def iniciar_tarefa(nome: str, chave: tuple, func, descricao: str) -> None:
+    # As etapas da tarefa só são medidas com o painel de desempenho ligado
+    st.session_state[nome] = executor_tarefas().submeter(chave, func, descricao,
+                                                         medir=bool(st.session_state.get('painel_desempenho')))
+
+def tarefa_concluida(nome: str) -> Optional[Tarefa]:
+    # Devolve a tarefa da sessão uma única vez, quando termina; enquanto roda, mostra o andamento
+    tarefa = st.session_state.get(nome)
+    if tarefa is None:
         return None
-
-def carregar_abas_excel(arquivo_bytes: bytes) -> Dict[str, pd.DataFrame]:
-    try:
-        xl = pd.ExcelFile(io.BytesIO(arquivo_bytes), engine='openpyxl')
-        abas = {}
-        for sheet in xl.sheet_names:
-            try:
-                abas[sheet] = pd.read_excel(xl, sheet_name=sheet, header=None, engine='openpyxl')
-            except Exception:
-                abas[sheet] = pd.read_excel(io.BytesIO(arquivo_bytes), sheet_name=sheet, header=None)
-        return abas
-    except Exception as e:
-        logger.exception("Falha ao carregar abas do Excel")
-        raise
-
-def processar_multiplas_gaiolas(arquivo_bytes: bytes, codigos_gaiola: List[str]) -> Dict[str, Dict]:
-    resultados = {}
-    try:
-        abas = carregar_abas_excel(arquivo_bytes)
-        for gaiola in codigos_gaiola:
-            target_limpo = limpar_string(gaiola)
-            encontrado = False
-            for aba, df_raw in abas.items():
-                try:
-                    col_gaiola_idx = next((col for col in df_raw.columns if df_raw[col].astype(str).apply(limpar_string).eq(target_limpo).any()), None)
-                except Exception:
-                    col_gaiola_idx = None
-                if col_gaiola_idx is not None:
-                    res = processar_gaiola_unica(df_raw, gaiola, col_gaiola_idx)
-                    if res:
-                        resultados[gaiola] = {'pacotes': res['pacotes'], 'paradas': res['paradas'], 'comercios': res['comercios'], 'encontrado': True}
-                        encontrado = True
-                        break
-            if not encontrado:
-                resultados[gaiola] = {'pacotes': 0, 'paradas': 0, 'comercios': 0, 'encontrado': False}
-        return resultados
-    except Exception as e:
-        logger.exception("Erro ao processar múltiplas gaiolas")
-        st.error("⚠️ Erro ao processar múltiplas gaiolas. Ver logs para detalhes.")
-        return {}
-
-# --- LÓGICA CIRCUIT PRO ---
-def extrair_numero_correto(endereco):
-    if not isinstance(endereco, str): return "SN"
-    partes = endereco.split(',')
-    if len(partes) >= 2:
-        candidato = partes[1].strip()
-        match = re.search(r'(\d+)', candidato)
-        if match: return match.group(1)
-    todos_numeros = re.findall(r'(\d+)', endereco)
-    if todos_numeros: return todos_numeros[0]
-    return "SN"
-
-def normalizar_nome_rua(endereco):
-    if not isinstance(endereco, str): return ""
-    nome = endereco.split(',')[0]
-    return limpar_string(remover_acentos(nome))
-
-def calcular_distancia_gps(lat1, lon1, lat2, lon2):
-    try:
-        lat1, lon1, lat2, lon2 = float(lat1), float(lon1), float(lat2), float(lon2)
-    except Exception:
-        return 999999
-    R = 6371000
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2) * math.sin(dlambda/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
-
-def devem_agrupar(row1, row2):
-    num1 = row1['tmp_num']; nome1 = row1['tmp_nome']
-    lat1, lon1 = row1.get('tmp_lat', 0), row1.get('tmp_lon', 0)
-    num2 = row2['tmp_num']; nome2 = row2['tmp_nome']
-    lat2, lon2 = row2.get('tmp_lat', 0), row2.get('tmp_lon', 0)
-    
-    if num1 != num2: return False
-    if nome1 == nome2: return True
-    if lat1 != 0 and lat2 != 0:
-        dist = calcular_distancia_gps(lat1, lon1, lat2, lon2)
-        if dist <= 10: return True
-    return False
-
-def escolher_melhor_endereco(serie_enderecos):
-    candidatos = [str(x).strip() for x in serie_enderecos if pd.notna(x) and str(x).strip() != '']
-    if not candidatos: return ""
-    return max(candidatos, key=len)
-
-def gerar_planilha_otimizada_circuit_pro(df):
-    col_end = next((c for c in df.columns if any(t in str(c).upper() for t in ['ADDRESS', 'ENDERE', 'DESTINATION'])), None)
-    col_seq = next((c for c in df.columns if 'SEQUENCE' in str(c).upper()), None)
-    col_lat = next((c for c in df.columns if any(t in str(c).upper() for t in ['LATITUDE', 'LAT'])), None)
-    col_lon = next((c for c in df.columns if any(t in str(c).upper() for t in ['LONGITUDE', 'LON', 'LNG'])), None)
-    if not col_end or not col_seq: return None
-    df_temp = df.copy()
-    df_temp['tmp_num'] = df_temp[col_end].apply(extrair_numero_correto)
-    df_temp['tmp_nome'] = df_temp[col_end].apply(normalizar_nome_rua)
-    if col_lat and col_lon:
-        df_temp['tmp_lat'] = pd.to_numeric(df_temp[col_lat], errors='coerce').fillna(0)
-        df_temp['tmp_lon'] = pd.to_numeric(df_temp[col_lon], errors='coerce').fillna(0)
+    if not tarefa.concluida:
+        texto = f"⏳ {tarefa.descricao}... {tarefa.segundos:.0f}s" + (f" ({tarefa.mensagem})" if tarefa.mensagem else "")
+        if tarefa.progresso is not None:
+            st.progress(tarefa.progresso, text=texto)
+        else:
+            st.info(texto)
+        return None
+    st.session_state[nome] = None
+    coletor = coletor_ativo()
+    if coletor is not None:
+        coletor.medicoes.extend(tarefa.medicoes)
+    return tarefa
+
+def tarefas_rodando(nomes) -> bool:
+    return any(t is not None and not t.concluida for t in (st.session_state.get(nome) for nome in nomes))
+
+def vigiar_tarefas(nomes: tuple) -> None:
+    # Fragmento vazio com run_every, montado pela aba numa execução completa: a cada intervalo só
+    # confere as tarefas, sem redesenhar a aba, e quando elas terminam pede um rerun para mostrar o
+    # resultado. Quem o montou não o monta de novo, e o Streamlit cancela o timer dele.
+    if not tarefas_rodando(nomes):
+        st.rerun()
+
+def acompanhar_tarefas(*nomes: str) -> None:
+    # Chamado no fim de cada aba: numa reexecução só da aba, confere de novo só ela. No script
+    # inteiro o Streamlit não aceita st.rerun(scope="fragment"), então a aba deixa um vigia.
+    if not tarefas_rodando(nomes):
+        return
+    if st.session_state.execucao_completa:
+        st.fragment(vigiar_tarefas, run_every=INTERVALO_TAREFAS_S)(nomes)
     else:
-        df_temp['tmp_lat'] = 0; df_temp['tmp_lon'] = 0
-    df_temp = df_temp.sort_values(by=['tmp_num', 'tmp_nome']).reset_index(drop=True)
-    group_ids = [0] * len(df_temp); current_id = 0
-    for i in range(1, len(df_temp)):
-        if devem_agrupar(df_temp.iloc[i-1], df_temp.iloc[i]): group_ids[i] = current_id
-        else: current_id += 1; group_ids[i] = current_id
-    df_temp['CLUSTER_ID'] = group_ids
-    agg_dict = {col: 'first' for col in df_temp.columns if col not in ['CLUSTER_ID', col_seq, col_end, 'tmp_num', 'tmp_nome', 'tmp_lat', 'tmp_lon']}
-    agg_dict[col_end] = escolher_melhor_endereco 
-    def unir_seqs(x): 
-        vals = sorted(list(set(x.astype(str)))); 
-        try: vals.sort(key=int)
-        except: pass
-        return ', '.join(vals)
-    df_final = df_temp.groupby('CLUSTER_ID').agg({**agg_dict, col_seq: unir_seqs}).reset_index()
-    cols_drop = [c for c in ['CLUSTER_ID', 'tmp_num', 'tmp_nome', 'tmp_lat', 'tmp_lon'] if c in df_final.columns]
-    df_final = df_final.drop(columns=cols_drop)
-    try:
-        df_final['SortKey'] = df_final[col_seq].apply(lambda x: int(str(x).split(',')[0]))
-        return df_final.sort_values('SortKey').drop(columns=['SortKey'])
-    except Exception:
-        return df_final
-
-# --- FUNÇÕES OSM MELHORADAS ---
-@st.cache_data(ttl=3600)
-def buscar_locais_osm_cached(lat_round, lon_round, raio):
-    return buscar_locais_osm_base(lat_round, lon_round, raio)
-
-def buscar_locais_osm_base(lat, lon, raio):
-    try:
-        overpass_url = "https://overpass-api.de/api/interpreter"
-        overpass_query = f"""
-        [out:json][timeout:25];
-        (
-          nwr["amenity"~"^(restaurant|fuel|cafe|fast_food)$"](around:{raio},{lat},{lon});
-          nwr["shop"~"^(convenience|supermarket)$"](around:{raio},{lat},{lon});
-        );
-        out center;
-        """
-        response = SESSION.get(overpass_url, params={'data': overpass_query}, timeout=25)
-        if response.status_code == 200:
-            data = response.json()
-            locais = []
-            for element in data.get('elements', []):
-                tags = element.get('tags', {})
-                nome = tags.get('name', 'Sem Nome')
-                amenity = tags.get('amenity', '')
-                shop = tags.get('shop', '')
-                if amenity == 'fuel' or 'posto' in nome.lower():
-                    tipo_fmt = "⛽ Posto"; icone = "⛽"
-                elif amenity in ['restaurant', 'cafe', 'fast_food']:
-                    tipo_fmt = "🍴 Restaurante"; icone = "🍴"
-                elif shop in ['convenience', 'supermarket']:
-                    tipo_fmt = "🏪 Mercado"; icone = "🏪"
-                else:
-                    continue
-                e_lat, e_lon = None, None
-                if 'lat' in element and 'lon' in element:
-                    e_lat = element.get('lat'); e_lon = element.get('lon')
-                elif 'center' in element:
-                    e_lat = element['center'].get('lat'); e_lon = element['center'].get('lon')
-                if e_lat is None or e_lon is None: continue
-                dist = calcular_distancia_gps(lat, lon, e_lat, e_lon)
-                locais.append({'nome': nome, 'tipo': tipo_fmt, 'icone': icone, 'distancia': dist, 'lat': e_lat, 'lon': e_lon})
-            locais.sort(key=lambda x: x['distancia'])
-            return locais[:10]
+        time.sleep(INTERVALO_TAREFAS_S)
+        st.rerun(scope="fragment")
+
+def trocar_romaneio(novo) -> None:
+    # Upload novo: se for correção do anterior, reaproveita o que não mudou e só refaz as gaiolas afetadas
+    anterior = st.session_state.manifesto
+    st.session_state.manifesto = novo
+    st.session_state.revisao = None
+    if anterior is None or anterior.hash == novo.hash:
+        return
+    afetadas = None
+    if e_revisao(anterior, novo):
+        dif = comparar_manifestos(anterior, novo)
+        aproveitar_resultados(dif)
+        st.session_state.revisao = dif
+        afetadas = {limpar_string(g) for g in dif.afetadas}
+    resultado = st.session_state.resultado_multiplas
+    if resultado:
+        # O resumo de todas as gaiolas continua sendo de todas (inclusive as novas)
+        gaiolas = None if set(resultado) == set(anterior.indice.gaiolas) else list(resultado)
+        st.session_state.resultado_multiplas = resumir_gaiolas(novo, gaiolas) if afetadas is not None else None
+    if afetadas is None or afetadas:
+        st.session_state.zip_gaiolas = None
+        st.session_state.resultado_radar = None
+    if afetadas is None:
+        # Numa revisão a gaiola da aba 1 continua: a rota dela é remontada (se mudou) em segundo plano
+        st.session_state.gaiola_tab1 = None
+        st.session_state.gaiolas_sessao = []
+
+def tarefa_zip(tarefa: Tarefa, manifesto, gaiolas: List[str]):
+    feitas = 0
+    def montar(g):
+        nonlocal feitas
+        feitas += 1
+        tarefa.atualizar(feitas / len(gaiolas), f"{feitas}/{len(gaiolas)} gaiola(s)")
+        return dataframe_rota_gaiola(manifesto, g)
+    z = gerar_zip_gaiolas(manifesto.hash, gaiolas, montar)
+    # O ZIP vai para o armazém (em disco, se for grande): a tarefa e a sessão ficam só com a RefBlob em `dados`
+    return replace(z, dados=ARMAZEM.guardar(z.dados))
+
+def baixar_zip(manifesto, gaiolas: List[str], ref):
+    # Chamado no clique do download; se o armazém já descartou o ZIP, ele é remontado das planilhas em cache
+    dados = ARMAZEM.ler(ref)
+    if dados is None:
+        dados = gerar_zip_gaiolas(manifesto.hash, gaiolas, lambda g: dataframe_rota_gaiola(manifesto, g)).dados
+    return dados
+
+# --- PAINEL DE DESEMPENHO ---
+st.sidebar.toggle("⏱️ Painel de desempenho", key="painel_desempenho", help="Mostra tempo, linhas e memória de cada etapa no fim das abas e a memória da sessão aqui na barra lateral.")
+
+@contextmanager
+def painel_desempenho(aba: str):
+    # Com o painel desligado nada é coletado; ligado, guarda na sessão as etapas da última execução da aba
+    if not st.session_state.get('painel_desempenho'):
+        yield
+        return
+    with coletar() as coletor:
+        yield
+    if coletor.medicoes:
+        st.session_state.desempenho[aba] = coletor.medicoes
+    if st.session_state.desempenho.get(aba):
+        with st.expander("⏱️ Desempenho", expanded=False):
+            st.dataframe(tabela_medicoes(st.session_state.desempenho[aba]), use_container_width=True, hide_index=True)
+
+# --- FORMATO DOS ARQUIVOS ---
+st.sidebar.selectbox("📄 Formato dos arquivos", list(FORMATOS), format_func=lambda f: FORMATOS[f].rotulo, key="formato_saida",
+                     help="CSV no layout que o Circuit importa; o .csv.gz é o mesmo CSV, bem menor para baixar pelos dados móveis; Parquet é para a retaguarda.")
+
+def mostrar_formatos(chave: tuple, montar, chave_botao: Optional[str] = None) -> None:
+    # Tempo de geração e tamanho dos formatos já gerados para este arquivo (por qualquer sessão)
+    with st.expander("📏 Tamanho por formato"):
+        if chave_botao and st.button("Gerar em todos os formatos", key=chave_botao):
+            for formato in FORMATOS:
+                exportar(chave, formato, montar)
+        prontos = exportacoes_prontas(chave)
+        if prontos:
+            st.dataframe(pd.DataFrame([{'Formato': FORMATOS[a.formato].rotulo, 'Tamanho (KB)': round(a.tamanho / 1024, 1),
+                                        'Tempo (ms)': round(a.segundos * 1000, 1)} for a in prontos]),
+                         use_container_width=True, hide_index=True)
         else:
-            return []
-    except Exception as e:
-        logger.exception("Erro ao consultar Overpass")
-        return []
-
-def buscar_com_raio_progressivo(lat, lon, max_tentativas=3):
-    lat_r = round(lat, 3); lon_r = round(lon, 3)
-    raios = [1500, 3000, 5000]
-    for tentativa, raio in enumerate(raios):
+            st.caption("Nenhum formato gerado ainda: o arquivo é gerado no clique do download.")
+
+# --- TABELAS PAGINADAS ---
+def mostrar_tabela(chave: tuple, montar, prefixo: str) -> None:
+    # Busca, filtros e paginação rodam no servidor: o navegador recebe só a página atual
+    tabela = tabela_paginada(chave, montar)
+    if tabela is None:
+        return
+    chave_pagina = f"{prefixo}_pagina"
+    voltar_ao_inicio = lambda: st.session_state.update({chave_pagina: 1})
+    cols = st.columns([3, 1, 2] if tabela.tipos else [3, 1])
+    busca = cols[0].text_input("🔎 Rua" if tabela.col_endereco else "🔎 Buscar", key=f"{prefixo}_busca", on_change=voltar_ao_inicio)
+    parada = cols[1].text_input("Parada", key=f"{prefixo}_parada", on_change=voltar_ao_inicio) if tabela.col_parada else ''
+    tipos = cols[2].multiselect("Tipo", tabela.tipos, key=f"{prefixo}_tipos", on_change=voltar_ao_inicio) if tabela.tipos else []
+    pag = tabela.pagina(st.session_state.get(chave_pagina, 1) - 1, busca, parada, tipos)
+    # A página guardada pode não existir mais (tabela nova ou filtro mais restrito)
+    st.session_state[chave_pagina] = pag.numero + 1
+    st.dataframe(pag.tabela, use_container_width=True, hide_index=True)
+    c = st.columns([1, 2])
+    if pag.paginas > 1:
+        c[0].number_input("Página", min_value=1, max_value=pag.paginas, step=1, key=chave_pagina, label_visibility="collapsed")
+    c[1].caption(f"{pag.linhas_filtradas} de {pag.linhas_total} linha(s) · página {pag.numero + 1} de {pag.paginas}")
+
+# --- PONTOS DE INTERESSE (OSM, POR TILES) ---
+@st.cache_resource
+def indice_pois():
+    """Base importada com `python -m filtro_rotas pois importar` (None se não houver)."""
+    return poi.carregar_indice()
+
+def fonte_pois():
+    """Base local, se importada; senão o Overpass (uma consulta por tile, guardada no cache)."""
+    indice = indice_pois()
+    return poi.FonteLocal(indice) if indice is not None else poi.FonteOverpass(SESSION)
+
+BUSCANDO_POIS = 'buscando'
+
+def buscar_pois(nome_tarefa: str, lat, lon, raio, k, categorias):
+    # A renderização só responde da base local ou de um tile já no cache: o que falta vem do Overpass
+    # numa tarefa, e a aba mostra o andamento (BUSCANDO_POIS) em vez de esperar a consulta.
+    # None se a busca falhou (o tile só é consultado de novo depois de poi.TEMPO_FALHA_TILE_S)
+    fonte = fonte_pois()
+    tile = poi.tile_de(lat, lon)
+    if isinstance(fonte, poi.FonteLocal) or poi.tile_em_cache(fonte, tile) is not None:
         try:
-            locais = buscar_locais_osm_cached(lat_r, lon_r, raio)
-            if locais:
-                return locais, raio
-            if tentativa < len(raios) - 1: time.sleep(1)
-        except Exception as e:
-            if tentativa < len(raios) - 1: time.sleep(2)
-    return [], 0
-
-# --- NOVAS FUNÇÕES PARA ABA 6 (SOS) - DEAD CODE (MANTIDO) ---
-@st.cache_data(ttl=3600)
-def buscar_sos_osm_cached(lat_round, lon_round, raio):
-    return buscar_sos_osm_base(lat_round, lon_round, raio)
-
-def buscar_sos_osm_base(lat, lon, raio):
-    try:
-        overpass_url = "https://overpass-api.de/api/interpreter"
-        overpass_query = f"""
-        [out:json][timeout:25];
-        (
-          nwr["shop"~"car_repair|tyres|motorcycle_repair"](around:{raio},{lat},{lon});
-          nwr["craft"~"car_repair"](around:{raio},{lat},{lon});
-          nwr["name"~"Borracharia|Oficina|Reboque|Mecânica|Auto Center|Pneus", i](around:{raio},{lat},{lon});
-        );
-        out center;
-        """
-        response = SESSION.get(overpass_url, params={'data': overpass_query}, timeout=25)
-        if response.status_code == 200:
-            data = response.json()
-            locais = []
-            for element in data.get('elements', []):
-                tags = element.get('tags', {})
-                nome = tags.get('name', 'Sem Nome')
-                shop = tags.get('shop', '')
-                nome_lower = nome.lower()
-                if 'borracharia' in nome_lower or shop == 'tyres':
-                    tipo_fmt = "🔘 Borracharia"; icone = "🔘"
-                elif 'reboque' in nome_lower:
-                    tipo_fmt = "🛻 Reboque"; icone = "🛻"
-                else:
-                    tipo_fmt = "🔧 Oficina"; icone = "🔧"
-                e_lat, e_lon = None, None
-                if 'lat' in element and 'lon' in element:
-                    e_lat = element.get('lat'); e_lon = element.get('lon')
-                elif 'center' in element:
-                    e_lat = element['center'].get('lat'); e_lon = element['center'].get('lon')
-                if e_lat is None or e_lon is None: continue
-                dist = calcular_distancia_gps(lat, lon, e_lat, e_lon)
-                locais.append({'nome': nome, 'tipo': tipo_fmt, 'icone': icone, 'distancia': dist, 'lat': e_lat, 'lon': e_lon})
-            locais.sort(key=lambda x: x['distancia'])
-            return locais[:15]
-        else:
-            return []
-    except Exception:
-        return []
-
-def buscar_sos_progressivo(lat, lon):
-    lat_r = round(lat, 3); lon_r = round(lon, 3)
-    raios = [2000, 5000, 10000] 
-    for tentativa, raio in enumerate(raios):
+            return poi.buscar_pois(lat, lon, fonte, raio_m=raio, k=k, categorias=categorias)
+        except Exception:
+            logger.exception("Erro ao buscar pontos de interesse")
+            return None
+    if poi.falhou_ha_pouco(fonte, tile):
+        return None
+    chave = ('pois', fonte.chave, tile)
+    tarefa = st.session_state.get(nome_tarefa)
+    if tarefa is None or tarefa.chave != chave or tarefa.concluida:
+        # Sem busca deste tile, ou ela terminou e o tile já saiu do cache: busca de novo
+        iniciar_tarefa(nome_tarefa, chave, lambda t: poi.obter_tile(fonte, tile), "Buscando pontos de apoio por perto")
+    if tarefa_concluida(nome_tarefa) is None:
+        return BUSCANDO_POIS
+    # Acabou agora: responde do tile (ou None, se a busca falhou)
+    return buscar_pois(nome_tarefa, lat, lon, raio, k, categorias)
+
+def localizacao_motorista(aba: str) -> Optional[tuple]:
+    # O componente de GPS só é montado depois do toque no botão, e só na aba que pediu; a posição
+    # fica na sessão e serve ao Pit Stop e ao SOS até o motorista pedir para atualizar
+    novo_pedido = False
+    if st.session_state.localizacao is not None:
+        if not st.button("🔄 Atualizar localização", key=f"btn_geo_novo_{aba}"):
+            return st.session_state.localizacao
+        st.session_state.localizacao = None
+        novo_pedido = True
+    elif st.session_state.aba_geo != aba:
+        if not st.button("📍 Usar minha localização", key=f"btn_geo_{aba}", use_container_width=True):
+            return None
+        novo_pedido = True
+    if novo_pedido:
+        # Outra chave a cada pedido, para o componente não devolver a posição antiga
+        st.session_state.aba_geo = aba
+        st.session_state.pedido_geo += 1
+    location = get_geolocation(component_key=f"get_geo_{st.session_state.pedido_geo}")
+    if location:
+        st.session_state.localizacao = (location['coords']['latitude'], location['coords']['longitude'])
+    return st.session_state.localizacao
+
+def prefetch_pois_rota(df) -> int:
+    # Baixa em segundo plano os pontos das áreas da rota: no meio dela, Pit Stop e SOS respondem do cache
+    esquema = inferir_esquema(df)
+    if esquema.latitude is None or esquema.longitude is None:
+        return 0
+    tiles = poi.tiles_da_rota(df[esquema.latitude], df[esquema.longitude])
+    if tiles:
+        fonte = fonte_pois()
+        st.session_state.prefetch_pois = executor_tarefas().submeter(
+            ('pois', fonte.chave, tuple(tiles)), lambda t: poi.aquecer_tiles(fonte, tiles, t), "Baixando pontos de apoio da rota")
+    return len(tiles)
+
+def mostrar_pois(locais, raio, lat, lon, chave):
+    origem = "base local do OSM" if indice_pois() is not None else "Overpass"
+    prefetch = st.session_state.prefetch_pois
+    if prefetch is not None and not prefetch.concluida:
+        st.caption(f"⏳ {prefetch.descricao}... {prefetch.mensagem}")
+    if locais is None:
+        st.warning("Não foi possível buscar os pontos próximos agora. Use os botões acima.")
+    elif locais is BUSCANDO_POIS:
+        pass  # o andamento da busca já aparece acima
+    elif locais:
+        st.caption(f"{len(locais)} ponto(s) até {raio / 1000:.1f} km ({origem})")
+        for local in locais:
+            dist = f"{local['distancia']:.0f} m" if local['distancia'] < 1000 else f"{local['distancia'] / 1000:.1f} km"
+            st.markdown(
+                f'<div class="pit-card"><div class="pit-title">{local["icone"]} {html.escape(local["nome"])}</div>'
+                f'<div class="pit-meta">{local["tipo"]} · {dist}</div>'
+                f'<a class="pit-link" href="https://www.google.com/maps/dir/?api=1&destination={local["lat"]},{local["lon"]}" target="_blank">🧭 Ir até lá</a></div>',
+                unsafe_allow_html=True)
+    else:
+        st.caption(f"Nenhum ponto perto daqui ({origem}).")
+    # Grava na base local os pontos em volta do usuário
+    if st.button("🔄 Atualizar pontos pelo OSM", key=chave):
         try:
-            locais = buscar_sos_osm_cached(lat_r, lon_r, raio)
-            if locais:
-                return locais, raio
-            if tentativa < len(raios) - 1: time.sleep(1)
+            poi.atualizar_pelo_overpass(lat, lon, sessao=SESSION)
+            indice_pois.clear()
+            st.rerun()
         except Exception:
-            pass
-    return [], 0
+            logger.exception("Erro ao consultar Overpass")
+            st.error("Não foi possível consultar o Overpass agora.")
 
 # --- INTERFACE TABS ---
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🎯 Gaiola Única", "📊 Múltiplas Gaiolas", "⚡ Circuit Pro", "🧭 Radar", "📍 Pit Stop", "🛠️ SOS Mecânico"])
-
-with tab1:
-    st.markdown("##### 📥 Upload do Romaneio")
-    up_padrao = st.file_uploader("Envie o arquivo Excel", type=["xlsx"], key="up_padrao")
+# Cada aba é um st.fragment: um widget da aba reexecuta só a função dela, não o script inteiro.
+# Só a troca de romaneio, que muda o conteúdo das outras abas, pede um rerun completo.
+
+@st.fragment
+def aba_gaiola_unica():
+    with painel_desempenho('tab1'):
+        st.markdown("##### 📥 Upload do Romaneio")
+        up_padrao = st.file_uploader("Envie o arquivo Excel", type=["xlsx"], key="up_padrao")
     
-    if up_padrao:
-        try:
-            raw_bytes = up_padrao.read()
-            if len(raw_bytes) > MAX_UPLOAD_BYTES:
-                st.error(f"Arquivo muito grande. Limite {MAX_UPLOAD_BYTES // (1024*1024)} MB.")
-            else:
-                if st.session_state.get('up_padrao_bytes') != raw_bytes:
-                    st.session_state.up_padrao_bytes = raw_bytes
-                    st.session_state.df_cache = None
-                
-                if st.session_state.df_cache is None:
-                    with st.spinner("📊 Carregando romaneio..."):
-                        try:
-                            st.session_state.df_cache = pd.read_excel(io.BytesIO(raw_bytes), engine='openpyxl')
-                        except Exception:
-                            st.session_state.df_cache = pd.read_excel(io.BytesIO(raw_bytes))
+        if up_padrao:
+            try:
+                if up_padrao.size > MAX_UPLOAD_BYTES:
+                    st.error(f"Arquivo muito grande. Limite {MAX_UPLOAD_BYTES // (1024*1024)} MB.")
+                else:
+                    # Só um upload novo é lido (e só o hash dele é calculado); os bytes não ficam na sessão
+                    if st.session_state.upload_id != up_padrao.file_id or st.session_state.manifesto is None:
+                        with st.spinner("📊 Carregando romaneio..."):
+                            trocar_romaneio(obter_manifesto(up_padrao.getvalue()))
+                        st.session_state.upload_id = up_padrao.file_id
+                        if not st.session_state.execucao_completa:
+                            # As outras abas usam o romaneio: redesenha o app inteiro
+                            st.rerun()
+
+                    dif = st.session_state.revisao
+                    if dif is not None:
+                        resumo_revisao = f"{len(dif.alteradas)} alterada(s), {len(dif.novas)} nova(s), {len(dif.removidas)} removida(s)"
+                        st.markdown(f'<div class="info-box"><strong>🔄 Romaneio corrigido:</strong> {resumo_revisao}; {len(dif.inalteradas)} gaiola(s) sem mudança reaproveitadas.</div>', unsafe_allow_html=True)
+                        if dif.afetadas:
+                            with st.expander("Gaiolas que mudaram"):
+                                st.dataframe(dif.tabela(), use_container_width=True, hide_index=True)
                 
-                # Nova funcionalidade: Volumetria
-                try:
-                    abas_vol = carregar_abas_excel(raw_bytes)
-                    total_vol = sum(max(0, len(d) - 1) for d in abas_vol.values())
-                    st.markdown(f'<div class="success-box"><strong>📦 Volumetria Total:</strong> {total_vol} pacotes</div>', unsafe_allow_html=True)
-                except Exception:
-                    pass
+                    # Nova funcionalidade: Volumetria
+                    try:
+                        total_vol = st.session_state.manifesto.volumetria
+                        st.markdown(f'<div class="success-box"><strong>📦 Volumetria Total:</strong> {total_vol} pacotes</div>', unsafe_allow_html=True)
+                    except Exception:
+                        pass
 
-                st.markdown('<div class="info-box"><strong>💡 Modo Gaiola Única:</strong> Filtre e gere a rota detalhada.</div>', unsafe_allow_html=True)
-                g_unica = st.text_input("📦 Código da Gaiola", placeholder="Ex: B-50", key="gui_tab1").strip().upper()
+                    st.markdown('<div class="info-box"><strong>💡 Modo Gaiola Única:</strong> Filtre e gere a rota detalhada.</div>', unsafe_allow_html=True)
+                    g_unica = st.text_input("📦 Código da Gaiola", placeholder="Ex: B-50", key="gui_tab1").strip().upper()
                 
-                if st.button("🚀 GERAR ROTA DA GAIOLA", key="btn_u_tab1", use_container_width=True):
-                    if not g_unica:
-                        st.warning("⚠️ Digite o código da gaiola.")
-                    else:
-                        st.session_state.modo_atual = 'unica'
-                        target = limpar_string(g_unica); enc = False
-                        with st.spinner(f"⚙️ Processando gaiola {g_unica}..."):
-                            abas = carregar_abas_excel(raw_bytes)
-                            for aba, df_r in abas.items():
-                                idx = next((c for c in df_r.columns if df_r[c].astype(str).apply(limpar_string).eq(target).any()), None)
-                                if idx is not None:
-                                    res = processar_gaiola_unica(df_r, g_unica, idx)
-                                    if res:
-                                        enc = True
-                                        buf = io.BytesIO()
-                                        with pd.ExcelWriter(buf, engine='openpyxl') as w:
-                                            res['dataframe'].to_excel(w, index=False)
-                                        st.session_state.dados_prontos = buf.getvalue()
-                                        st.session_state.df_visual_tab1 = res['dataframe']
-                                        st.session_state.metricas_tab1 = res
-                                        break
-                            if not enc:
-                                st.error(f"❌ Gaiola '{g_unica}' não encontrada.")
-        except Exception:
-            st.error("Erro ao ler arquivo.")
-    
-    if st.session_state.modo_atual == 'unica' and st.session_state.dados_prontos:
-        m = st.session_state.metricas_tab1
-        c = st.columns(3)
-        c[0].metric("📦 Pacotes", m["pacotes"])
-        c[1].metric("📍 Paradas", m["paradas"])
-        c[2].metric("🏪 Comércios", m["comercios"])
-        st.dataframe(st.session_state.df_visual_tab1, use_container_width=True, hide_index=True)
-        st.download_button("📥 BAIXAR PLANILHA", st.session_state.dados_prontos, f"Rota_{g_unica}.xlsx", use_container_width=True)
+                    if st.button("🚀 GERAR ROTA DA GAIOLA", key="btn_u_tab1", use_container_width=True):
+                        if not g_unica:
+                            st.warning("⚠️ Digite o código da gaiola.")
+                        else:
+                            st.session_state.modo_atual = 'unica'
+                            manifesto = st.session_state.manifesto
+                            iniciar_tarefa('tarefa_tab1', ('rota', manifesto.hash, limpar_string(g_unica)),
+                                           lambda t: processar_rota_gaiola(manifesto, g_unica), f"Processando gaiola {g_unica}")
+            except Exception:
+                st.error("Erro ao ler arquivo.")
 
-with tab2:
-    st.markdown("##### 📥 Processamento em Lote")
+        # Fora do bloco do upload: a rota remontada abaixo também termina aqui, com ou sem arquivo no widget
+        tarefa = tarefa_concluida('tarefa_tab1')
+        if tarefa is not None:
+            try:
+                res = tarefa.resultado()
+                if res:
+                    # Só o código fica na sessão: a rota está no cache e a planilha sai no clique
+                    st.session_state.gaiola_tab1 = res['dataframe']['Gaiola'].iloc[0]
+                else:
+                    st.session_state.gaiola_tab1 = None
+                    st.error(f"❌ Gaiola '{tarefa.chave[2]}' não encontrada.")
+            except ErroProcessamento as e:
+                logger.exception("Erro ao processar gaiola %s", tarefa.chave[2])
+                st.error(f"⚠️ {e}. Ver logs para detalhes.")
+
+        gaiola, manifesto = st.session_state.gaiola_tab1, st.session_state.manifesto
+        m = None
+        if st.session_state.modo_atual == 'unica' and gaiola is not None and manifesto is not None:
+            m = rota_em_cache(manifesto, gaiola)
+            chave_rota = ('rota', manifesto.hash, limpar_string(gaiola))
+            tarefa = st.session_state.get('tarefa_tab1')
+            if m is None and (tarefa is None or tarefa.chave != chave_rota or tarefa.concluida):
+                # A rota saiu do cache (ou o romaneio foi corrigido): é remontada em segundo plano, não neste
+                # rerun. Uma tarefa já concluída não serve: o executor só devolve a mesma se ainda estiver rodando
+                iniciar_tarefa('tarefa_tab1', chave_rota, lambda t: processar_rota_gaiola(manifesto, gaiola), f"Processando gaiola {gaiola}")
+        if m:
+            c = st.columns(3)
+            c[0].metric("📦 Pacotes", m["pacotes"])
+            c[1].metric("📍 Paradas", m["paradas"])
+            c[2].metric("🏪 Comércios", m["comercios"])
+            formato, chave = st.session_state.formato_saida, (manifesto.hash, limpar_string(gaiola))
+            mostrar_tabela(('rota', *chave), lambda: m['dataframe'], 'tab1')
+            montar = lambda: dataframe_rota_gaiola(manifesto, gaiola)
+            st.download_button("📥 BAIXAR PLANILHA", lambda: conteudo_exportacao(chave, formato, montar), nome_arquivo_gaiola(str(gaiola), formato),
+                               mime=FORMATOS[formato].mime, use_container_width=True)
+            mostrar_formatos(chave, montar, 'formatos_tab1')
+    acompanhar_tarefas('tarefa_tab1')
+
+
+@st.fragment
+def aba_multiplas():
+    with painel_desempenho('tab2'):
+        st.markdown("##### 📥 Processamento em Lote")
     
-    if st.session_state.df_cache is not None and st.session_state.get('up_padrao_bytes') is not None:
-        raw_bytes = st.session_state.up_padrao_bytes
-        st.markdown('<div class="info-box"><strong>💡 Modo Múltiplas Gaiolas:</strong> Resumo rápido de várias cargas.</div>', unsafe_allow_html=True)
-        cod_m = st.text_area("📦 Códigos das Gaiolas (uma por linha)", placeholder="A-36\nB-50", key="cm_tab2", height=150)
+        if st.session_state.manifesto is not None:
+            manifesto = st.session_state.manifesto
+            st.markdown('<div class="info-box"><strong>💡 Modo Múltiplas Gaiolas:</strong> Resumo rápido de várias cargas.</div>', unsafe_allow_html=True)
+            cod_m = st.text_area("📦 Códigos das Gaiolas (uma por linha)", placeholder="A-36\nB-50", key="cm_tab2", height=150)
         
-        if st.button("📊 PROCESSAR MÚLTIPLAS GAIOLAS", key="btn_m_tab2", use_container_width=True):
-            lista = [c.strip().upper() for c in cod_m.split('\n') if c.strip()]
-            if not lista:
-                st.warning("⚠️ Digite pelo menos um código.")
-            elif len(lista) > 6:
-                st.warning("⚠️ Limite excedido: Digite no máximo 6 gaiolas por vez.")
-            else:
-                st.session_state.modo_atual = 'multiplas'
-                with st.spinner(f"⚙️ Processando {len(lista)} gaiola(s)..."):
-                    st.session_state.resultado_multiplas = processar_multiplas_gaiolas(raw_bytes, lista)
+            if st.button("📊 PROCESSAR MÚLTIPLAS GAIOLAS", key="btn_m_tab2", use_container_width=True):
+                lista = [c.strip().upper() for c in cod_m.split('\n') if c.strip()]
+                if not lista:
+                    st.warning("⚠️ Digite pelo menos um código.")
+                else:
+                    st.session_state.modo_atual = 'multiplas'
+                    iniciar_tarefa('tarefa_tab2', ('multiplas', manifesto.hash, tuple(lista)),
+                                   lambda t: resumir_gaiolas(manifesto, lista), f"Processando {len(lista)} gaiola(s)")
         
-        if st.session_state.modo_atual == 'multiplas' and st.session_state.resultado_multiplas:
-            res = st.session_state.resultado_multiplas
-            st.dataframe(pd.DataFrame([{'Gaiola': k, 'Status': '✅' if v['encontrado'] else '❌', 'Pacotes': v['pacotes'], 'Paradas': v['paradas']} for k, v in res.items()]), use_container_width=True, hide_index=True)
-            g_enc = [k for k, v in res.items() if v['encontrado']]
-            if g_enc:
-                st.markdown("---")
-                st.markdown("##### ✅ Selecione para download individual:")
-                selecionadas = []
-                cols = st.columns(3)
-                for i, g in enumerate(g_enc):
-                    with cols[i % 3]:
-                        if st.checkbox(f"**{g}**", key=f"chk_m_{g}"): selecionadas.append(g)
-                if selecionadas and st.button("📥 PREPARAR ARQUIVOS CIRCUIT"):
-                    st.session_state.planilhas_sessao = {}
-                    try:
-                        abas = carregar_abas_excel(raw_bytes)
-                        for s in selecionadas:
-                            target_l = limpar_string(s)
-                            for aba, df_r in abas.items():
-                                idx_g = next((c for c in df_r.columns if df_r[c].astype(str).apply(limpar_string).eq(target_l).any()), None)
-                                if idx_g is not None:
-                                    r_ind = processar_gaiola_unica(df_r, s, idx_g)
-                                    if r_ind:
-                                        b_ind = io.BytesIO()
-                                        with pd.ExcelWriter(b_ind, engine='openpyxl') as w:
-                                            r_ind['dataframe'].to_excel(w, index=False)
-                                        st.session_state.planilhas_sessao[s] = b_ind.getvalue()
-                                        break
-                    except Exception:
-                        st.error("Erro ao preparar arquivos.")
-                if st.session_state.planilhas_sessao:
-                    st.markdown("##### 📥 Downloads Prontos:")
-                    cols_dl = st.columns(3)
-                    for idx, (nome, data) in enumerate(st.session_state.planilhas_sessao.items()):
-                        with cols_dl[idx % 3]:
-                            st.download_button(label=f"📄 {nome}", data=data, file_name=f"Rota_{nome}.xlsx", key=f"dl_sessao_{nome}", use_container_width=True)
-    else:
-        st.info("📤 Faça o upload do romaneio na aba 'Gaiola Única' primeiro.")
+            if st.button("📋 RESUMO DE TODAS AS GAIOLAS", key="btn_todas_tab2", use_container_width=True):
+                st.session_state.modo_atual = 'multiplas'
+                # Sem lista de gaiolas: resume o romaneio inteiro (tarefa compartilhada entre sessões)
+                iniciar_tarefa('tarefa_tab2', ('multiplas', manifesto.hash, None),
+                               lambda t: resumir_gaiolas(manifesto), f"Processando {len(manifesto.indice.gaiolas)} gaiola(s)")
 
-with tab3:
-    st.markdown("##### ⚡ Circuit Pro - Otimização de Casadinhas")
-    st.info("ℹ️ **Critério Inteligente:** Agrupa apenas se (Números Iguais) E (GPS ≤ 10m OU Nomes Iguais)")
-    up_circuit = st.file_uploader("📤 Upload do Romaneio Específico", type=["xlsx"], key="up_circuit")
-    
-    if up_circuit:
-        try:
-            raw_c = up_circuit.read()
-            if len(raw_c) > MAX_UPLOAD_BYTES:
-                st.error("Arquivo muito grande.")
-            else:
+            tarefa = tarefa_concluida('tarefa_tab2')
+            if tarefa is not None:
                 try:
-                    df_c = pd.read_excel(io.BytesIO(raw_c), engine='openpyxl')
+                    st.session_state.resultado_multiplas = tarefa.resultado()
                 except Exception:
-                    df_c = pd.read_excel(io.BytesIO(raw_c))
-                
-                if st.button("🚀 GERAR PLANILHA DAS CASADINHAS", use_container_width=True):
-                    res_c = gerar_planilha_otimizada_circuit_pro(df_c)
-                    if res_c is not None:
-                        reducao = len(df_c) - len(res_c)
-                        st.success(f"✅ Otimização concluída! Economia de {reducao} paradas.")
-                        buf_c = io.BytesIO()
-                        with pd.ExcelWriter(buf_c, engine='openpyxl') as w:
-                            res_c.to_excel(w, index=False)
-                        
-                        # Nova lógica de data
+                    logger.exception("Erro ao processar múltiplas gaiolas")
+                    st.error("⚠️ Erro ao processar múltiplas gaiolas. Ver logs para detalhes.")
+                    st.session_state.resultado_multiplas = {}
+                st.session_state.zip_gaiolas = None
+        
+            if st.session_state.modo_atual == 'multiplas' and st.session_state.resultado_multiplas:
+                res = st.session_state.resultado_multiplas
+                g_enc = [k for k, v in res.items() if v['encontrado']]
+                c = st.columns(3)
+                c[0].metric("🗂️ Gaiolas", len(g_enc))
+                c[1].metric("📦 Pacotes", sum(v['pacotes'] for v in res.values()))
+                c[2].metric("📍 Paradas", sum(v['paradas'] for v in res.values()))
+                st.dataframe(tabela_resumo(res), use_container_width=True, hide_index=True)
+                if g_enc:
+                    st.markdown("---")
+                    st.markdown("##### ✅ Selecione para download individual:")
+                    selecionadas = st.multiselect("Gaiolas", g_enc, key="ms_m_tab2", label_visibility="collapsed")
+                    if selecionadas and st.button("📥 PREPARAR ARQUIVOS CIRCUIT"):
+                        st.session_state.gaiolas_sessao = []
+                        try:
+                            # A sessão guarda só os códigos; cada planilha é gerada (ou tirada do cache) no clique
+                            st.session_state.gaiolas_sessao = [s for s in selecionadas if dataframe_rota_gaiola(manifesto, s) is not None]
+                        except Exception:
+                            st.error("Erro ao preparar arquivos.")
+                    if st.session_state.gaiolas_sessao:
+                        st.markdown("##### 📥 Downloads Prontos:")
+                        cols_dl = st.columns(3)
+                        formato = st.session_state.formato_saida
+                        for idx, nome in enumerate(st.session_state.gaiolas_sessao):
+                            chave = (manifesto.hash, limpar_string(nome))
+                            with cols_dl[idx % 3]:
+                                st.download_button(label=f"📄 {nome}", data=lambda chave=chave, nome=nome: conteudo_exportacao(chave, formato, lambda: dataframe_rota_gaiola(manifesto, nome)),
+                                                   file_name=nome_arquivo_gaiola(nome, formato), mime=FORMATOS[formato].mime, key=f"dl_sessao_{nome}", use_container_width=True)
+
+                    st.markdown("---")
+                    if st.button(f"📦 PREPARAR ZIP COM TODAS AS {len(g_enc)} GAIOLAS", key="btn_zip_tab2", use_container_width=True):
+                        iniciar_tarefa('tarefa_zip', ('zip', manifesto.hash, tuple(g_enc)),
+                                       lambda t: tarefa_zip(t, manifesto, g_enc), f"Gerando {len(g_enc)} planilha(s)")
+                    tarefa = tarefa_concluida('tarefa_zip')
+                    if tarefa is not None:
+                        try:
+                            st.session_state.zip_gaiolas = tarefa.resultado()
+                        except Exception:
+                            logger.exception("Erro ao gerar ZIP das gaiolas")
+                            st.error("Erro ao preparar o ZIP.")
+                    if st.session_state.zip_gaiolas:
+                        z = st.session_state.zip_gaiolas
+                        st.caption(f"⏱️ {z.arquivos} planilha(s) em {z.segundos:.2f}s ({z.em_cache} já estavam prontas).")
                         data_hoje = pd.Timestamp.now().strftime('%d-%m-%Y')
-                        nome_arquivo_circuit = f"Circuit_Otimizado_{data_hoje}.xlsx"
-                        
-                        st.download_button("📥 BAIXAR PLANILHA OTIMIZADA", buf_c.getvalue(), nome_arquivo_circuit, use_container_width=True)
-                        st.dataframe(res_c, use_container_width=True, hide_index=True)
-                    else:
-                        st.error("❌ Erro: Colunas necessárias não encontradas.")
-        except Exception:
-            st.error("Erro ao processar arquivo.")
+                        st.download_button("📥 BAIXAR TODAS (ZIP)", lambda: baixar_zip(manifesto, g_enc, z.dados), f"Rotas_{data_hoje}.zip", mime="application/zip", key="dl_zip_tab2", use_container_width=True)
+        else:
+            st.info("📤 Faça o upload do romaneio na aba 'Gaiola Única' primeiro.")
+    acompanhar_tarefas('tarefa_tab2', 'tarefa_zip')
+
+
+@st.fragment
+def aba_circuit():
+    with painel_desempenho('tab3'):
+        st.markdown("##### ⚡ Circuit Pro - Otimização de Casadinhas")
+        st.info("ℹ️ **Critério Inteligente:** Agrupa apenas se (Números Iguais) E (GPS ≤ 10m OU Nomes Iguais)")
+        up_circuit = st.file_uploader("📤 Upload do Romaneio Específico", type=["xlsx"], key="up_circuit")
+    
+        if up_circuit:
+            try:
+                if up_circuit.size > MAX_UPLOAD_BYTES:
+                    st.error("Arquivo muito grande.")
+                else:
+                    busca_espacial = st.toggle("🛰️ Busca espacial (junta casadinhas com grafias diferentes a até 10m)", key="tg_espacial_tab3")
+
+                    if st.button("🚀 GERAR PLANILHA DAS CASADINHAS", use_container_width=True):
+                        # A planilha só é lida no clique: paginar e filtrar o resultado não relê o Excel
+                        raw_c = up_circuit.getvalue()
+                        try:
+                            df_c = pd.read_excel(io.BytesIO(raw_c), engine='openpyxl')
+                        except Exception:
+                            df_c = pd.read_excel(io.BytesIO(raw_c))
+                        res_c = gerar_planilha_otimizada_circuit_pro(df_c, modo=MODO_ESPACIAL if busca_espacial else MODO_ADJACENTE)
+                        st.session_state.circuit_tab3 = None
+                        if res_c is not None:
+                            reducao = len(df_c) - len(res_c)
+                            st.success(f"✅ Otimização concluída! Economia de {reducao} paradas.")
+                            if busca_espacial:
+                                st.caption(f"🛰️ Busca espacial: {res_c.attrs['casadinhas']['fusoes_extras']} casadinha(s) a mais que o modo padrão.")
+                            areas = prefetch_pois_rota(res_c)
+                            if areas:
+                                st.caption(f"📍 Pontos de apoio de {areas} área(s) da rota sendo baixados para o Pit Stop e o SOS.")
+                            # O resultado fica no cache do Circuit Pro no processo; a sessão guarda só a chave dele
+                            chave_c = ('circuit', hash_conteudo(raw_c), MODO_ESPACIAL if busca_espacial else MODO_ADJACENTE)
+                            guardar_resultado(chave_c, res_c)
+                            st.session_state.circuit_tab3 = (up_circuit.file_id, chave_c)
+                        else:
+                            st.error("❌ Erro: Colunas necessárias não encontradas.")
+
+                    resultado_c = st.session_state.circuit_tab3
+                    if resultado_c is not None and resultado_c[0] == up_circuit.file_id:
+                        chave_c = resultado_c[1]
+                        # Tabela e downloads saem do DataFrame original, não da cópia em Arrow
+                        montar_c = lambda: resultado_guardado(chave_c)
+                        # O arquivo sai no formato escolhido só no clique; tempo e tamanho ficam no expander
+                        formato = st.session_state.formato_saida
+                        if resultado_guardado(chave_c) is None:
+                            st.info("🔄 O resultado expirou; gere a planilha de novo.")
+                        else:
+                            data_hoje = pd.Timestamp.now().strftime('%d-%m-%Y')
+                            nome_arquivo_circuit = f"Circuit_Otimizado_{data_hoje}{FORMATOS[formato].extensao}"
+                            st.download_button("📥 BAIXAR PLANILHA OTIMIZADA", lambda: conteudo_exportacao(chave_c, formato, montar_c), nome_arquivo_circuit,
+                                               mime=FORMATOS[formato].mime, use_container_width=True)
+                            mostrar_formatos(chave_c, montar_c, 'formatos_tab3')
+                            mostrar_tabela(chave_c, montar_c, 'tab3')
+            except Exception:
+                st.error("Erro ao processar arquivo.")
+
 
 # --- ABA 4: RADAR DE BAIRROS ---
-with tab4:
-    st.markdown("##### 🧭 Radar de Bairros")
-    st.markdown('<div class="info-box"><strong>🎯 Estratégia:</strong> Descubra quais gaiolas passam pelos bairros que você prefere.</div>', unsafe_allow_html=True)
+@st.fragment
+def aba_radar():
+    with painel_desempenho('tab4'):
+        st.markdown("##### 🧭 Radar de Bairros")
+        st.markdown('<div class="info-box"><strong>🎯 Estratégia:</strong> Descubra quais gaiolas passam pelos bairros que você prefere.</div>', unsafe_allow_html=True)
     
-    # Inputs
-    bairros_txt = st.text_area("Digite os bairros (separados por vírgula)", placeholder="Ex: Maraponga, Jardim Cearense", height=80)
+        # Inputs
+        bairros_txt = st.text_area("Digite os bairros (separados por vírgula)", placeholder="Ex: Maraponga, Jardim Cearense", height=80, key="bairros_tab4")
     
-    if st.button("🔍 RASTREAR GAIOLAS", key="btn_radar", use_container_width=True):
-        if not bairros_txt:
-            st.warning("⚠️ Digite pelo menos um bairro.")
-        else:
-            bairros_lista = [limpar_string(b) for b in bairros_txt.split(',') if b.strip()]
-            
-            # --- TRAVA 1: Limite de 2 bairros ---
-            if len(bairros_lista) > 2:
-                st.warning("⚠️ Para garantir a rapidez da busca, digite no máximo 2 bairros por vez.")
-            elif st.session_state.get('up_padrao_bytes') is None:
-                st.warning("⚠️ Faça o upload do romaneio na Aba 1 primeiro.")
+        if st.button("🔍 RASTREAR GAIOLAS", key="btn_radar", use_container_width=True):
+            if not bairros_txt:
+                st.warning("⚠️ Digite pelo menos um bairro.")
             else:
-                raw_bytes = st.session_state.up_padrao_bytes
-                
-                with st.spinner("Varrendo todas as rotas..."):
-                    try:
-                        import difflib # Importação local para não tocar no topo
-                        abas = carregar_abas_excel(raw_bytes)
-                        
-                        # --- OTIMIZAÇÃO: Pré-contagem rápida ---
-                        # Armazena {gaiola: {count: int, bairros: set()}}
-                        contagem_preliminar = {} 
-                        
-                        for sheet_name, df in abas.items():
-                            col_bairro_idx = None
-                            col_gaiola_idx = None
-                            
-                            # Varredura de cabeçalho
-                            for r in range(min(5, len(df))):
-                                row_values = [str(x).upper() for x in df.iloc[r].values]
-                                if col_bairro_idx is None:
-                                    for i, val in enumerate(row_values):
-                                        if any(t in val for t in ['BAIRRO', 'NEIGHBORHOOD']):
-                                            col_bairro_idx = i; break
-                                if col_gaiola_idx is None:
-                                    for i, val in enumerate(row_values):
-                                        if any(t in val for t in ['GAIOLA', 'LETRA', 'ROTA', 'CAGE', 'LPN']):
-                                            col_gaiola_idx = i; break
-                                if col_bairro_idx is not None and col_gaiola_idx is not None:
-                                    break
-                            
-                            if col_bairro_idx is not None and col_gaiola_idx is not None:
-                                # Otimização com Fuzzy Matching
-                                unique_vals = df[col_bairro_idx].astype(str).unique()
-                                vals_aceitos_map = {} # {valor_real_no_arquivo: nome_bairro_buscado}
-                                
-                                for val in unique_vals:
-                                    val_clean = limpar_string(val)
-                                    for b_alvo in bairros_lista:
-                                        # 1. Match exato ou substring
-                                        if b_alvo in val_clean:
-                                            vals_aceitos_map[val] = b_alvo
-                                            break
-                                        
-                                        # 2. Match aproximado (Typos)
-                                        if abs(len(b_alvo) - len(val_clean)) <= 3:
-                                            ratio = difflib.SequenceMatcher(None, b_alvo, val_clean).ratio()
-                                            if ratio > 0.80:
-                                                vals_aceitos_map[val] = b_alvo
-                                                break
-                                
-                                # Se encontrou algum bairro compatível nesta aba
-                                if vals_aceitos_map:
-                                    # Filtra linhas onde o bairro está na lista de aceitos
-                                    mask = df[col_bairro_idx].isin(vals_aceitos_map.keys())
-                                    df_match = df[mask]
-                                    
-                                    # Itera sobre as linhas filtradas para contar
-                                    for idx, row in df_match.iterrows():
-                                        gaiola = str(row[col_gaiola_idx])
-                                        bairro_real = row[col_bairro_idx]
-                                        bairro_encontrado = vals_aceitos_map.get(bairro_real, "Desconhecido")
-                                        
-                                        g_limpo = limpar_string(gaiola)
-                                        if len(g_limpo) > 1 and "GAIOLA" not in g_limpo:
-                                            if gaiola not in contagem_preliminar:
-                                                contagem_preliminar[gaiola] = {'count': 0, 'bairros': set()}
-                                            contagem_preliminar[gaiola]['count'] += 1
-                                            contagem_preliminar[gaiola]['bairros'].add(bairro_encontrado)
-
-                        # --- TRAVA 2: Filtro de Relevância (>= 20 entregas) ---
-                        gaiolas_relevantes = [g for g, dados in contagem_preliminar.items() if dados['count'] >= 20]
-                        
-                        # 2. Processar métricas detalhadas APENAS para gaiolas relevantes
-                        resultados_radar = []
-                        
-                        # Ordena gaiolas processadas
-                        for g in sorted(gaiolas_relevantes):
-                            target_l = limpar_string(g)
-                            
-                            # Recupera dados da pré-contagem e formata
-                            bairros_encontrados_set = contagem_preliminar[g]['bairros']
-                            bairros_display = ", ".join([b.title() for b in bairros_encontrados_set])
-
-                            for sheet_name, df in abas.items():
-                                # Re-localiza coluna da gaiola
-                                idx_g = next((c for c in df.columns if df[c].astype(str).apply(limpar_string).eq(target_l).any()), None)
-                                
-                                if idx_g is not None:
-                                    res = processar_gaiola_unica(df, g, idx_g)
-                                    if res:
-                                        otimizacao = res['pacotes'] - res['paradas']
-                                        pct = (otimizacao / res['pacotes']) * 100 if res['pacotes'] > 0 else 0
-                                        
-                                        resultados_radar.append({
-                                            'Gaiola': g,
-                                            'Bairros Encontrados': bairros_display,
-                                            'Pacotes': res['pacotes'],
-                                            'Paradas Reais': res['paradas'],
-                                            'Economia': f"{otimizacao} ({int(pct)}%)",
-                                            'Comércios': res['comercios']
-                                        })
-                                    break 
-                        
-                        if resultados_radar:
-                            st.success(f"✅ Encontradas {len(resultados_radar)} gaiolas com alta densidade na região!")
-                            df_radar = pd.DataFrame(resultados_radar)
-                            st.dataframe(df_radar, use_container_width=True, hide_index=True)
-                        else:
-                            if contagem_preliminar:
-                                st.warning("⚠️ Foram encontradas gaiolas nesses bairros, mas nenhuma atingiu o mínimo de 20 pacotes.")
-                            else:
-                                st.warning("❌ Nenhuma gaiola encontrada para esses bairros.")
-                            
-                    except Exception as e:
-                        logger.exception("Erro no Radar de Bairros")
-                        st.error("Erro ao processar. Verifique o arquivo.")
+                if st.session_state.manifesto is None:
+                    st.warning("⚠️ Faça o upload do romaneio na Aba 1 primeiro.")
+                else:
+                    manifesto = st.session_state.manifesto
+                    bairros = [b for b in bairros_txt.split(',') if b.strip()]
+                    # Índice de bairros montado no upload + resumo em lote das gaiolas relevantes
+                    iniciar_tarefa('tarefa_radar', ('radar', manifesto.hash, tuple(sorted({limpar_string(b) for b in bairros}))),
+                                   lambda t: rastrear_gaiolas(manifesto, bairros), "Varrendo todas as rotas")
+                    st.session_state.resultado_radar = None
+
+        tarefa = tarefa_concluida('tarefa_radar')
+        if tarefa is not None:
+            try:
+                st.session_state.resultado_radar = tarefa.resultado()
+            except Exception:
+                logger.exception("Erro no Radar de Bairros")
+                st.error("Erro ao processar. Verifique o arquivo.")
+
+        if st.session_state.resultado_radar is not None:
+            resultados_radar, contagem_preliminar = st.session_state.resultado_radar
+            if resultados_radar:
+                st.success(f"✅ Encontradas {len(resultados_radar)} gaiolas com alta densidade na região!")
+                mostrar_tabela(('radar', hash_conteudo(repr(resultados_radar).encode())), lambda: pd.DataFrame(resultados_radar), 'tab4')
+            else:
+                if contagem_preliminar:
+                    st.warning(f"⚠️ Foram encontradas gaiolas nesses bairros, mas nenhuma atingiu o mínimo de {MINIMO_PACOTES_RADAR} pacotes.")
+                else:
+                    st.warning("❌ Nenhuma gaiola encontrada para esses bairros.")
+    acompanhar_tarefas('tarefa_radar')
 
-with tab5:
+
+@st.fragment
+def aba_pit_stop():
     st.markdown("##### 📍 Pit Stop - Serviços Próximos")
     
     if not GPS_AVAILABLE:
         st.error("⚠️ Biblioteca de GPS não encontrada. Adicione 'streamlit-js-eval' ao requirements.txt.")
     else:
         st.info("📱 Clique nos botões abaixo para abrir o Google Maps com a busca já realizada.")
-        location = get_geolocation(component_key='get_geo')
+        location = localizacao_motorista('pit')
 
         if location:
-            lat = location['coords']['latitude']
-            lon = location['coords']['longitude']
+            lat, lon = location
             
             st.success(f"📍 Localização encontrada!")
             
@@ -779,18 +724,23 @@ with tab5:
             with col_p3:
                 st.markdown(f'<a href="https://www.google.com/maps/search/Supermercado/@{lat},{lon},15z" target="_blank" class="sos-btn">🏪 Mercados</a>', unsafe_allow_html=True)
 
-with tab6:
+            locais = buscar_pois('tarefa_pois_pit', lat, lon, 5000, 10, poi.PIT_STOP)
+            mostrar_pois(locais, 5000, lat, lon, 'atualizar_pois_pit')
+    acompanhar_tarefas('tarefa_pois_pit')
+
+
+@st.fragment
+def aba_sos():
     st.markdown("##### 🛠️ SOS Mecânico - Serviços de Emergência")
     
     if not GPS_AVAILABLE:
         st.error("⚠️ Biblioteca de GPS não encontrada.")
     else:
         st.info("📱 Clique nos botões abaixo para abrir o Google Maps com a busca já realizada.")
-        location_sos = get_geolocation(component_key='get_geo_sos')
+        location_sos = localizacao_motorista('sos')
 
         if location_sos:
-            lat_s = location_sos['coords']['latitude']
-            lon_s = location_sos['coords']['longitude']
+            lat_s, lon_s = location_sos
             
             st.success(f"📍 Localização: {lat_s:.5f}, {lon_s:.5f}")
             
@@ -801,4 +751,37 @@ with tab6:
             with col_g2:
                 st.markdown(f'<a href="https://www.google.com/maps/search/Borracharia/@{lat_s},{lon_s},15z" target="_blank" class="sos-btn">🔘 Borracharias</a>', unsafe_allow_html=True)
             with col_g3:
-                st.markdown(f'<a href="https://www.google.com/maps/search/Guincho+Reboque/@{lat_s},{lon_s},15z" target="_blank" class="sos-btn">🛻 Guinchos</a>', unsafe_allow_html=True)
\ No newline at end of file
+                st.markdown(f'<a href="https://www.google.com/maps/search/Guincho+Reboque/@{lat_s},{lon_s},15z" target="_blank" class="sos-btn">🛻 Guinchos</a>', unsafe_allow_html=True)
+
+            locais_sos = buscar_pois('tarefa_pois_sos', lat_s, lon_s, 10000, 15, poi.SOS)
+            mostrar_pois(locais_sos, 10000, lat_s, lon_s, 'atualizar_pois_sos')
+    acompanhar_tarefas('tarefa_pois_sos')
+
+
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🎯 Gaiola Única", "📊 Múltiplas Gaiolas", "⚡ Circuit Pro", "🧭 Radar", "📍 Pit Stop", "🛠️ SOS Mecânico"])
+with tab1:
+    aba_gaiola_unica()
+with tab2:
+    aba_multiplas()
+with tab3:
+    aba_circuit()
+with tab4:
+    aba_radar()
+with tab5:
+    aba_pit_stop()
+with tab6:
+    aba_sos()
+
+# --- MEMÓRIA DA SESSÃO ---
+# Com o painel de desempenho ligado: quanto cada chave da sessão ocupa e o que é dividido com outras sessões
+if st.session_state.get('painel_desempenho'):
+    pegada = pegada_sessao(st.session_state.to_dict())
+    so_sessao = pegada.loc[pegada['Onde'] == SESSAO, 'Bytes'].sum()
+    with st.sidebar.expander("💾 Memória da sessão"):
+        st.caption(f"{so_sessao / 2**20:.2f} MB só desta sessão; {(pegada['Bytes'].sum() - so_sessao) / 2**20:.2f} MB compartilhados ou em disco.")
+        st.dataframe(pegada, use_container_width=True, hide_index=True)
+        info = ARMAZEM.info()
+        st.caption(f"Armazém do servidor: {info['blobs_memoria']} arquivo(s) em memória ({info['bytes_memoria'] / 2**20:.1f} MB), "
+                   f"{info['blobs_disco']} em disco ({info['bytes_disco'] / 2**20:.1f} MB).")
+
+st.session_state.execucao_completa = False
@@ -0,0 +1,80 @@
+"""
+Benchmark da leitura do romaneio: leitor completo (pd.read_excel/openpyxl,
+todas as colunas) e openpyxl em modo `read_only` com projeção de colunas,
+contra o leitor em streaming (expat) com projeção de colunas.
+Mede tempo, pico de memória (tracemalloc) e memória dos DataFrames, e confere
+que as colunas mantidas são iguais às do leitor completo.
+
+Uso: python benchmarks/bench_leitura.py [arquivo.xlsx]
+"""
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from openpyxl import load_workbook  # noqa: E402
+
+from filtro_rotas.leitura import colunas_necessarias, ler_abas_projetadas  # noqa: E402
+from filtro_rotas.manifesto import ler_abas_excel  # noqa: E402
+
+ARQUIVO = sys.argv[1] if len(sys.argv) > 1 else os.path.join(RAIZ, 'PM 31_01 ROMANEIO.xlsx')
+
+
+def ler_read_only(arquivo_bytes):
+    """openpyxl `read_only` + `iter_rows(values_only=True)`, guardando só as colunas detectadas."""
+    abas = {}
+    wb = load_workbook(io.BytesIO(arquivo_bytes), read_only=True, data_only=True, keep_links=False)
+    for aba in wb.worksheets:
+        aba.reset_dimensions()
+        linhas = aba.iter_rows(values_only=True)
+        cabecalho = [list(linha) for _, linha in zip(range(15), linhas)]
+        colunas = colunas_necessarias(pd.DataFrame(cabecalho)) if cabecalho else None
+        if colunas is None:
+            corpo = [list(linha) for linha in linhas]
+        else:
+            cabecalho = [[linha[c] if c < len(linha) else None for c in colunas] for linha in cabecalho]
+            corpo = [[linha[c] if c < len(linha) else None for c in colunas] for linha in linhas]
+        abas[aba.title] = pd.DataFrame(cabecalho + corpo)
+    wb.close()
+    return abas
+
+
+def medir(nome, funcao, arquivo_bytes):
+    gc.collect()
+    inicio = time.perf_counter()
+    abas = funcao(arquivo_bytes)
+    tempo = time.perf_counter() - inicio
+    gc.collect()
+    tracemalloc.start()
+    funcao(arquivo_bytes)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memoria = sum(df.memory_usage(deep=True).sum() for df in abas.values())
+    print(f"{nome:<12} {tempo:7.2f}s   pico {pico / 2**20:7.1f} MB   DataFrames {memoria / 2**20:6.2f} MB")
+    return abas
+
+
+def main():
+    with open(ARQUIVO, 'rb') as f:
+        arquivo_bytes = f.read()
+    print(f"{os.path.basename(ARQUIVO)}: {len(arquivo_bytes) / 2**20:.1f} MB")
+    completo = medir('completo', ler_abas_excel, arquivo_bytes)
+    medir('read_only', ler_read_only, arquivo_bytes)
+    projetado = medir('streaming', ler_abas_projetadas, arquivo_bytes)
+    for aba, df in projetado.items():
+        for col in df.columns:
+            esperado = completo[aba][col]
+            assert df[col].astype(object).equals(esperado.astype(object)), (aba, col)
+        print(f"  {aba}: {completo[aba].shape[1]} -> {df.shape[1]} colunas {list(df.columns)}, "
+              f"{sum(isinstance(t, pd.CategoricalDtype) for t in df.dtypes)} categóricas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark da normalização vetorizada contra os helpers antigos (por célula)
+sobre o romaneio de exemplo. Confere também que a saída é idêntica.
+
+Uso: python benchmarks/bench_normalizacao.py [arquivo.xlsx]
+"""
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from filtro_rotas import normalizacao  # noqa: E402
+
+ARQUIVO = sys.argv[1] if len(sys.argv) > 1 else os.path.join(RAIZ, 'PM 31_01 ROMANEIO.xlsx')
+
+
+# --- IMPLEMENTAÇÕES ANTIGAS (cópia de app-shopee.py antes da vetorização) ---
+def remover_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn').upper()
+
+def limpar_string(s: str) -> str:
+    return "".join(filter(str.isalnum, str(s))).upper()
+
+def extrair_base_endereco(endereco_completo: str) -> str:
+    partes = str(endereco_completo).split(',')
+    base = partes[0].strip() + " " + partes[1].strip() if len(partes) >= 2 else partes[0].strip()
+    return limpar_string(base)
+
+def extrair_numero_correto(endereco):
+    if not isinstance(endereco, str): return "SN"
+    partes = endereco.split(',')
+    if len(partes) >= 2:
+        candidato = partes[1].strip()
+        match = re.search(r'(\d+)', candidato)
+        if match: return match.group(1)
+    todos_numeros = re.findall(r'(\d+)', endereco)
+    if todos_numeros: return todos_numeros[0]
+    return "SN"
+
+def normalizar_nome_rua(endereco):
+    if not isinstance(endereco, str): return ""
+    nome = endereco.split(',')[0]
+    return limpar_string(remover_acentos(nome))
+
+
+def cronometrar(func, repeticoes=5):
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    df = pd.read_excel(ARQUIVO, header=None)
+    col_gaiola, col_end = df[0], df[3]
+    casos = [
+        ('limpar_string (gaiola)', col_gaiola, lambda s: s.astype(str).apply(limpar_string), normalizacao.limpar_serie),
+        ('limpar_string (endereço)', col_end, lambda s: s.astype(str).apply(limpar_string), normalizacao.limpar_serie),
+        ('remover_acentos', col_end, lambda s: s.apply(remover_acentos), normalizacao.remover_acentos_serie),
+        ('extrair_base_endereco', col_end, lambda s: s.apply(extrair_base_endereco), normalizacao.extrair_base_endereco_serie),
+        ('extrair_numero_correto', col_end, lambda s: s.apply(extrair_numero_correto), normalizacao.extrair_numero_serie),
+        ('normalizar_nome_rua', col_end, lambda s: s.apply(normalizar_nome_rua), normalizacao.normalizar_nome_rua_serie),
+    ]
+
+    print(f"Romaneio: {os.path.basename(ARQUIVO)} ({len(df)} linhas)")
+    print(f"{'função':<28}{'antiga (ms)':>12}{'vetorizada (ms)':>17}{'ganho':>8}")
+    for nome, serie, antiga, nova in casos:
+        t_antiga, r_antiga = cronometrar(lambda: antiga(serie))
+        t_nova, r_nova = cronometrar(lambda: nova(serie))
+        assert r_antiga.tolist() == r_nova.tolist(), f"saída divergente em {nome}"
+        print(f"{nome:<28}{t_antiga * 1000:>12.1f}{t_nova * 1000:>17.1f}{t_antiga / t_nova:>7.1f}x")
+
+    # No app, limpar_string/remover_acentos eram @st.cache_data: cada célula passava pelo hash do cache
+    try:
+        import logging
+        import streamlit as st
+        logging.getLogger("streamlit").setLevel(logging.ERROR)
+        limpar_cache = st.cache_data(limpar_string)
+        t_cache, _ = cronometrar(lambda: col_end.astype(str).apply(limpar_cache), repeticoes=2)
+        t_nova, _ = cronometrar(lambda: normalizacao.limpar_serie(col_end))
+        print(f"{'limpar_string @cache_data':<28}{t_cache * 1000:>12.1f}{t_nova * 1000:>17.1f}{t_cache / t_nova:>7.1f}x")
+    except ImportError:
+        pass
+
+
+if __name__ == '__main__':
+    main()
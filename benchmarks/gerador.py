@@ -0,0 +1,174 @@
+"""
+Gerador de romaneios sintéticos para os benchmarks.
+
+Monta planilhas no formato do romaneio da Shopee (Letra, Sequence, Total
+Distance, Address, Neighborhood, Stop) com endereços de Fortaleza, códigos de
+gaiola no padrão A-1..Z-250, cerca de 90 pacotes por gaiola e um quarto dos
+pacotes repetindo o endereço da parada anterior. Também gera a planilha de
+entrada do Circuit Pro (com GPS), com casadinhas escritas de formas diferentes.
+
+Tudo é determinístico pela semente. Os .xlsx ficam em cache na pasta
+temporária, pois escrever 500 mil linhas leva mais tempo que lê-las.
+
+Uso: python benchmarks/gerador.py LINHAS [--abas N] [--semente S] [--saida arquivo.xlsx]
+"""
+import argparse
+import os
+import random
+import shutil
+import string
+import tempfile
+from typing import List
+
+import pandas as pd
+import xlsxwriter
+
+PASTA_DADOS = os.path.join(tempfile.gettempdir(), 'filtro_rotas_bench')
+CABECALHO = ['Letra', 'Sequence', 'Total Distance', 'Address', 'Neighborhood', 'Stop']
+PACOTES_POR_GAIOLA = 90
+GAIOLAS_POR_LETRA = 250
+
+LOGRADOUROS = ['Rua', 'Avenida', 'Travessa', 'Rua', 'Rua']
+NOMES_RUAS = [
+    'Barão de Studart', 'Bezerra de Menezes', 'Washington Soares', 'Padre Valdevino', 'Santos Dumont',
+    'Costa Barros', 'Heráclito Graça', 'Nogueira Acioli', 'Godofredo Maciel', 'Joaquim Nabuco',
+    'Treze de Maio', 'Monsenhor Bruno', 'Dom Luís', 'Tibúrcio Cavalcante', 'Desembargador Moreira',
+    'Coronel Jucá', 'Frei Cirilo', 'Antônio Fiúza', 'Augusto dos Anjos', 'Oscar Bezerra',
+    'Jovita Feitosa', 'Carlos Vasconcelos', 'José Bastos', 'General Sampaio', 'da Universidade',
+    'Pinto Madeira', 'Abolição', 'Ildefonso Albano', 'Aguanambi', 'Senador Pompeu',
+    'jornalista Antônio pontes tavares', 'Imperador', 'Tristão Gonçalves', 'Pedro Pereira', 'Rui Barbosa',
+]
+COMPLEMENTOS = [
+    '', '', '', '', 'Apto 101', 'Casa', 'Casa B', 'Bloco 2 Apto 304', 'Sala 1205', 'Fundos',
+    'Loja 3', 'Farmácia Pague Menos', 'Mercadinho São José', 'Oficina do Zé', 'Loteria',
+    'próximo ao mercado', 'Condomínio Jardim das Flores', 'Escola Municipal', 'Padaria Pão de Ouro',
+]
+BAIRROS = [
+    'Aldeota', 'Meireles', 'Messejana', 'Maraponga', 'Jardim Cearense', 'Parangaba', 'Montese',
+    'Benfica', 'Fátima', 'Centro', 'Cocó', 'Papicu', 'Varjota', 'Mucuripe', 'Cambeba', 'Edson Queiroz',
+    'Cidade dos Funcionários', 'Passaré', 'Mondubim', 'Antônio Bezerra', 'Barra do Ceará',
+    'Conjunto Ceará', 'Granja Portugal', 'Bom Jardim', 'Henrique Jorge', 'Joquei Clube',
+    'Parquelândia', 'Rodolfo Teófilo', 'Serrinha', 'Vila União',
+]
+# Limites aproximados de Fortaleza
+LAT_MIN, LAT_MAX, LON_MIN, LON_MAX = -3.86, -3.70, -38.64, -38.45
+
+
+def _ruas(rng: random.Random, quantidade: int) -> List[str]:
+    ruas = [f"{tipo} {nome}" for nome in NOMES_RUAS for tipo in dict.fromkeys(LOGRADOUROS)]
+    # Conjuntos habitacionais numerados ampliam o vocabulário nos romaneios grandes
+    while len(ruas) < quantidade:
+        ruas.append(f"Rua {rng.randint(1, 300)} Conjunto {rng.choice(BAIRROS)}")
+    return ruas
+
+
+def _grafia_bairro(rng: random.Random, bairro: str) -> str:
+    # Como nos arquivos reais: às vezes minúsculo, maiúsculo ou sem acento
+    sorteio = rng.random()
+    if sorteio < 0.05:
+        return bairro.lower()
+    if sorteio < 0.08:
+        return bairro.upper()
+    if sorteio < 0.12:
+        return bairro.translate(str.maketrans('áâãéêíóôõúçÁÉÍÓÚ', 'aaaeeiooouçAEIOU'))
+    return bairro
+
+
+def gaiolas(quantidade: int) -> List[str]:
+    letras = string.ascii_uppercase
+    return [f"{letras[i // GAIOLAS_POR_LETRA]}-{i % GAIOLAS_POR_LETRA + 1}" for i in range(quantidade)]
+
+
+def linhas_romaneio(linhas: int, semente: int = 0) -> List[list]:
+    """Linhas de dados (sem cabeçalho), agrupadas por gaiola como no arquivo real."""
+    rng = random.Random(semente)
+    codigos = gaiolas(max(1, round(linhas / PACOTES_POR_GAIOLA)))
+    ruas = _ruas(rng, max(200, linhas // 40))
+    tamanhos = [linhas // len(codigos)] * len(codigos)
+    for i in range(linhas - sum(tamanhos)):
+        tamanhos[i] += 1
+    dados = []
+    for codigo, n in zip(codigos, tamanhos):
+        bairros = rng.sample(BAIRROS, rng.randint(1, 3))
+        ruas_gaiola = rng.sample(ruas, min(len(ruas), max(3, n // 6)))
+        distancia = f"{rng.uniform(20, 80):.3f}km"
+        parada, endereco, bairro = 0, None, None
+        for seq in range(1, n + 1):
+            if endereco is None or rng.random() > 0.25:
+                parada += 1
+                complemento = rng.choice(COMPLEMENTOS)
+                endereco = f"{rng.choice(ruas_gaiola)}, {rng.randint(1, 3000)}" + (f", {complemento}" if complemento else '')
+                bairro = _grafia_bairro(rng, rng.choice(bairros))
+            dados.append([codigo, seq, distancia, endereco, bairro, parada])
+    return dados
+
+
+def escrever_romaneio(caminho: str, linhas: int, abas: int = 1, semente: int = 0) -> str:
+    """Grava o romaneio com as gaiolas repartidas entre `abas` abas, cada uma com cabeçalho."""
+    dados = linhas_romaneio(linhas, semente)
+    # Corta só entre gaiolas, para que cada gaiola fique inteira numa aba
+    inicios = [i for i in range(len(dados)) if i == 0 or dados[i][0] != dados[i - 1][0]]
+    cortes = [inicios[round(k * len(inicios) / abas)] for k in range(abas)] + [len(dados)]
+    temporario = caminho + '.tmp'
+    wb = xlsxwriter.Workbook(temporario, {'constant_memory': True})
+    for k in range(abas):
+        ws = wb.add_worksheet(f"Romaneio {k + 1}")
+        ws.write_row(0, 0, CABECALHO)
+        for r, linha in enumerate(dados[cortes[k]:cortes[k + 1]], start=1):
+            ws.write_row(r, 0, linha)
+    wb.close()
+    shutil.move(temporario, caminho)
+    return caminho
+
+
+def romaneio(linhas: int, abas: int = 1, semente: int = 0) -> str:
+    """Caminho do romaneio sintético, gerado só na primeira vez."""
+    os.makedirs(PASTA_DADOS, exist_ok=True)
+    caminho = os.path.join(PASTA_DADOS, f"romaneio_{linhas}_{abas}abas_s{semente}.xlsx")
+    if not os.path.exists(caminho):
+        escrever_romaneio(caminho, linhas, abas, semente)
+    return caminho
+
+
+def planilha_circuit(linhas: int, semente: int = 0) -> pd.DataFrame:
+    """Entrada do Circuit Pro: Sequence, Address, Latitude, Longitude.
+
+    Parte das paradas se repete (mesmo endereço) e parte reaparece com outra
+    grafia da rua a poucos metros, que só o modo espacial junta.
+    """
+    rng = random.Random(semente)
+    ruas = _ruas(rng, max(200, linhas // 40))
+    origem = {r: (rng.uniform(LAT_MIN, LAT_MAX), rng.uniform(LON_MIN, LON_MAX), rng.uniform(-1, 1), rng.uniform(-1, 1))
+              for r in ruas}
+    registros, anterior = [], None
+    for seq in range(1, linhas + 1):
+        sorteio = rng.random()
+        if anterior is not None and sorteio < 0.2:
+            rua, numero = anterior
+        else:
+            rua, numero = rng.choice(ruas), rng.randint(1, 3000)
+        lat0, lon0, dlat, dlon = origem[rua]
+        lat, lon = lat0 + numero * 2e-6 * dlat, lon0 + numero * 2e-6 * dlon
+        grafia = rua.upper() if anterior is not None and 0.2 <= sorteio < 0.25 else rua
+        registros.append({'Sequence': seq, 'Address': f"{grafia}, {numero}, Fortaleza",
+                          'Latitude': round(lat + rng.uniform(-2e-5, 2e-5), 6),
+                          'Longitude': round(lon + rng.uniform(-2e-5, 2e-5), 6)})
+        anterior = (rua, numero)
+    return pd.DataFrame(registros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um romaneio sintético.")
+    parser.add_argument('linhas', type=int)
+    parser.add_argument('--abas', type=int, default=1)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="arquivo .xlsx (padrão: cache na pasta temporária)")
+    args = parser.parse_args()
+    if args.saida:
+        print(escrever_romaneio(args.saida, args.linhas, args.abas, args.semente))
+    else:
+        print(romaneio(args.linhas, args.abas, args.semente))
+
+
+if __name__ == '__main__':
+    main()
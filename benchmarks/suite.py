@@ -0,0 +1,204 @@
+"""
+Suíte de benchmarks dos caminhos quentes sobre romaneios sintéticos de
+tamanho crescente (benchmarks/gerador.py).
+
+Etapas medidas por tamanho: carga do Excel, carga pelo cache em disco,
+busca de gaiola no índice, rota de uma gaiola (processar_gaiola_unica),
+resumo de todas as gaiolas, Circuit Pro (modo adjacente e espacial), Radar e
+exportação das planilhas em ZIP. Cada etapa guarda o melhor tempo de
+`--repeticoes` execuções (romaneios acima de 10 mil linhas rodam uma vez só).
+
+O resultado vai para benchmarks/resultados/<data>_<commit>.json; dois desses
+arquivos comparados com --comparar mostram a razão de tempo por etapa e
+marcam as regressões acima da tolerância.
+
+Uso: python benchmarks/suite.py [--tamanhos 1000 10000 100000 500000] [--abas N]
+         [--repeticoes N] [--saida arquivo.json]
+     python benchmarks/suite.py --comparar base.json novo.json [--tolerancia 0.10]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# O cache em disco do usuário não pode mascarar a leitura do Excel
+os.environ['FILTRO_ROTAS_CACHE_DISCO_MB'] = '0'
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gerador  # noqa: E402
+from filtro_rotas import cache_disco, exportacao, manifesto as modulo_manifesto  # noqa: E402
+from filtro_rotas.circuit import MODO_ADJACENTE, MODO_ESPACIAL, gerar_planilha_otimizada_circuit_pro  # noqa: E402
+from filtro_rotas.lote import resumir_gaiolas  # noqa: E402
+from filtro_rotas.manifesto import Manifesto  # noqa: E402
+from filtro_rotas.radar import rastrear_gaiolas  # noqa: E402
+from filtro_rotas.rota import processar_gaiola_unica  # noqa: E402
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 500_000]
+AMOSTRA_GAIOLAS = 50
+BAIRROS_RADAR = ['Maraponga', 'Jardim Cearense', 'Messejana']
+
+
+def cronometrar(func: Callable, repeticoes: int) -> float:
+    """Melhor tempo (s) de `repeticoes` execuções."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def _amostra(gaiolas: List[str]) -> List[str]:
+    passo = max(1, len(gaiolas) // AMOSTRA_GAIOLAS)
+    return gaiolas[::passo][:AMOSTRA_GAIOLAS]
+
+
+def medir_tamanho(linhas: int, abas: int, repeticoes: int) -> Dict[str, Dict]:
+    """{etapa: {'segundos', ...detalhes}} para um romaneio de `linhas` pacotes."""
+    caminho = gerador.romaneio(linhas, abas)
+    with open(caminho, 'rb') as f:
+        arquivo_bytes = f.read()
+    etapas = {}
+
+    def registrar(nome, func, **detalhes):
+        etapas[nome] = {'segundos': cronometrar(func, repeticoes), **detalhes}
+        print(f"  {nome:<22} {etapas[nome]['segundos']:9.4f}s")
+
+    registrar('carga_excel', lambda: Manifesto.de_bytes(arquivo_bytes), bytes=len(arquivo_bytes))
+    m = Manifesto.de_bytes(arquivo_bytes)
+
+    if cache_disco.pa is not None:
+        with tempfile.TemporaryDirectory() as pasta:
+            modulo_manifesto.CACHE_DISCO = cache_disco.CacheDisco(pasta, 1 << 40)
+            try:
+                Manifesto.de_bytes(arquivo_bytes, m.hash)
+                registrar('carga_cache_disco', lambda: Manifesto.de_bytes(arquivo_bytes, m.hash))
+            finally:
+                modulo_manifesto.CACHE_DISCO = None
+
+    gaiolas = m.indice.gaiolas
+    registrar('localizar_gaiola', lambda: [m.indice.localizar(g) for g in gaiolas], consultas=len(gaiolas))
+
+    amostra = _amostra(gaiolas)
+
+    def rotas():
+        for g in amostra:
+            loc = m.indice.localizar(g)
+            processar_gaiola_unica(m.abas[loc.aba], g, loc.coluna, loc.linhas)
+
+    registrar('processar_gaiola_unica', rotas, gaiolas=len(amostra))
+    registrar('resumo_lote', lambda: resumir_gaiolas(m), gaiolas=len(gaiolas))
+    registrar('radar', lambda: rastrear_gaiolas(m, BAIRROS_RADAR), bairros=len(BAIRROS_RADAR))
+
+    df_circuit = gerador.planilha_circuit(linhas)
+    registrar('circuit_adjacente', lambda: gerar_planilha_otimizada_circuit_pro(df_circuit, MODO_ADJACENTE))
+    registrar('circuit_espacial', lambda: gerar_planilha_otimizada_circuit_pro(df_circuit, MODO_ESPACIAL))
+
+    dfs = {}
+    for g in amostra:
+        loc = m.indice.localizar(g)
+        dfs[g] = processar_gaiola_unica(m.abas[loc.aba], g, loc.coluna, loc.linhas)['dataframe']
+
+    def exportar():
+        exportacao.CACHE_PLANILHAS.limpar()
+        exportacao.gerar_zip_gaiolas(m.hash, amostra, dfs.get, max_workers=1)
+
+    registrar('exportacao_excel', exportar, gaiolas=len(amostra), motor=exportacao.MOTOR_EXCEL)
+    return etapas
+
+
+def _commit() -> str:
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip()
+        return saida + ('-sujo' if sujo else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+
+def executar(tamanhos: List[int], abas: int, repeticoes: int) -> Dict:
+    resultado = {
+        'commit': _commit(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'abas': abas,
+        'tamanhos': {},
+    }
+    for linhas in tamanhos:
+        print(f"{linhas} linhas ({abas} aba(s)):")
+        reps = repeticoes if linhas <= 10_000 else 1
+        resultado['tamanhos'][str(linhas)] = medir_tamanho(linhas, abas, reps)
+    return resultado
+
+
+def comparar(base: Dict, novo: Dict, tolerancia: float) -> int:
+    """Imprime a razão novo/base por etapa; devolve o número de regressões."""
+    print(f"base {base['commit']} ({base['data']})  x  novo {novo['commit']} ({novo['data']})")
+    regressoes = 0
+    for linhas, etapas in novo['tamanhos'].items():
+        etapas_base = base['tamanhos'].get(linhas)
+        if etapas_base is None:
+            continue
+        print(f"{linhas} linhas:")
+        for nome, dados in etapas.items():
+            if nome not in etapas_base:
+                continue
+            antes, depois = etapas_base[nome]['segundos'], dados['segundos']
+            razao = depois / antes if antes > 0 else float('inf')
+            marca = ''
+            if razao > 1 + tolerancia:
+                marca = '  <-- REGRESSÃO'
+                regressoes += 1
+            print(f"  {nome:<22} {antes:9.4f}s -> {depois:9.4f}s  x{razao:5.2f}{marca}")
+    return regressoes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes em romaneios sintéticos.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--abas', type=int, default=1)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', help="arquivo JSON (padrão: benchmarks/resultados/<data>_<commit>.json)")
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'))
+    parser.add_argument('--tolerancia', type=float, default=0.10, help="aumento relativo tolerado (padrão 10%%)")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0], encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.comparar[1], encoding='utf-8') as f:
+            novo = json.load(f)
+        return 1 if comparar(base, novo, args.tolerancia) else 0
+
+    resultado = executar(args.tamanhos, args.abas, args.repeticoes)
+    saida = args.saida
+    if saida is None:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        carimbo = datetime.now().strftime('%Y%m%d-%H%M%S')
+        saida = os.path.join(PASTA_RESULTADOS, f"{carimbo}_{resultado['commit']}.json")
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"Resultados em {saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
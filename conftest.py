@@ -0,0 +1,38 @@
+import io
+import os
+import tempfile
+from typing import Callable, List, Optional
+
+import pandas as pd
+import pytest
+
+# Os testes não devem gravar no cache em disco do usuário
+os.environ.setdefault('FILTRO_ROTAS_CACHE_DISCO_DIR', tempfile.mkdtemp(prefix='filtro_rotas_teste_'))
+
+
+def _endereco_padrao(i: int) -> str:
+    return f"Rua Central {i % 5}, {i % 4}"
+
+
+def montar_romaneio(gaiolas: List[str], endereco: Callable[[int], str] = _endereco_padrao,
+                    ajuste: Optional[Callable[[list], None]] = None, caminho=None) -> bytes:
+    """Romaneio sintético no layout da Shopee: uma linha por pacote, gaiola `gaiolas[i]` e endereço `endereco(i)`.
+
+    `ajuste(linhas)` altera as linhas (cabeçalho incluído) antes de gravar; com `caminho`, grava também no arquivo.
+    """
+    linhas = [['Letra', 'Sequence', 'Address', 'Neighborhood']]
+    for i, gaiola in enumerate(gaiolas):
+        linhas.append([gaiola, i + 1, endereco(i), 'Centro'])
+    if ajuste:
+        ajuste(linhas)
+    buf = io.BytesIO()
+    pd.DataFrame(linhas).to_excel(buf, header=False, index=False)
+    if caminho is not None:
+        with open(caminho, 'wb') as f:
+            f.write(buf.getvalue())
+    return buf.getvalue()
+
+
+@pytest.fixture
+def romaneio():
+    return montar_romaneio
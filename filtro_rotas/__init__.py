@@ -0,0 +1,17 @@
+"""Núcleo de processamento do Filtro de Rotas (sem dependência do Streamlit)."""
+from .cache import CacheLRU
+from .indice import IndiceGaiolas, Localizacao
+from .radar import IndiceBairros
+from .manifesto import Manifesto, hash_conteudo, ler_abas_excel, ler_abas_romaneio, obter_manifesto
+
+__all__ = [
+    'CacheLRU',
+    'IndiceBairros',
+    'IndiceGaiolas',
+    'Localizacao',
+    'Manifesto',
+    'hash_conteudo',
+    'ler_abas_excel',
+    'ler_abas_romaneio',
+    'obter_manifesto',
+]
@@ -0,0 +1,24 @@
+"""Linha de comando do Filtro de Rotas.
+
+    python -m filtro_rotas rotas ENTRADA [ENTRADA...] --saida PASTA [...]   # planilhas de rota em lote
+    python -m filtro_rotas cache aquecer PASTA [PASTA...]   # grava os romaneios no cache em disco
+    python -m filtro_rotas cache info | limpar
+    python -m filtro_rotas pois importar EXTRATO [EXTRATO...] | info | atualizar LAT LON   # base local de POIs
+"""
+import sys
+
+from . import cache_disco, lote_arquivos, poi
+
+COMANDOS = {'rotas': lote_arquivos.main, 'cache': cache_disco.main, 'pois': poi.main}
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMANDOS:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    return COMANDOS[argv[0]](argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Armazém dos arquivos gerados para download e pegada de memória de cada sessão.
+
+Cada blob (o ZIP com as planilhas, por exemplo) é guardado uma única vez no
+processo, pelo hash do conteúdo: sessões que geram o mesmo arquivo dividem a
+mesma cópia e o `st.session_state` guarda só uma `RefBlob`. Blobs menores que
+LIMIAR_DISCO_KB ficam num LRU em memória; os maiores vão para uma pasta
+temporária e vão para o download como arquivo aberto, então só ocupam RAM
+enquanto o download é servido. A pasta tem limite de tamanho e descarta os usados há
+mais tempo; um blob descartado volta como None e quem o pediu gera de novo.
+
+`pegada_sessao` estima quanto cada chave da sessão ocupa, separando o que é só
+dela do que é compartilhado entre sessões (manifesto, blobs) ou está em disco.
+"""
+import glob
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .cache import CacheLRU
+from .manifesto import Manifesto
+
+logger = logging.getLogger("filtro_rotas")
+
+PASTA_BLOBS = os.environ.get("FILTRO_ROTAS_BLOBS_DIR", os.path.join(tempfile.gettempdir(), "filtro_rotas_blobs"))
+LIMITE_BLOBS_MEMORIA_MB = int(os.environ.get("FILTRO_ROTAS_BLOBS_MEMORIA_MB", "64"))
+# Limite da pasta de blobs (MB); 0 deixa tudo em memória
+LIMITE_BLOBS_DISCO_MB = int(os.environ.get("FILTRO_ROTAS_BLOBS_DISCO_MB", "2048"))
+LIMIAR_DISCO_KB = int(os.environ.get("FILTRO_ROTAS_BLOBS_LIMIAR_KB", "512"))
+
+SESSAO, COMPARTILHADO, EM_DISCO, DESCARTADO = 'sessão', 'compartilhado', 'disco', 'descartado'
+
+
+@dataclass(frozen=True)
+class RefBlob:
+    chave: str
+    tamanho: int
+
+
+class ArmazemBlobs:
+    def __init__(self, pasta: str, limite_memoria_bytes: int, limite_disco_bytes: int, limiar_disco_bytes: int):
+        self.pasta = pasta
+        self.limite_disco_bytes = limite_disco_bytes
+        self.limiar_disco_bytes = limiar_disco_bytes
+        self._memoria = CacheLRU(limite_memoria_bytes, medir=len)
+        # {chave: tamanho} dos blobs em disco, do usado há mais tempo ao mais recente
+        self._disco: 'OrderedDict[str, int]' = OrderedDict()
+        self._total_disco = 0
+        self._lock = threading.Lock()
+        self._pasta_lida = False
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.pasta, f"{chave}.bin")
+
+    def _ler_pasta(self) -> None:
+        # Os nomes são o hash do conteúdo: o que ficou de uma execução anterior continua válido
+        if self._pasta_lida:
+            return
+        self._pasta_lida = True
+        itens = []
+        for caminho in glob.glob(os.path.join(self.pasta, '*.bin')):
+            try:
+                itens.append((os.path.getmtime(caminho), os.path.basename(caminho)[:-4], os.path.getsize(caminho)))
+            except OSError:
+                continue
+        for _, chave, tamanho in sorted(itens):
+            self._disco[chave] = tamanho
+            self._total_disco += tamanho
+
+    def guardar(self, dados: bytes) -> RefBlob:
+        """Guarda `dados` (uma vez por conteúdo) e devolve a referência para a sessão."""
+        if len(dados) >= self.limiar_disco_bytes and self.limite_disco_bytes > 0:
+            return self.guardar_partes(lambda: (dados,))
+        return self._guardar_memoria(dados)
+
+    def _guardar_memoria(self, dados: bytes) -> RefBlob:
+        ref = RefBlob(hashlib.blake2b(dados, digest_size=16).hexdigest(), len(dados))
+        if ref.chave not in self._memoria:
+            self._memoria.guardar(ref.chave, bytes(dados))
+        return ref
+
+    def guardar_partes(self, gerar: Callable[[], Iterable[bytes]]) -> RefBlob:
+        """Como `guardar`, consumindo os blocos de `gerar()`: passando do limiar eles vão direto para o disco.
+
+        Sem espaço em disco, `gerar` é chamado de novo e o blob fica no LRU em memória.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        inicio: list = []
+        tamanho, f = 0, None
+        temporario = os.path.join(self.pasta, f".tmp-{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}")
+        try:
+            for parte in gerar():
+                h.update(parte)
+                tamanho += len(parte)
+                if f is not None:
+                    f.write(parte)
+                    continue
+                inicio.append(parte)
+                if tamanho >= self.limiar_disco_bytes and self.limite_disco_bytes > 0:
+                    os.makedirs(self.pasta, exist_ok=True)
+                    f = open(temporario, 'wb')
+                    f.writelines(inicio)
+                    inicio = []
+            if f is None:
+                return self._guardar_memoria(b''.join(inicio))
+            f.close()
+            ref = RefBlob(h.hexdigest(), tamanho)
+            with self._lock:
+                self._ler_pasta()
+                if ref.chave in self._disco and os.path.exists(self._caminho(ref.chave)):
+                    os.remove(temporario)
+                else:
+                    os.replace(temporario, self._caminho(ref.chave))
+                    if ref.chave not in self._disco:
+                        self._total_disco += ref.tamanho
+                    self._disco[ref.chave] = ref.tamanho
+                self._disco.move_to_end(ref.chave)
+                self._aplicar_limite()
+            return ref
+        except OSError:
+            logger.warning("Sem espaço para o blob em disco; mantendo em memória", exc_info=True)
+            self._remover_temporario(f, temporario)
+            return self._guardar_memoria(b''.join(gerar()))
+        except BaseException:
+            self._remover_temporario(f, temporario)
+            raise
+
+    @staticmethod
+    def _remover_temporario(f, temporario: str) -> None:
+        if f is not None:
+            f.close()
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+
+    def ler(self, ref: RefBlob) -> Union[bytes, BinaryIO, None]:
+        """Conteúdo para o `st.download_button`, sem cópia: os bytes em memória ou o arquivo aberto.
+
+        None se o blob foi descartado. O arquivo é lido uma vez por quem o recebe e
+        fecha quando deixa de ser referenciado.
+        """
+        dados = self._memoria.obter(ref.chave)
+        if dados is not None:
+            return dados
+        with self._lock:
+            self._ler_pasta()
+            if ref.chave not in self._disco:
+                return None
+            self._disco.move_to_end(ref.chave)
+        try:
+            return open(self._caminho(ref.chave), 'rb')
+        except OSError:
+            with self._lock:
+                self._esquecer(ref.chave)
+            return None
+
+    def local(self, ref: RefBlob) -> str:
+        if ref.chave in self._memoria:
+            return COMPARTILHADO
+        with self._lock:
+            self._ler_pasta()
+            return EM_DISCO if ref.chave in self._disco else DESCARTADO
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            self._ler_pasta()
+            return {'blobs_memoria': len(self._memoria), 'bytes_memoria': self._memoria.bytes_usados,
+                    'blobs_disco': len(self._disco), 'bytes_disco': self._total_disco}
+
+    def limpar(self) -> None:
+        self._memoria.limpar()
+        with self._lock:
+            self._ler_pasta()
+            for chave in list(self._disco):
+                self._esquecer(chave)
+
+    def _esquecer(self, chave: str) -> None:
+        self._total_disco -= self._disco.pop(chave, 0)
+        try:
+            os.remove(self._caminho(chave))
+        except OSError:
+            pass
+
+    def _aplicar_limite(self) -> None:
+        # Um download com o arquivo já aberto continua válido depois do remove (no Linux, ele só some quando fecha)
+        while self._total_disco > self.limite_disco_bytes and len(self._disco) > 1:
+            chave = next(iter(self._disco))
+            logger.info("Armazém: blob %s descartado (%d bytes)", chave[:12], self._disco[chave])
+            self._esquecer(chave)
+
+
+ARMAZEM = ArmazemBlobs(PASTA_BLOBS, LIMITE_BLOBS_MEMORIA_MB * 1024 * 1024,
+                       LIMITE_BLOBS_DISCO_MB * 1024 * 1024, LIMIAR_DISCO_KB * 1024)
+
+
+# --- PEGADA DA SESSÃO ---
+def tamanho_valor(valor: Any, _vistos: Optional[set] = None) -> int:
+    """Estimativa em bytes do que `valor` ocupa, seguindo dicts, listas e dataclasses."""
+    vistos = _vistos if _vistos is not None else set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_valor(k, vistos) + tamanho_valor(v, vistos) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamanho_valor(v, vistos) for v in valor)
+    if is_dataclass(valor) and not isinstance(valor, type):
+        return sys.getsizeof(valor) + sum(tamanho_valor(getattr(valor, f.name), vistos) for f in fields(valor))
+    return sys.getsizeof(valor)
+
+
+def _classificar(valor: Any, armazem: ArmazemBlobs) -> tuple:
+    """(onde está, bytes) de um valor da sessão."""
+    # Uma RefBlob solta ou dentro de um resultado (o ZIP com `dados` no armazém, por exemplo)
+    refs = [valor] if isinstance(valor, RefBlob) else \
+        [getattr(valor, f.name) for f in fields(valor) if isinstance(getattr(valor, f.name), RefBlob)] \
+        if is_dataclass(valor) and not isinstance(valor, type) else []
+    if refs:
+        return armazem.local(refs[0]), refs[0].tamanho
+    if isinstance(valor, Manifesto):
+        # Um por romaneio no processo, dividido por todas as sessões que enviaram o mesmo arquivo
+        return COMPARTILHADO, valor.nbytes
+    if hasattr(valor, 'file_id') and hasattr(valor, 'size'):
+        # Arquivo do file_uploader: os bytes ficam com o widget enquanto o arquivo estiver na tela
+        return SESSAO, int(valor.size)
+    return SESSAO, tamanho_valor(valor)
+
+
+def pegada_sessao(estado: Mapping[str, Any], armazem: ArmazemBlobs = None) -> pd.DataFrame:
+    """Uma linha por chave da sessão: tipo, onde o valor está e quantos bytes ocupa (maiores primeiro)."""
+    armazem = armazem if armazem is not None else ARMAZEM
+    linhas = []
+    for chave, valor in estado.items():
+        onde, tamanho = _classificar(valor, armazem)
+        linhas.append({'Chave': str(chave), 'Tipo': type(valor).__name__, 'Onde': onde, 'Bytes': tamanho})
+    df = pd.DataFrame(linhas, columns=['Chave', 'Tipo', 'Onde', 'Bytes'])
+    return df.sort_values('Bytes', ascending=False, ignore_index=True)
@@ -0,0 +1,93 @@
+"""Cache LRU thread-safe com limite de memória, compartilhado entre sessões."""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class CacheLRU:
+    """Guarda até `limite_bytes` de valores, descartando os menos usados.
+
+    `medir` estima o tamanho de cada valor em bytes. Um valor maior que o
+    limite inteiro é devolvido ao chamador, mas não fica no cache.
+    """
+
+    def __init__(self, limite_bytes: int, medir: Callable[[Any], int]):
+        self.limite_bytes = limite_bytes
+        self._medir = medir
+        self._itens: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._tamanhos: Dict[Hashable, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._locks_chave: Dict[Hashable, threading.Lock] = {}
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        with self._lock:
+            return chave in self._itens
+
+    @property
+    def bytes_usados(self) -> int:
+        return self._total
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        with self._lock:
+            if chave not in self._itens:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return self._itens[chave]
+
+    def guardar(self, chave: Hashable, valor: Any) -> None:
+        tamanho = self._medir(valor)
+        with self._lock:
+            self._remover(chave)
+            if tamanho > self.limite_bytes:
+                return
+            self._itens[chave] = valor
+            self._tamanhos[chave] = tamanho
+            self._total += tamanho
+            while self._total > self.limite_bytes:
+                antiga = next(iter(self._itens))
+                self._remover(antiga)
+
+    def descartar(self, chave: Hashable) -> None:
+        with self._lock:
+            self._remover(chave)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._tamanhos.clear()
+            self._total = 0
+
+    def obter_ou_calcular(self, chave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Devolve o valor em cache ou o calcula uma única vez.
+
+        Sessões concorrentes pedindo a mesma chave esperam o primeiro cálculo
+        em vez de repeti-lo.
+        """
+        valor = self.obter(chave)
+        if valor is not None:
+            return valor
+        with self._lock:
+            lock_chave = self._locks_chave.setdefault(chave, threading.Lock())
+        with lock_chave:
+            with self._lock:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    return self._itens[chave]
+            valor = calcular()
+            self.guardar(chave, valor)
+        with self._lock:
+            self._locks_chave.pop(chave, None)
+        return valor
+
+    def _remover(self, chave: Hashable) -> None:
+        if chave in self._itens:
+            del self._itens[chave]
+            self._total -= self._tamanhos.pop(chave)
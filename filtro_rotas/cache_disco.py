@@ -0,0 +1,305 @@
+"""Cache em disco das abas já lidas, em Arrow (IPC/Feather sem compressão).
+
+Cada romaneio vira uma pasta `<hash>/` com um arquivo `.arrow` por aba, o
+índice de gaiolas (`indice.arrow`) e um `manifesto.json` com os nomes das
+abas, os rótulos e os tipos das colunas. Um novo upload do mesmo arquivo,
+numa nova sessão ou depois de reiniciar o servidor, lê tudo por memory-map
+em vez de abrir o Excel e indexar as gaiolas de novo.
+
+Colunas `object` com tipos misturados (cabeçalho em texto e números abaixo,
+como o `pd.read_excel(header=None)` devolve) não cabem numa coluna Arrow: são
+gravadas como texto com uma coluna de marcação do tipo de cada célula e
+reconstruídas valor a valor na leitura.
+
+O tamanho total é limitado; passando do limite, saem os romaneios usados há
+mais tempo. Sem pyarrow o cache fica desligado.
+
+Uso: python -m filtro_rotas cache aquecer PASTA [PASTA...] | info | limpar
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .indice import IndiceGaiolas
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger("filtro_rotas")
+
+# Mudou o leitor ou o formato gravado: aumente para invalidar o que já está em disco
+# 2: a leitura colunar deixou de trazer a coluna 'LPN' como gaiola
+# 3: ela volta a trazer (a gaiola do Radar), e o cabeçalho é a primeira linha com 2+ termos
+VERSAO_FORMATO = 3
+PASTA_CACHE_DISCO = os.environ.get(
+    "FILTRO_ROTAS_CACHE_DISCO_DIR", os.path.join(os.path.expanduser("~"), ".cache", "filtro_rotas", "romaneios"))
+# Limite do cache em disco (MB); 0 desliga
+LIMITE_CACHE_DISCO_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_DISCO_MB", "1024"))
+ARQUIVO_META = 'manifesto.json'
+ARQUIVO_INDICE = 'indice.arrow'
+
+# Marcação do tipo de cada célula nas colunas mistas
+TAG_NULO, TAG_TEXTO, TAG_INT, TAG_FLOAT, TAG_BOOL = range(5)
+
+
+class TipoNaoSuportado(Exception):
+    """Coluna com valores que o formato em disco não representa."""
+
+
+# --- CODIFICAÇÃO DAS COLUNAS ---
+def _codificar_misto(serie: pd.Series) -> tuple:
+    tags = np.empty(len(serie), dtype=np.int8)
+    textos: List[Optional[str]] = []
+    for i, v in enumerate(serie.tolist()):
+        if isinstance(v, str):
+            tags[i], t = TAG_TEXTO, v
+        elif isinstance(v, (bool, np.bool_)):
+            tags[i], t = TAG_BOOL, '1' if v else '0'
+        elif isinstance(v, (int, np.integer)):
+            tags[i], t = TAG_INT, str(int(v))
+        elif isinstance(v, (float, np.floating)) and not np.isnan(v):
+            tags[i], t = TAG_FLOAT, repr(float(v))
+        elif v is None or (isinstance(v, float) and np.isnan(v)):
+            tags[i], t = TAG_NULO, None
+        else:
+            raise TipoNaoSuportado(type(v).__name__)
+        textos.append(t)
+    return pa.array(textos, type=pa.large_string()), pa.array(tags)
+
+
+def _decodificar_misto(textos: pa.Array, tags: pa.Array) -> pd.Series:
+    conversores = {TAG_TEXTO: str, TAG_INT: int, TAG_FLOAT: float, TAG_BOOL: lambda t: t == '1'}
+    valores = [conversores[tag](t) if tag != TAG_NULO else np.nan
+               for t, tag in zip(textos.to_pylist(), tags.to_numpy(zero_copy_only=False).tolist())]
+    return pd.Series(valores, dtype=object)
+
+
+def _gravar_aba(df: pd.DataFrame, caminho: str) -> List[Dict]:
+    campos, colunas = [], []
+    for i, rotulo in enumerate(df.columns):
+        serie = df[rotulo]
+        info = {'rotulo': rotulo.item() if isinstance(rotulo, np.generic) else rotulo, 'dtype': str(serie.dtype)}
+        if serie.dtype == object:
+            textos, tags = _codificar_misto(serie)
+            campos += [(f'c{i}', textos), (f'c{i}_tipo', tags)]
+            info['tipo'] = 'misto'
+        else:
+            campos.append((f'c{i}', pa.array(serie, from_pandas=True)))
+            info['tipo'] = 'categoria' if isinstance(serie.dtype, pd.CategoricalDtype) else 'nativo'
+        colunas.append(info)
+    tabela = pa.table(dict(campos)) if campos else pa.table({})
+    with pa.OSFile(caminho, 'wb') as f, ipc.new_file(f, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return colunas
+
+
+def _ler_aba(caminho: str, colunas: List[Dict]) -> pd.DataFrame:
+    with pa.memory_map(caminho, 'r') as mm:
+        tabela = ipc.open_file(mm).read_all()
+    dados = {}
+    for i, info in enumerate(colunas):
+        if info['tipo'] == 'misto':
+            serie = _decodificar_misto(tabela.column(f'c{i}').combine_chunks(), tabela.column(f'c{i}_tipo').combine_chunks())
+        else:
+            serie = tabela.column(f'c{i}').to_pandas()
+            if info['tipo'] == 'categoria':
+                serie = serie.cat.set_categories(serie.cat.categories.astype('str'))
+            elif str(serie.dtype) != info['dtype']:
+                serie = serie.astype(info['dtype'])
+        dados[i] = serie
+    df = pd.DataFrame(dados)
+    if colunas:
+        df.columns = [info['rotulo'] for info in colunas]
+    return df
+
+
+def _gravar_indice(indice: IndiceGaiolas, caminho: str) -> Optional[Dict]:
+    estado = indice.exportar()
+    if not all(isinstance(c, (int, np.integer)) for c in estado['colunas']):
+        return None
+    offsets = np.concatenate(([0], np.cumsum(estado['tamanhos']))).astype(np.int64)
+    tabela = pa.table({
+        'chave': pa.array(estado['chaves'], type=pa.large_string()),
+        'aba': pa.array(estado['abas'], type=pa.large_string()).dictionary_encode(),
+        'coluna': pa.array(estado['colunas'], type=pa.int64()),
+        'linhas': pa.LargeListArray.from_arrays(offsets, pa.array(estado['linhas'], type=pa.int64())),
+    })
+    with pa.OSFile(caminho, 'wb') as f, ipc.new_file(f, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return {'arquivo': ARQUIVO_INDICE, 'rotulos': estado['rotulos']}
+
+
+def _ler_indice(caminho: str, rotulos: Dict[str, str]) -> IndiceGaiolas:
+    with pa.memory_map(caminho, 'r') as mm:
+        tabela = ipc.open_file(mm).read_all().combine_chunks()
+    linhas = tabela.column('linhas').chunk(0) if tabela.num_rows else pa.array([], type=pa.large_list(pa.int64()))
+    return IndiceGaiolas.importar({
+        'chaves': tabela.column('chave').to_pylist(),
+        'abas': tabela.column('aba').to_pylist(),
+        'colunas': tabela.column('coluna').to_pylist(),
+        'tamanhos': np.diff(linhas.offsets.to_numpy()),
+        'linhas': linhas.values.to_numpy(),
+        'rotulos': rotulos,
+    })
+
+
+# --- CACHE ---
+class CacheDisco:
+    def __init__(self, pasta: str, limite_bytes: int):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+
+    def _entrada(self, chave: str) -> str:
+        return os.path.join(self.pasta, chave)
+
+    def carregar(self, chave: str) -> Optional[tuple]:
+        """(abas, índice de gaiolas ou None) gravados para este hash.
+
+        None se o romaneio não está no cache, é de outra versão do formato ou
+        está corrompido (nesse caso a pasta é apagada).
+        """
+        meta_caminho = os.path.join(self._entrada(chave), ARQUIVO_META)
+        try:
+            with open(meta_caminho, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('versao') != VERSAO_FORMATO:
+                shutil.rmtree(self._entrada(chave), ignore_errors=True)
+                return None
+            abas = {aba['nome']: _ler_aba(os.path.join(self._entrada(chave), aba['arquivo']), aba['colunas'])
+                    for aba in meta['abas']}
+            indice = None
+            if meta.get('indice'):
+                indice = _ler_indice(os.path.join(self._entrada(chave), meta['indice']['arquivo']),
+                                     meta['indice']['rotulos'])
+            os.utime(meta_caminho)  # marca o uso para o descarte por LRU
+            return abas, indice
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Cache em disco ilegível para %s; descartando", chave[:12], exc_info=True)
+            shutil.rmtree(self._entrada(chave), ignore_errors=True)
+            return None
+
+    def guardar(self, chave: str, abas: Dict[str, pd.DataFrame], indice: Optional[IndiceGaiolas] = None) -> bool:
+        """Grava as abas (numa pasta temporária renomeada no fim) e aplica o limite de tamanho."""
+        os.makedirs(self.pasta, exist_ok=True)
+        destino = self._entrada(chave)
+        if os.path.exists(destino):
+            return True
+        temporaria = f"{destino}.tmp-{os.getpid()}-{time.monotonic_ns()}"
+        try:
+            os.makedirs(temporaria)
+            meta = {'versao': VERSAO_FORMATO, 'abas': []}
+            for n, (nome, df) in enumerate(abas.items()):
+                arquivo = f'aba_{n:03d}.arrow'
+                colunas = _gravar_aba(df, os.path.join(temporaria, arquivo))
+                meta['abas'].append({'nome': nome, 'arquivo': arquivo, 'colunas': colunas})
+            if indice is not None:
+                meta['indice'] = _gravar_indice(indice, os.path.join(temporaria, ARQUIVO_INDICE))
+            with open(os.path.join(temporaria, ARQUIVO_META), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.rename(temporaria, destino)
+        except OSError:
+            # Outra sessão gravou o mesmo romaneio ao mesmo tempo (ou o disco falhou)
+            shutil.rmtree(temporaria, ignore_errors=True)
+            return os.path.exists(destino)
+        except Exception:
+            shutil.rmtree(temporaria, ignore_errors=True)
+            logger.warning("Romaneio %s não cabe no cache em disco", chave[:12], exc_info=True)
+            return False
+        self.aplicar_limite()
+        return True
+
+    def entradas(self) -> List[Dict]:
+        """Romaneios gravados, do usado há mais tempo ao mais recente."""
+        itens = []
+        for caminho in glob.glob(os.path.join(self.pasta, '*', ARQUIVO_META)):
+            pasta = os.path.dirname(caminho)
+            try:
+                tamanho = sum(e.stat().st_size for e in os.scandir(pasta) if e.is_file())
+                itens.append({'chave': os.path.basename(pasta), 'bytes': tamanho, 'uso': os.path.getmtime(caminho)})
+            except OSError:
+                continue
+        return sorted(itens, key=lambda e: e['uso'])
+
+    def aplicar_limite(self) -> None:
+        itens = self.entradas()
+        total = sum(e['bytes'] for e in itens)
+        for e in itens:
+            if total <= self.limite_bytes:
+                break
+            shutil.rmtree(self._entrada(e['chave']), ignore_errors=True)
+            total -= e['bytes']
+            logger.info("Cache em disco: romaneio %s descartado (%d bytes)", e['chave'][:12], e['bytes'])
+
+    def limpar(self) -> None:
+        for e in self.entradas():
+            shutil.rmtree(self._entrada(e['chave']), ignore_errors=True)
+
+
+CACHE_DISCO = CacheDisco(PASTA_CACHE_DISCO, LIMITE_CACHE_DISCO_MB * 1024 * 1024) \
+    if pa is not None and LIMITE_CACHE_DISCO_MB > 0 else None
+
+
+# --- CLI ---
+def aquecer(pastas: List[str]) -> int:
+    """Lê e grava no cache todos os .xlsx das pastas; devolve quantos foram gravados."""
+    from .manifesto import hash_conteudo, ler_abas_romaneio
+
+    gravados = 0
+    for pasta in pastas:
+        for caminho in sorted(glob.glob(os.path.join(pasta, '*.xlsx'))):
+            with open(caminho, 'rb') as f:
+                arquivo_bytes = f.read()
+            chave = hash_conteudo(arquivo_bytes)
+            if os.path.exists(os.path.join(CACHE_DISCO._entrada(chave), ARQUIVO_META)):
+                print(f"= {os.path.basename(caminho)} (já em cache)")
+                continue
+            inicio = time.perf_counter()
+            try:
+                abas = ler_abas_romaneio(arquivo_bytes)
+                ok = CACHE_DISCO.guardar(chave, abas, IndiceGaiolas(abas))
+            except Exception as e:
+                print(f"! {os.path.basename(caminho)}: {e}")
+                continue
+            gravados += ok
+            print(f"{'+' if ok else '!'} {os.path.basename(caminho)} ({time.perf_counter() - inicio:.2f}s)")
+    return gravados
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m filtro_rotas cache',
+                                     description="Cache em disco dos romaneios já lidos.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_aquecer = sub.add_parser('aquecer', help="grava no cache os .xlsx das pastas")
+    p_aquecer.add_argument('pastas', nargs='+')
+    sub.add_parser('info', help="lista os romaneios em cache")
+    sub.add_parser('limpar', help="apaga o cache")
+    args = parser.parse_args(argv)
+
+    if CACHE_DISCO is None:
+        print("Cache em disco desligado (sem pyarrow ou FILTRO_ROTAS_CACHE_DISCO_MB=0).", file=sys.stderr)
+        return 1
+    if args.comando == 'aquecer':
+        print(f"{aquecer(args.pastas)} romaneio(s) gravado(s) em {CACHE_DISCO.pasta}")
+    elif args.comando == 'info':
+        itens = CACHE_DISCO.entradas()
+        for e in itens:
+            print(f"{e['chave'][:12]}  {e['bytes'] / 2**20:8.2f} MB  {time.strftime('%Y-%m-%d %H:%M', time.localtime(e['uso']))}")
+        print(f"{len(itens)} romaneio(s), {sum(e['bytes'] for e in itens) / 2**20:.2f} MB "
+              f"de {CACHE_DISCO.limite_bytes / 2**20:.0f} MB em {CACHE_DISCO.pasta}")
+    elif args.comando == 'limpar':
+        CACHE_DISCO.limpar()
+    return 0
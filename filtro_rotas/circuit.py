@@ -0,0 +1,188 @@
+"""Circuit Pro: agrupa "casadinhas" (paradas no mesmo número e no mesmo ponto).
+
+Duas paradas vizinhas, depois de ordenar por número e nome de rua, viram uma
+só quando têm o mesmo número E (o mesmo nome de rua OU GPS a até 10 m).
+
+No modo espacial a mesma regra vale para qualquer par de paradas, não só as
+vizinhas na ordenação: paradas com o mesmo número são agrupadas em células
+de grade e os pares a até 10 m são unidos com union-find. Assim, duas grafias
+diferentes da mesma rua que ficaram separadas na ordenação também se juntam.
+
+O resultado de cada planilha fica em CACHE_RESULTADOS, um cache só dele,
+pela chave (hash do arquivo, modo): a tabela paginada e os downloads saem
+desse DataFrame original.
+"""
+import os
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache import CacheLRU
+from .esquema import inferir_esquema
+from .geo import RAIO_TERRA_M, calcular_distancia_gps, distancia_metros
+from .instrumentacao import etapa
+from .normalizacao import extrair_numero_serie, normalizar_nome_rua_serie
+
+DISTANCIA_CASADINHA_M = 10
+MODO_ADJACENTE = 'adjacente'
+MODO_ESPACIAL = 'espacial'
+# Células com o dobro do limite: dois pontos a até 10 m ficam sempre em células vizinhas
+TAM_CELULA_M = 2 * DISTANCIA_CASADINHA_M
+LIMITE_CACHE_CIRCUIT_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_CIRCUIT_MB", "64"))
+
+
+def _unir_seqs(valores) -> str:
+    vals = sorted(set(str(v) for v in valores))
+    try: vals.sort(key=int)
+    except ValueError: pass
+    return ', '.join(vals)
+
+
+def _inicios_grupos(ids: np.ndarray) -> np.ndarray:
+    if len(ids) == 0:
+        return np.zeros(0, dtype=np.intp)
+    return np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+
+
+def _melhor_endereco_por_cluster(ids: np.ndarray, enderecos: pd.Series) -> np.ndarray:
+    """Endereço mais longo (não vazio) de cada cluster, sem montar uma Series por grupo."""
+    textos = np.array([str(x).strip() if pd.notna(x) else '' for x in enderecos], dtype=object)
+    tamanhos = np.fromiter((len(t) for t in textos), dtype=np.int64, count=len(textos))
+    # Maior texto do cluster; no empate, o primeiro (como max(key=len))
+    ordem = np.lexsort((np.arange(len(ids)), -tamanhos, ids))
+    escolhidos = ordem[_inicios_grupos(ids[ordem])]
+    return textos[escolhidos]
+
+
+def _seqs_por_cluster(ids: np.ndarray, seqs: pd.Series) -> list:
+    valores = seqs.tolist()
+    inicios = _inicios_grupos(ids)
+    fins = np.append(inicios[1:], len(ids))
+    return [_unir_seqs(valores[i:f]) for i, f in zip(inicios, fins)]
+
+
+def ids_cluster_adjacentes(num: np.ndarray, nome: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """CLUSTER_ID de cada linha já ordenada: compara cada linha só com a anterior.
+
+    Equivale ao laço antigo com `devem_agrupar(linha[i-1], linha[i])`, mas
+    calcula todas as comparações e distâncias de uma vez.
+    """
+    if len(num) == 0:
+        return np.zeros(0, dtype=np.int64)
+    mesmo_num = num[1:] == num[:-1]
+    mesmo_nome = nome[1:] == nome[:-1]
+    com_gps = (lat[1:] != 0) & (lat[:-1] != 0)
+    with np.errstate(invalid='ignore'):
+        perto = distancia_metros(lat[:-1], lon[:-1], lat[1:], lon[1:]) <= DISTANCIA_CASADINHA_M
+    agrupa = mesmo_num & (mesmo_nome | (com_gps & perto))
+    return np.concatenate(([0], np.cumsum(~agrupa)))
+
+
+def _raiz(pai: list, i: int) -> int:
+    while pai[i] != i:
+        pai[i] = pai[pai[i]]
+        i = pai[i]
+    return i
+
+
+def ids_cluster_espaciais(num: np.ndarray, lat: np.ndarray, lon: np.ndarray, ids_adjacentes: np.ndarray) -> np.ndarray:
+    """Une aos clusters adjacentes todo par com o mesmo número e GPS a até 10 m.
+
+    Só compara pontos do mesmo número na mesma célula de grade ou nas oito
+    células vizinhas, então o custo fica perto de O(n) depois da ordenação.
+    Os IDs seguem a ordem da primeira linha de cada cluster.
+    """
+    n = len(num)
+    inicios = np.flatnonzero(np.concatenate(([True], ids_adjacentes[1:] != ids_adjacentes[:-1]))) if n else np.zeros(0, dtype=np.intp)
+    pai = inicios[ids_adjacentes].tolist() if n else []
+
+    com_gps = np.flatnonzero((lat != 0) & np.isfinite(lat) & np.isfinite(lon))
+    phi = np.radians(lat[com_gps])
+    y = np.floor(phi * RAIO_TERRA_M / TAM_CELULA_M).astype(np.int64)
+    x = np.floor(np.radians(lon[com_gps]) * np.cos(phi) * RAIO_TERRA_M / TAM_CELULA_M).astype(np.int64)
+    celulas = defaultdict(list)
+    for i, cx, cy in zip(com_gps.tolist(), x.tolist(), y.tolist()):
+        celulas[(num[i], cx, cy)].append(i)
+
+    for (n_casa, cx, cy), membros in celulas.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                vizinhos = celulas.get((n_casa, cx + dx, cy + dy))
+                if not vizinhos:
+                    continue
+                for i in membros:
+                    for j in vizinhos:
+                        if i < j and calcular_distancia_gps(lat[i], lon[i], lat[j], lon[j]) <= DISTANCIA_CASADINHA_M:
+                            ri, rj = _raiz(pai, i), _raiz(pai, j)
+                            if ri != rj:
+                                pai[max(ri, rj)] = min(ri, rj)
+
+    raizes = np.fromiter((_raiz(pai, i) for i in range(n)), dtype=np.int64, count=n)
+    return pd.factorize(raizes)[0].astype(np.int64)
+
+
+def gerar_planilha_otimizada_circuit_pro(df: pd.DataFrame, modo: str = MODO_ADJACENTE) -> Optional[pd.DataFrame]:
+    """Planilha com uma linha por casadinha.
+
+    Em `attrs['casadinhas']` ficam o modo usado, o número de clusters do modo
+    adjacente e quantas fusões a mais o modo espacial encontrou.
+    """
+    esquema = inferir_esquema(df)
+    col_end, col_seq, col_lat, col_lon = esquema.endereco, esquema.sequencia, esquema.latitude, esquema.longitude
+    if not col_end or not col_seq: return None
+    df_temp = df.copy()
+    df_temp['tmp_num'] = extrair_numero_serie(df_temp[col_end])
+    df_temp['tmp_nome'] = normalizar_nome_rua_serie(df_temp[col_end])
+    if col_lat and col_lon:
+        df_temp['tmp_lat'] = pd.to_numeric(df_temp[col_lat], errors='coerce').fillna(0)
+        df_temp['tmp_lon'] = pd.to_numeric(df_temp[col_lon], errors='coerce').fillna(0)
+    else:
+        df_temp['tmp_lat'] = 0; df_temp['tmp_lon'] = 0
+    df_temp = df_temp.sort_values(by=['tmp_num', 'tmp_nome']).reset_index(drop=True)
+    num = df_temp['tmp_num'].to_numpy(dtype=object)
+    lat, lon = df_temp['tmp_lat'].to_numpy(dtype=float), df_temp['tmp_lon'].to_numpy(dtype=float)
+    with etapa('agrupamento_casadinhas', linhas=len(df_temp), modo=modo):
+        ids = ids_cluster_adjacentes(num, df_temp['tmp_nome'].to_numpy(dtype=object), lat, lon)
+        n_adjacentes = int(ids[-1]) + 1 if len(ids) else 0
+        if modo == MODO_ESPACIAL:
+            ids = ids_cluster_espaciais(num, lat, lon, ids)
+    if modo == MODO_ESPACIAL:
+        # Reagrupa as linhas de cada cluster (estável, mantendo a ordem dentro dele)
+        ordem = np.argsort(ids, kind='stable')
+        df_temp, ids = df_temp.iloc[ordem].reset_index(drop=True), ids[ordem]
+    df_temp['CLUSTER_ID'] = ids
+    # Clusters contíguos: endereço e sequências saem por fatias, sem groupby em Python
+    cols_first = [col for col in df_temp.columns if col not in ['CLUSTER_ID', col_seq, col_end, 'tmp_num', 'tmp_nome', 'tmp_lat', 'tmp_lon']]
+    df_final = df_temp.groupby('CLUSTER_ID')[cols_first].first()
+    df_final[col_end] = _melhor_endereco_por_cluster(ids, df_temp[col_end])
+    df_final[col_seq] = _seqs_por_cluster(ids, df_temp[col_seq])
+    df_final = df_final.reset_index()
+    cols_drop = [c for c in ['CLUSTER_ID', 'tmp_num', 'tmp_nome', 'tmp_lat', 'tmp_lon'] if c in df_final.columns]
+    df_final = df_final.drop(columns=cols_drop)
+    try:
+        df_final['SortKey'] = df_final[col_seq].apply(lambda x: int(str(x).split(',')[0]))
+        df_final = df_final.sort_values('SortKey').drop(columns=['SortKey'])
+    except Exception:
+        pass
+    df_final.attrs['casadinhas'] = {
+        'modo': modo,
+        'clusters_adjacentes': n_adjacentes,
+        'fusoes_extras': n_adjacentes - len(df_final),
+    }
+    return df_final
+
+
+# --- RESULTADOS ---
+CACHE_RESULTADOS = CacheLRU(LIMITE_CACHE_CIRCUIT_MB * 1024 * 1024,
+                            medir=lambda df: int(df.memory_usage(deep=True).sum()))
+
+
+def guardar_resultado(chave: tuple, df: pd.DataFrame) -> None:
+    CACHE_RESULTADOS.guardar(chave, df)
+
+
+def resultado_guardado(chave: tuple) -> Optional[pd.DataFrame]:
+    """Resultado gerado para a chave, ou None se ele já saiu do cache (é preciso gerar de novo)."""
+    return CACHE_RESULTADOS.obter(chave)
@@ -0,0 +1,70 @@
+"""Classificação de endereços em comércio ou residência.
+
+As duas listas de termos são compiladas uma única vez: os termos comerciais
+num conjunto (busca O(1) por palavra) e os anuladores numa única regex. A
+regra é a mesma de sempre: uma palavra do endereço, sem pontuação, igual a um
+termo comercial marca comércio, a menos que algum anulador ("FRENTE",
+"PROXIMO", ...) apareça antes dela no mesmo trecho entre vírgulas.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from .normalizacao import APAGAR_ASCII, _por_valores_unicos, _remover_acentos_texto
+
+TERMOS_COMERCIAIS = [
+    'LOJA', 'MERCADO', 'MERCEARIA', 'FARMACIA', 'DROGARIA', 'SHOPPING',
+    'CLINICA', 'HOSPITAL', 'POSTO', 'OFICINA', 'RESTAURANTE', 'LANCHONETE',
+    'PADARIA', 'PANIFICADORA', 'ACADEMIA', 'ESCOLA', 'COLEGIO', 'FACULDADE',
+    'IGREJA', 'TEMPLO', 'EMPRESA', 'LTDA', 'MEI', 'SALA', 'SALAO', 'BARBEARIA',
+    'ESTACIONAMENTO', 'HOTEL', 'SUPERMERCADO', 'AMC', 'ATACADO', 'DISTRIBUIDORA',
+    'AUTOPECAS', 'VIDRAÇARIA', 'LABORATORIO', 'CLUBE', 'ASSOCIACAO', 'BOUTIQUE',
+    'MERCANTIL', 'DEPARTAMENTO', 'VARIEDADES', 'PIZZARIA', 'CHURRASCARIA',
+    'CARNES', 'PEIXARIA', 'FRUTARIA', 'HORTIFRUTI', 'FLORICULTURA'
+]
+TERMOS_ANULADORES = [
+        'FRENTE', 'LADO', 'PROXIMO', 'VIZINHO', 'DEFRONTE', 'ATRAS', 'DEPOIS', 'PERTO', 'VIZINHA',
+        'AO LADO', 'EM FRENTE', 'OPPOSTO', 'PRÓXIMO A', 'PERTO DE', 'AO LADO DE', 'DE FRENTE PARA',
+        'DE FRENTE A', 'DE FRENTE', 'EM FRENTE A', 'EM FRENTE PARA', 'OPPOSTO A', 'OPPOSTO DE',
+        'PRÓXIMO DE', 'VIZINHO A', 'VIZINHO DE', 'DEPOIS DE', 'DEPOIS A', 'ATRÁS DE', 'ATRÁS A',
+        'PROX. A', 'PROX. DE', 'AO LADO A', 'PROX', 'PROX.', 'PRÓX', 'PRÓX.', 'PERTO A'
+]
+
+COMERCIO = "🏪 Comércio"
+RESIDENCIAL = "🏠 Residencial"
+
+_CONJUNTO_COMERCIAL = frozenset(TERMOS_COMERCIAIS)
+# Busca de substring, como o antigo `any(anul in prefixo ...)`
+_RE_ANULADORES = re.compile('|'.join(re.escape(t) for t in sorted(set(TERMOS_ANULADORES), key=len, reverse=True)))
+
+
+def _sem_pontuacao(palavra: str) -> str:
+    if palavra.isascii():
+        return palavra.encode('ascii').translate(None, APAGAR_ASCII).decode('ascii')
+    return "".join(filter(str.isalnum, palavra))
+
+
+def _eh_comercio(end_limpo: str) -> bool:
+    for parte in end_limpo.split(','):
+        palavras = parte.split()
+        for i, palavra in enumerate(palavras):
+            if _sem_pontuacao(palavra) in _CONJUNTO_COMERCIAL:
+                if not _RE_ANULADORES.search(" ".join(palavras[:i])):
+                    return True
+                # O prefixo só cresce: se já contém um anulador, os termos
+                # seguintes deste trecho também estão anulados
+                break
+    return False
+
+
+def identificar_comercio(endereco) -> str:
+    return COMERCIO if _eh_comercio(_remover_acentos_texto(str(endereco))) else RESIDENCIAL
+
+
+def classificar_comercio_serie(serie: pd.Series) -> pd.Series:
+    """Classifica uma coluna inteira de endereços, avaliando cada endereço distinto uma única vez."""
+    def _transformar(texto: pd.Series, _) -> pd.Series:
+        comercio = np.fromiter((_eh_comercio(_remover_acentos_texto(t)) for t in texto), dtype=bool, count=len(texto))
+        return pd.Series(np.where(comercio, COMERCIO, RESIDENCIAL), dtype=object)
+    return _por_valores_unicos(serie, _transformar)
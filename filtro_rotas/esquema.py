@@ -0,0 +1,101 @@
+"""Esquema das abas: que coluna faz cada papel (gaiola, sequência, endereço, bairro, parada, latitude, longitude).
+
+A linha de cabeçalho é a primeira com pelo menos MINIMO_CELULAS_CABECALHO
+colunas com termos de algum papel, entre os rótulos das colunas (planilhas
+lidas com cabeçalho, como a do Circuit) e as LINHAS_CABECALHO primeiras
+linhas (romaneios lidos com header=None). Os termos são curtos ('RUA',
+'ROTA', 'LAT'), então uma linha de dados também pode ter vários deles: o
+cabeçalho vem antes dos dados, e por isso vale a primeira linha que se
+qualifica, não a com mais acertos. Cada papel fica com a primeira coluna
+dessa linha que tem um dos seus termos. Num layout como
+`Letra / Sequence / Total Distance / Address / Neighborhood / Stop` todos os
+papéis saem da mesma linha; numa aba sem cabeçalho nenhuma linha se
+qualifica e vale a primeira com algum termo, então o primeiro endereço
+("Rua ...") faz o papel do cabeçalho, como nas varreduras antigas.
+
+O resultado fica num cache pela impressão digital do bloco de cabeçalho
+(rótulos + primeiras linhas): a rota de cada gaiola, o resumo em lote, o
+radar, o leitor em streaming e o Circuit perguntam ao `inferir_esquema` em
+vez de farejar o cabeçalho cada um à sua maneira.
+"""
+import hashlib
+import numbers
+import re
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional
+
+import pandas as pd
+
+from .cache import CacheLRU
+
+LINHAS_CABECALHO = 15
+MINIMO_CELULAS_CABECALHO = 2
+TERMOS_PAPEIS: Dict[str, List[str]] = {
+    'gaiola': ['GAIOLA', 'LETRA', 'ROTA', 'CAGE'],
+    # O Radar também aceita a coluna 'LPN' como gaiola, como a varredura dele sempre fez
+    'gaiola_radar': ['GAIOLA', 'LETRA', 'ROTA', 'CAGE', 'LPN'],
+    'sequencia': ['SEQU'],
+    'endereco': ['ENDERE', 'LOGRA', 'RUA', 'ADDRESS', 'DESTINATION'],
+    'bairro': ['BAIRRO', 'NEIGHBORHOOD'],
+    'parada': ['STOP', 'PARADA'],
+    'latitude': ['LATITUDE', 'LAT'],
+    'longitude': ['LONGITUDE', 'LON', 'LNG'],
+}
+_RE_PAPEIS = {papel: re.compile('|'.join(map(re.escape, termos))) for papel, termos in TERMOS_PAPEIS.items()}
+
+# Um esquema é um punhado de rótulos: tamanho aproximado por entrada
+CACHE_ESQUEMAS = CacheLRU(4 * 1024 * 1024, medir=lambda _: 1024)
+
+
+@dataclass(frozen=True)
+class Esquema:
+    gaiola: Optional[Hashable] = None
+    gaiola_radar: Optional[Hashable] = None
+    sequencia: Optional[Hashable] = None
+    endereco: Optional[Hashable] = None
+    bairro: Optional[Hashable] = None
+    parada: Optional[Hashable] = None
+    latitude: Optional[Hashable] = None
+    longitude: Optional[Hashable] = None
+    # Linha do cabeçalho: -1 para os rótulos das colunas, None se nenhuma linha tem termos
+    linha_cabecalho: Optional[int] = None
+
+
+def _candidatas(df: pd.DataFrame) -> List[List[str]]:
+    linhas = [[str(v).upper() for v in linha] for linha in df.head(LINHAS_CABECALHO).itertuples(index=False, name=None)]
+    # Rótulos inteiros (header=None) não são cabeçalho
+    rotulos = [str(c).upper() if not isinstance(c, numbers.Integral) else '' for c in df.columns]
+    return [rotulos] + linhas
+
+
+def _impressao_digital(df: pd.DataFrame, candidatas: List[List[str]]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((list(df.columns), candidatas)).encode())
+    return h.hexdigest()
+
+
+def _mapear(colunas: List[Hashable], candidatas: List[List[str]]) -> Esquema:
+    acertos = [sum(1 for v in valores if any(r.search(v) for r in _RE_PAPEIS.values())) for valores in candidatas]
+    melhor = next((i for i, qtd in enumerate(acertos) if qtd >= MINIMO_CELULAS_CABECALHO),
+                  next((i for i, qtd in enumerate(acertos) if qtd), None))
+    if melhor is None:
+        return Esquema()
+    valores = candidatas[melhor]
+    papeis = {papel: next((c for c, v in zip(colunas, valores) if r.search(v)), None) for papel, r in _RE_PAPEIS.items()}
+    return Esquema(**papeis, linha_cabecalho=melhor - 1)
+
+
+def inferir_esquema(df: pd.DataFrame) -> Esquema:
+    """Colunas de cada papel na aba (None onde o cabeçalho não tem o papel)."""
+    candidatas = _candidatas(df)
+    return CACHE_ESQUEMAS.obter_ou_calcular(_impressao_digital(df, candidatas),
+                                            lambda: _mapear(list(df.columns), candidatas))
+
+
+def coluna_endereco_por_tamanho(df_filt: pd.DataFrame) -> Hashable:
+    """Sem cabeçalho: a coluna de textos mais longos nas linhas da gaiola."""
+    try:
+        medias = {col: df_filt[col].astype(str).str.len().mean() for col in df_filt.columns}
+        return max(medias, key=lambda col: medias[col])
+    except Exception:
+        return df_filt.columns[0]
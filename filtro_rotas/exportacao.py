@@ -0,0 +1,347 @@
+"""Exportação das planilhas por gaiola (xlsx) e do ZIP com todas elas.
+
+As planilhas são escritas direto com o xlsxwriter, linha a linha, quando ele
+está instalado (cerca de duas vezes mais rápido que `to_excel` com openpyxl);
+sem ele, cai no `pd.ExcelWriter` com openpyxl. A escrita roda num pool de
+processos, pois é trabalho de CPU em Python puro e threads não ganham nada
+por causa do GIL. Cada planilha fica em cache por (hash do romaneio, gaiola).
+
+Além do xlsx, os arquivos de download saem em CSV no layout que o Circuit
+importa (Address, Latitude, Longitude, Notes), no mesmo CSV compactado com
+gzip e em Parquet para a retaguarda. Esses formatos são escritos em blocos de
+LINHAS_BLOCO linhas por um gerador que vai direto para o armazém de blobs
+(em disco a partir do limiar dele), sem montar o arquivo inteiro em memória.
+"""
+import io
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from .armazem import ARMAZEM, DESCARTADO, RefBlob
+from .cache import CacheLRU
+from .esquema import inferir_esquema
+from .instrumentacao import etapa
+from .normalizacao import limpar_string
+from .rota import dataframe_rota_gaiola
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+logger = logging.getLogger("filtro_rotas")
+
+MOTOR_EXCEL = 'xlsxwriter' if xlsxwriter is not None else 'openpyxl'
+# Limite de memória do cache de planilhas (MB), ajustável por variável de ambiente
+LIMITE_CACHE_PLANILHAS_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_PLANILHAS_MB", "128"))
+RE_CARACTERES_PROIBIDOS = re.compile(r'[\\/:*?"<>|]')
+# Linhas por bloco nos formatos escritos em streaming
+LINHAS_BLOCO = int(os.environ.get("FILTRO_ROTAS_LINHAS_BLOCO", "5000"))
+# Processos que geram as planilhas do ZIP (0 = um por CPU)
+PROCESSOS_EXCEL = int(os.environ.get("FILTRO_ROTAS_PROCESSOS_EXCEL", "0")) or os.cpu_count() or 1
+
+CACHE_PLANILHAS = CacheLRU(LIMITE_CACHE_PLANILHAS_MB * 1024 * 1024, medir=len)
+
+
+def planilha_excel(df: pd.DataFrame) -> bytes:
+    """Conteúdo .xlsx de `df` (sem índice, cabeçalho na primeira linha)."""
+    buf = io.BytesIO()
+    with etapa('planilha_excel', linhas=len(df), motor=MOTOR_EXCEL):
+        if xlsxwriter is None:
+            with pd.ExcelWriter(buf, engine='openpyxl') as w:
+                df.to_excel(w, index=False)
+            return buf.getvalue()
+        wb = xlsxwriter.Workbook(buf, {'in_memory': True, 'default_date_format': 'dd/mm/yyyy'})
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, [str(c) for c in df.columns])
+        # Células vazias (NaN/None/NaT) viram células em branco, como no to_excel
+        valores = df.astype(object).where(df.notna(), None)
+        for i, linha in enumerate(valores.itertuples(index=False, name=None), start=1):
+            ws.write_row(i, 0, linha)
+        wb.close()
+        return buf.getvalue()
+
+
+def nome_arquivo_gaiola(gaiola: str, formato: str = 'xlsx') -> str:
+    return f"Rota_{RE_CARACTERES_PROIBIDOS.sub('_', gaiola)}{FORMATOS[formato].extensao}"
+
+
+def _chave(hash_romaneio: str, gaiola: str) -> tuple:
+    return (hash_romaneio, limpar_string(gaiola))
+
+
+def planilha_gaiola(hash_romaneio: str, gaiola: str, df: pd.DataFrame) -> bytes:
+    """Planilha de uma gaiola, reaproveitando a já gerada para o mesmo romaneio."""
+    return CACHE_PLANILHAS.obter_ou_calcular(_chave(hash_romaneio, gaiola), lambda: planilha_excel(df))
+
+
+def planilha_rota_gaiola(manifesto, gaiola: str) -> Optional[bytes]:
+    """Planilha da gaiola, montando a rota só se a planilha não estiver em cache (None se não existe)."""
+    dados = CACHE_PLANILHAS.obter(_chave(manifesto.hash, gaiola))
+    if dados is not None:
+        return dados
+    df = dataframe_rota_gaiola(manifesto, gaiola)
+    return None if df is None else planilha_gaiola(manifesto.hash, gaiola, df)
+
+
+@dataclass
+class ExportacaoZip:
+    dados: bytes
+    arquivos: int
+    em_cache: int
+    segundos: float
+    ausentes: List[str] = field(default_factory=list)
+
+
+def _trabalhadores(pendentes: int, max_workers: Optional[int]) -> int:
+    return max(1, min(pendentes, max_workers or PROCESSOS_EXCEL))
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool_processos() -> ProcessPoolExecutor:
+    """Pool único do processo: criado no primeiro ZIP e reaproveitado pelos cliques seguintes."""
+    global _POOL
+    with _POOL_LOCK:
+        # Um trabalhador morto (falta de memória, por exemplo) quebra o pool: o próximo ZIP cria outro
+        if _POOL is None or getattr(_POOL, '_broken', False):
+            _POOL = ProcessPoolExecutor(max_workers=PROCESSOS_EXCEL)
+        return _POOL
+
+
+def gerar_zip_gaiolas(hash_romaneio: str, gaiolas: List[str],
+                      montar: Callable[[str], Optional[pd.DataFrame]],
+                      max_workers: Optional[int] = None) -> ExportacaoZip:
+    """ZIP com uma planilha por gaiola.
+
+    `montar(gaiola)` devolve o DataFrame da rota (ou None se a gaiola não
+    existe); só é chamado para as gaiolas que ainda não estão no cache. As
+    planilhas vão para o ZIP à medida que ficam prontas.
+    """
+    inicio = time.perf_counter()
+    buf = io.BytesIO()
+    ausentes, em_cache, arquivos = [], 0, 0
+    # xlsx já é compactado: guardar sem deflate economiza CPU e quase nada de tamanho
+    with etapa('exportacao_zip', gaiolas=len(gaiolas)) as medicao, \
+            zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_STORED) as zf:
+        pendentes: Dict[str, pd.DataFrame] = {}
+        for g in gaiolas:
+            dados = CACHE_PLANILHAS.obter(_chave(hash_romaneio, g))
+            if dados is not None:
+                zf.writestr(nome_arquivo_gaiola(g), dados)
+                em_cache += 1
+                continue
+            df = montar(g)
+            if df is None:
+                ausentes.append(g)
+            else:
+                pendentes[g] = df
+
+        n_trabalhadores = _trabalhadores(len(pendentes), max_workers)
+        if n_trabalhadores == 1:
+            prontas = ((g, planilha_excel(df)) for g, df in pendentes.items())
+        else:
+            executor = _pool_processos()
+            futuros = {executor.submit(planilha_excel, df): g for g, df in pendentes.items()}
+            prontas = ((futuros[f], f.result()) for f in as_completed(futuros))
+        try:
+            for g, dados in prontas:
+                CACHE_PLANILHAS.guardar(_chave(hash_romaneio, g), dados)
+                zf.writestr(nome_arquivo_gaiola(g), dados)
+                arquivos += 1
+        finally:
+            # O pool continua vivo para o próximo ZIP; só o que ainda não começou deste é cancelado
+            if n_trabalhadores > 1:
+                for f in futuros:
+                    f.cancel()
+        medicao.detalhes.update(arquivos=arquivos + em_cache, em_cache=em_cache, processos=n_trabalhadores)
+
+    segundos = time.perf_counter() - inicio
+    logger.info("ZIP de %d gaiola(s) (%d do cache, %d processo(s)) em %.2fs",
+                arquivos + em_cache, em_cache, n_trabalhadores, segundos)
+    return ExportacaoZip(dados=buf.getvalue(), arquivos=arquivos + em_cache, em_cache=em_cache,
+                         segundos=segundos, ausentes=ausentes)
+
+
+# --- FORMATOS DE SAÍDA ---
+@dataclass(frozen=True)
+class Formato:
+    rotulo: str
+    extensao: str
+    mime: str
+
+
+FORMATOS: Dict[str, Formato] = {
+    'xlsx': Formato('Excel (.xlsx)', '.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': Formato('CSV do Circuit (.csv)', '.csv', 'text/csv'),
+    'csv.gz': Formato('CSV do Circuit compactado (.csv.gz)', '.csv.gz', 'application/gzip'),
+}
+if pa is not None:
+    FORMATOS['parquet'] = Formato('Parquet, retaguarda (.parquet)', '.parquet', 'application/vnd.apache.parquet')
+
+COLUNAS_CIRCUIT = ['Address', 'Latitude', 'Longitude', 'Notes']
+
+
+def tabela_circuit(df: pd.DataFrame, esquema=None) -> pd.DataFrame:
+    """`df` no layout de importação do Circuit: endereço, coordenadas (se houver) e as demais colunas em Notes."""
+    esquema = esquema if esquema is not None else inferir_esquema(df)
+    col_end = esquema.endereco if esquema.endereco is not None else df.columns[0]
+    coordenadas = [c for c in (esquema.latitude, esquema.longitude) if c is not None]
+    outras = [c for c in df.columns if c != col_end and c not in coordenadas]
+    valores = df[outras].astype(object).where(df[outras].notna(), None)
+    notas = [' · '.join(f"{c}: {v}" for c, v in zip(outras, linha) if v is not None)
+             for linha in valores.itertuples(index=False, name=None)]
+    saida = pd.DataFrame({'Address': df[col_end].to_numpy(), 'Notes': notas})
+    if len(coordenadas) == 2:
+        saida.insert(1, 'Latitude', df[coordenadas[0]].to_numpy())
+        saida.insert(2, 'Longitude', df[coordenadas[1]].to_numpy())
+    return saida
+
+
+def _blocos(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    for inicio in range(0, max(len(df), 1), LINHAS_BLOCO):
+        yield df.iloc[inicio:inicio + LINHAS_BLOCO]
+
+
+def partes_csv(df: pd.DataFrame) -> Iterator[bytes]:
+    """CSV (UTF-8) no layout do Circuit, bloco a bloco."""
+    esquema = inferir_esquema(df)
+    for i, bloco in enumerate(_blocos(df)):
+        yield tabela_circuit(bloco, esquema).to_csv(index=False, header=i == 0, lineterminator='\n').encode('utf-8')
+
+
+def partes_gzip(partes: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabeçalho gzip
+    for parte in partes:
+        comprimido = compressor.compress(parte)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+class _Dreno(io.RawIOBase):
+    """Destino do ParquetWriter que guarda só o que foi escrito desde o último `esvaziar`."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def esvaziar(self) -> bytes:
+        dados, self._partes = b''.join(self._partes), []
+        return dados
+
+
+def compativel_arrow(df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia de `df` que o Arrow aceita: colunas de tipos misturados viram texto e os rótulos viram str."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def partes_parquet(df: pd.DataFrame) -> Iterator[bytes]:
+    """Parquet (zstd) com um row group por bloco; colunas de tipos misturados viram texto."""
+    df = compativel_arrow(df)
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    dreno = _Dreno()
+    with pq.ParquetWriter(dreno, esquema, compression='zstd') as escritor:
+        for bloco in _blocos(df):
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+            yield dreno.esvaziar()
+    yield dreno.esvaziar()
+
+
+def partes_exportacao(df: pd.DataFrame, formato: str) -> Iterator[bytes]:
+    if formato == 'xlsx':
+        # O xlsx é um ZIP com índice no fim: sai inteiro, num bloco só
+        return iter((planilha_excel(df),))
+    if formato == 'csv':
+        return partes_csv(df)
+    if formato == 'csv.gz':
+        return partes_gzip(partes_csv(df))
+    if formato == 'parquet' and pa is not None:
+        return partes_parquet(df)
+    raise ValueError(f"Formato de saída desconhecido: {formato}")
+
+
+@dataclass
+class ArquivoExportado:
+    formato: str
+    ref: RefBlob
+    linhas: int
+    segundos: float
+
+    @property
+    def tamanho(self) -> int:
+        return self.ref.tamanho
+
+
+# Só os metadados ficam aqui; o conteúdo está no armazém
+CACHE_EXPORTACOES = CacheLRU(4 * 1024 * 1024, medir=lambda _: 256)
+
+
+def exportar(chave: tuple, formato: str, montar: Callable[[], Optional[pd.DataFrame]]) -> Optional[ArquivoExportado]:
+    """Arquivo no `formato`, gerado uma única vez por (chave, formato) direto para o armazém.
+
+    `montar()` devolve o DataFrame (ou None se não há o que exportar) e só é
+    chamado quando o arquivo ainda não existe ou o armazém já o descartou.
+    """
+    def _gerar() -> Optional[ArquivoExportado]:
+        df = montar()
+        if df is None:
+            return None
+        inicio = time.perf_counter()
+        with etapa(f'exportacao_{formato}', linhas=len(df)):
+            ref = ARMAZEM.guardar_partes(lambda: partes_exportacao(df, formato))
+        return ArquivoExportado(formato=formato, ref=ref, linhas=len(df), segundos=time.perf_counter() - inicio)
+
+    arquivo = CACHE_EXPORTACOES.obter_ou_calcular((*chave, formato), _gerar)
+    if arquivo is not None and ARMAZEM.local(arquivo.ref) == DESCARTADO:
+        CACHE_EXPORTACOES.descartar((*chave, formato))
+        arquivo = CACHE_EXPORTACOES.obter_ou_calcular((*chave, formato), _gerar)
+    if arquivo is None:
+        # Sem resultado agora (expirou): o None não fica, para exportar quando ele for gerado de novo
+        CACHE_EXPORTACOES.descartar((*chave, formato))
+    return arquivo
+
+
+def exportacoes_prontas(chave: tuple) -> List[ArquivoExportado]:
+    """Os formatos já gerados para a chave, na ordem de FORMATOS."""
+    prontos = (CACHE_EXPORTACOES.obter((*chave, formato)) for formato in FORMATOS if (*chave, formato) in CACHE_EXPORTACOES)
+    return [a for a in prontos if a is not None]
+
+
+def conteudo_exportacao(chave: tuple, formato: str, montar: Callable[[], Optional[pd.DataFrame]]) -> Union[bytes, BinaryIO, None]:
+    """Conteúdo do arquivo para o download (gerado no primeiro pedido), como `ArmazemBlobs.ler`."""
+    arquivo = exportar(chave, formato, montar)
+    return None if arquivo is None else ARMAZEM.ler(arquivo.ref)
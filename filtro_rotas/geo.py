@@ -0,0 +1,31 @@
+"""Distâncias geográficas (haversine), escalar e vetorizada."""
+import math
+
+import numpy as np
+
+RAIO_TERRA_M = 6371000
+
+
+def calcular_distancia_gps(lat1, lon1, lat2, lon2):
+    try:
+        lat1, lon1, lat2, lon2 = float(lat1), float(lon1), float(lat2), float(lon2)
+    except Exception:
+        return 999999
+    R = RAIO_TERRA_M
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2) * math.sin(dlambda/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return R * c
+
+
+def distancia_metros(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Haversine elemento a elemento sobre arrays (mesma fórmula de `calcular_distancia_gps`)."""
+    lat1, lon1, lat2, lon2 = (np.asarray(v, dtype=float) for v in (lat1, lon1, lat2, lon2))
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(lat2 - lat1)
+    dlambda = np.radians(lon2 - lon1)
+    a = np.sin(dphi/2)**2 + np.cos(phi1)*np.cos(phi2) * np.sin(dlambda/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return RAIO_TERRA_M * c
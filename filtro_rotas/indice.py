@@ -0,0 +1,101 @@
+"""Índice de gaiolas: código normalizado -> (aba, coluna, linhas).
+
+Montado numa única passada quando o romaneio é lido, para que localizar uma
+gaiola seja uma consulta de dicionário em vez de varrer todas as colunas de
+todas as abas comparando strings.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .esquema import inferir_esquema
+from .normalizacao import limpar_serie, limpar_string
+
+PADRAO_GAIOLA = re.compile(r'^[A-Z]{1,3}\d{1,4}$')
+
+
+@dataclass(frozen=True)
+class Localizacao:
+    aba: str
+    coluna: Hashable
+    linhas: np.ndarray  # posições (iloc) das linhas da gaiola nessa coluna
+
+
+def _detectar_coluna_gaiola(df: pd.DataFrame, chaves: Dict[Hashable, pd.Series]) -> Optional[Hashable]:
+    col = inferir_esquema(df).gaiola
+    if col is not None:
+        return col
+    # Sem cabeçalho reconhecível: coluna com maior proporção de valores no formato de gaiola
+    melhor, melhor_frac = None, 0.5
+    for col, serie in chaves.items():
+        if serie.empty:
+            continue
+        frac = serie.str.fullmatch(PADRAO_GAIOLA.pattern).mean()
+        if frac > melhor_frac:
+            melhor, melhor_frac = col, frac
+    return melhor
+
+
+def _ordem_natural(chave: str):
+    m = re.match(r'^([A-Z]+)(\d+)$', chave)
+    return (m.group(1), int(m.group(2))) if m else (chave, 0)
+
+
+class IndiceGaiolas:
+    def __init__(self, abas: Dict[str, pd.DataFrame]):
+        self._posicoes: Dict[str, List[Localizacao]] = {}
+        self._rotulos: Dict[str, str] = {}
+        self.nbytes = 0
+        for aba, df in abas.items():
+            chaves = {col: limpar_serie(df[col]) for col in df.columns}
+            for col, serie in chaves.items():
+                for chave, linhas in serie.groupby(serie, sort=False).indices.items():
+                    # Mantém só a primeira coluna de cada aba, como a varredura antiga
+                    locs = self._posicoes.setdefault(chave, [])
+                    if not locs or locs[-1].aba != aba:
+                        locs.append(Localizacao(aba, col, linhas))
+                        self.nbytes += linhas.nbytes + 100
+            col_gaiola = _detectar_coluna_gaiola(df, chaves)
+            if col_gaiola is not None:
+                for chave, bruto in zip(chaves[col_gaiola], df[col_gaiola]):
+                    if chave not in self._rotulos and PADRAO_GAIOLA.match(chave):
+                        self._rotulos[chave] = str(bruto).strip()
+
+    def exportar(self) -> Dict:
+        """Estado do índice em listas e arrays planos (usado pelo cache em disco)."""
+        locs = [(chave, loc) for chave, lista in self._posicoes.items() for loc in lista]
+        return {
+            'chaves': [chave for chave, _ in locs],
+            'abas': [loc.aba for _, loc in locs],
+            'colunas': [loc.coluna for _, loc in locs],
+            'tamanhos': np.array([len(loc.linhas) for _, loc in locs], dtype=np.int64),
+            'linhas': np.concatenate([loc.linhas for _, loc in locs]) if locs else np.zeros(0, dtype=np.intp),
+            'rotulos': dict(self._rotulos),
+        }
+
+    @classmethod
+    def importar(cls, estado: Dict) -> 'IndiceGaiolas':
+        indice = cls.__new__(cls)
+        indice._posicoes, indice._rotulos = {}, dict(estado['rotulos'])
+        linhas = np.asarray(estado['linhas'], dtype=np.intp)
+        fins = np.cumsum(estado['tamanhos']).tolist()
+        for chave, aba, coluna, inicio, fim in zip(estado['chaves'], estado['abas'], estado['colunas'], [0] + fins, fins):
+            indice._posicoes.setdefault(chave, []).append(Localizacao(aba, coluna, linhas[inicio:fim]))
+        indice.nbytes = linhas.nbytes + 100 * len(estado['chaves'])
+        return indice
+
+    def localizacoes(self, gaiola: str) -> List[Localizacao]:
+        """Primeira coluna de cada aba que contém a gaiola, na ordem das abas."""
+        return self._posicoes.get(limpar_string(gaiola), [])
+
+    def localizar(self, gaiola: str) -> Optional[Localizacao]:
+        locs = self.localizacoes(gaiola)
+        return locs[0] if locs else None
+
+    @property
+    def gaiolas(self) -> List[str]:
+        """Todas as gaiolas do romaneio, como escritas no arquivo, em ordem natural (A-2 antes de A-10)."""
+        return [self._rotulos[k] for k in sorted(self._rotulos, key=_ordem_natural)]
@@ -0,0 +1,146 @@
+"""Medição por etapa do processamento: tempo, linhas processadas e memória.
+
+`etapa()` envolve um trecho (leitura, índice, filtro, classificação,
+agrupamento, exportação...) e, quando alguém está ouvindo, gera uma
+`Medicao` e escreve uma linha chave=valor no logger "filtro_rotas.etapas".
+Etapas de primeiro nível saem em INFO e as aninhadas (uma por gaiola, por
+exemplo) em DEBUG. Quem ouve é um `coletar()` ativo no contexto atual ou o
+logger habilitado no nível da etapa; sem nenhum dos dois, a etapa custa só
+essa verificação. O logger das etapas tem nível próprio (WARNING, a menos
+que FILTRO_ROTAS_LOG_ETAPAS diga outro), então pôr o logger "filtro_rotas"
+em INFO não liga a medição de tudo.
+
+A memória vem do sistema operacional: RSS no fim da etapa e o pico de RSS do
+processo. O pico não pode ser zerado a cada etapa, então `aumento_pico_mb`
+mostra quanto a etapa elevou o pico já existente.
+"""
+import contextvars
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("filtro_rotas.etapas")
+logger.setLevel(os.environ.get("FILTRO_ROTAS_LOG_ETAPAS", "WARNING").upper())
+
+_STATM = '/proc/self/statm' if os.path.exists('/proc/self/statm') else None
+_PAGINA = os.sysconf('SC_PAGE_SIZE') if _STATM else 0
+# ru_maxrss vem em KB no Linux e em bytes no macOS
+_ESCALA_MAXRSS = 1 if sys.platform == 'darwin' else 1024
+
+
+@dataclass
+class Medicao:
+    etapa: str
+    nivel: int = 0
+    segundos: float = 0.0
+    linhas: Optional[int] = None
+    rss_mb: Optional[float] = None
+    pico_rss_mb: Optional[float] = None
+    aumento_pico_mb: Optional[float] = None
+    erro: Optional[str] = None
+    detalhes: Dict = field(default_factory=dict)
+
+    def linha_log(self) -> str:
+        campos = {'etapa': self.etapa, 'segundos': f"{self.segundos:.4f}", 'linhas': self.linhas,
+                  'rss_mb': self.rss_mb, 'pico_rss_mb': self.pico_rss_mb,
+                  'aumento_pico_mb': self.aumento_pico_mb, 'erro': self.erro, **self.detalhes}
+        return " ".join(f"{k}={v}" for k, v in campos.items() if v is not None)
+
+
+class Coletor:
+    """Medições das etapas executadas enquanto o coletor está ativo, na ordem em que começaram."""
+
+    def __init__(self):
+        self.medicoes: List[Medicao] = []
+
+
+_COLETOR: contextvars.ContextVar = contextvars.ContextVar('filtro_rotas_coletor', default=None)
+_NIVEL: contextvars.ContextVar = contextvars.ContextVar('filtro_rotas_nivel', default=0)
+
+
+def memoria_mb() -> Tuple[Optional[float], Optional[float]]:
+    """(RSS atual, pico de RSS do processo) em MB; None onde o sistema não informa."""
+    rss = pico = None
+    if _STATM:
+        with open(_STATM) as f:
+            rss = int(f.read().split()[1]) * _PAGINA / 2**20
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _ESCALA_MAXRSS / 2**20
+    return rss, pico
+
+
+@contextmanager
+def coletar() -> Iterator[Coletor]:
+    """Ativa um coletor para as etapas executadas dentro do bloco (nesta thread/contexto)."""
+    coletor = Coletor()
+    token = _COLETOR.set(coletor)
+    try:
+        yield coletor
+    finally:
+        _COLETOR.reset(token)
+
+
+def coletor_ativo() -> Optional[Coletor]:
+    return _COLETOR.get()
+
+
+@contextmanager
+def etapa(nome: str, linhas: Optional[int] = None, **detalhes) -> Iterator[Medicao]:
+    """Mede o bloco. A `Medicao` devolvida aceita `linhas` e `detalhes` preenchidos lá dentro."""
+    nivel = _NIVEL.get()
+    medicao = Medicao(etapa=nome, nivel=nivel, linhas=linhas, detalhes=detalhes)
+    coletor = _COLETOR.get()
+    nivel_log = logging.INFO if nivel == 0 else logging.DEBUG
+    token = _NIVEL.set(nivel + 1)
+    if coletor is None and not logger.isEnabledFor(nivel_log):
+        try:
+            yield medicao
+        finally:
+            _NIVEL.reset(token)
+        return
+
+    _, pico_antes = memoria_mb()
+    if coletor is not None:
+        coletor.medicoes.append(medicao)
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    except BaseException as e:
+        medicao.erro = type(e).__name__
+        raise
+    finally:
+        medicao.segundos = time.perf_counter() - inicio
+        _NIVEL.reset(token)
+        rss, pico = memoria_mb()
+        medicao.rss_mb = None if rss is None else round(rss, 1)
+        if pico is not None:
+            medicao.pico_rss_mb = round(pico, 1)
+            medicao.aumento_pico_mb = round(pico - pico_antes, 1)
+        logger.log(nivel_log, medicao.linha_log())
+
+
+def tabela_medicoes(medicoes: List[Medicao]) -> pd.DataFrame:
+    """Tabela para o painel de desempenho, com as etapas aninhadas recuadas."""
+    linhas = []
+    for m in medicoes:
+        linhas.append({
+            'Etapa': "   " * m.nivel + m.etapa,
+            'Tempo (s)': round(m.segundos, 3),
+            'Linhas': m.linhas,
+            'RSS (MB)': m.rss_mb,
+            'Pico RSS (MB)': m.pico_rss_mb,
+            '+Pico (MB)': m.aumento_pico_mb,
+            'Detalhes': ", ".join(f"{k}={v}" for k, v in m.detalhes.items()) + (f" erro={m.erro}" if m.erro else ""),
+        })
+    return pd.DataFrame(linhas).astype({'Linhas': 'Int64'})
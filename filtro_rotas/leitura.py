@@ -0,0 +1,334 @@
+"""Leitura do romaneio em streaming, trazendo só as colunas usadas.
+
+O XML de cada aba é lido com expat em blocos, direto do ZIP do .xlsx, sem
+montar objetos de célula. As 15 primeiras linhas vêm completas; por elas
+detectamos as colunas de gaiola (a da rota e a do Radar), endereço e bairro
+(os mesmos detectores usados depois no processamento) e, a partir daí, só
+essas colunas são guardadas. Gaiola e bairro ficam como `category`.
+
+Os valores passam pela mesma conversão do `pd.read_excel(header=None)`
+(números inteiros viram int, números com formato de data viram datetime,
+células vazias e erros como "#N/A" viram NaN, linhas vazias no fim são
+descartadas) para que os DataFrames sejam iguais aos do leitor completo nas
+colunas mantidas. Se uma aba não tem cabeçalho reconhecível, ela é lida
+inteira. Abas de gráfico ficam de fora, como no `pd.ExcelFile`.
+
+O `openpyxl` em modo `read_only` faria o mesmo trabalho, mas no romaneio de
+referência ele é mais lento que o leitor completo e tem o mesmo pico de
+memória (ver benchmarks/bench_leitura.py), por isso o XML é lido aqui.
+"""
+import io
+import posixpath
+import re
+import zipfile
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+from xml.parsers import expat
+
+import pandas as pd
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from pandas.io.parsers import TextParser
+
+from .esquema import LINHAS_CABECALHO, inferir_esquema
+
+TAM_BLOCO = 1 << 16
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+TIPO_WORKSHEET = NS_REL + '/worksheet'
+RE_LETRAS = re.compile(r'^[A-Z]+')
+
+
+def _indice_coluna(ref: str) -> int:
+    n = 0
+    for letra in RE_LETRAS.match(ref).group(0):
+        n = n * 26 + ord(letra) - 64
+    return n - 1
+
+
+def _parser() -> expat.XMLParserType:
+    p = expat.ParserCreate(namespace_separator=' ')
+    p.buffer_text = True
+    return p
+
+
+def _alimentar(p: expat.XMLParserType, arquivo) -> None:
+    while True:
+        bloco = arquivo.read(TAM_BLOCO)
+        p.Parse(bloco, not bloco)
+        if not bloco:
+            return
+
+
+def _strings_compartilhadas(zf: zipfile.ZipFile, caminho: Optional[str]) -> List[str]:
+    if caminho is None or caminho not in zf.namelist():
+        return []
+    strings: List[str] = []
+    partes: List[str] = []
+    estado = {'t': False, 'rph': 0}
+    p = _parser()
+
+    def inicio(nome, _):
+        local = nome.rsplit(' ', 1)[-1]
+        if local == 'si':
+            partes.clear()
+        elif local == 'rPh':
+            estado['rph'] += 1
+        elif local == 't' and not estado['rph']:
+            estado['t'] = True
+
+    def fim(nome):
+        local = nome.rsplit(' ', 1)[-1]
+        if local == 'si':
+            # Mesmo tratamento de escapes do openpyxl (só o `_x005F_` cai)
+            strings.append(''.join(partes).replace('x005F_', ''))
+        elif local == 'rPh':
+            estado['rph'] -= 1
+        elif local == 't':
+            estado['t'] = False
+
+    def texto(dados):
+        if estado['t']:
+            partes.append(dados)
+
+    p.StartElementHandler, p.EndElementHandler, p.CharacterDataHandler = inicio, fim, texto
+    with zf.open(caminho) as f:
+        _alimentar(p, f)
+    return strings
+
+
+def _estilos_data(zf: zipfile.ZipFile, caminho: Optional[str]) -> Tuple[Set[int], Set[int]]:
+    """Índices de estilo (atributo `s` das células) com formato de data e, entre eles, de duração."""
+    if caminho is None or caminho not in zf.namelist():
+        return set(), set()
+    formatos = dict(BUILTIN_FORMATS)
+    xfs: List[int] = []
+    pilha: List[str] = []
+    p = _parser()
+
+    def inicio(nome, attrs):
+        local = nome.rsplit(' ', 1)[-1]
+        if local == 'numFmt':
+            formatos[int(attrs['numFmtId'])] = attrs.get('formatCode', '')
+        elif local == 'xf' and pilha and pilha[-1] == 'cellXfs':
+            xfs.append(int(attrs.get('numFmtId', 0)))
+        pilha.append(local)
+
+    def fim(_):
+        pilha.pop()
+
+    p.StartElementHandler, p.EndElementHandler = inicio, fim
+    with zf.open(caminho) as f:
+        _alimentar(p, f)
+    datas = {i for i, fmt in enumerate(xfs) if is_date_format(formatos.get(fmt, ''))}
+    return datas, {i for i in datas if is_timedelta_format(formatos.get(xfs[i], ''))}
+
+
+def _partes_do_pacote(zf: zipfile.ZipFile) -> tuple:
+    """(abas [(nome, caminho)], strings compartilhadas, estilos, época das datas)."""
+    def _rels(caminho: str) -> Dict[str, tuple]:
+        rels = {}
+        base = posixpath.dirname(posixpath.dirname(caminho))
+        p = _parser()
+
+        def inicio(nome, attrs):
+            if nome == f'{NS_PKG_REL} Relationship':
+                alvo = attrs['Target']
+                alvo = alvo.lstrip('/') if alvo.startswith('/') else posixpath.normpath(posixpath.join(base, alvo))
+                rels[attrs['Id']] = (attrs['Type'], alvo)
+
+        p.StartElementHandler = inicio
+        p.Parse(zf.read(caminho), True)
+        return rels
+
+    rels = _rels('xl/_rels/workbook.xml.rels')
+    abas = []
+    epoca = [CALENDAR_WINDOWS_1900]
+    p = _parser()
+
+    def inicio(nome, attrs):
+        if nome == f'{NS_MAIN} sheet':
+            tipo, alvo = rels[attrs[f'{NS_REL} id']]
+            if tipo == TIPO_WORKSHEET:
+                abas.append((attrs['name'], alvo))
+        elif nome == f'{NS_MAIN} workbookPr' and attrs.get('date1904') in ('1', 'true'):
+            epoca[0] = CALENDAR_MAC_1904
+
+    p.StartElementHandler = inicio
+    p.Parse(zf.read('xl/workbook.xml'), True)
+    por_tipo = {tipo.rsplit('/', 1)[-1]: alvo for tipo, alvo in rels.values()}
+    return abas, por_tipo.get('sharedStrings'), por_tipo.get('styles'), epoca[0]
+
+
+def _numero(texto: str):
+    if '.' in texto or 'e' in texto or 'E' in texto:
+        valor = float(texto)
+        return int(valor) if valor.is_integer() else valor
+    return int(texto)
+
+
+def _converter(texto: str, tipo: str, compartilhadas: List[str]):
+    """Valor da célula como o leitor openpyxl do pandas devolve."""
+    if tipo == 's':
+        return compartilhadas[int(texto)]
+    if tipo in ('str', 'inlineStr'):
+        return texto
+    if tipo == 'b':
+        return texto.strip() == '1'
+    if tipo == 'e':
+        return float('nan')
+    if tipo == 'd':
+        return from_ISO8601(texto)
+    return _numero(texto)
+
+
+def colunas_necessarias(cabecalho: pd.DataFrame) -> Optional[List[Hashable]]:
+    """Colunas usadas pelo processamento, detectadas no cabeçalho (None = aba inteira).
+
+    Sem coluna de gaiola ou de endereço reconhecível a aba é lida inteira,
+    pois esses casos caem em detecções que olham todas as colunas.
+    """
+    esquema = inferir_esquema(cabecalho)
+    if esquema.gaiola is None or esquema.endereco is None:
+        return None
+    return sorted({c for c in (esquema.gaiola, esquema.gaiola_radar, esquema.endereco, esquema.bairro) if c is not None})
+
+
+def _dataframe(linhas: List[list]) -> pd.DataFrame:
+    if not linhas:
+        return pd.DataFrame()
+    largura = max(len(linha) for linha in linhas)
+    linhas = [linha + [''] * (largura - len(linha)) for linha in linhas]
+    return TextParser(linhas, header=None).read()
+
+
+class _LeitorAba:
+    """Lê o XML de uma aba, guardando só as colunas escolhidas depois do cabeçalho."""
+
+    def __init__(self, compartilhadas: List[str], estilos_data: Set[int], estilos_duracao: Set[int], epoca):
+        self.compartilhadas = compartilhadas
+        self.estilos_data = estilos_data
+        self.estilos_duracao = estilos_duracao
+        self.epoca = epoca
+        self.cabecalho: List[Dict[int, object]] = []  # primeiras linhas, completas
+        self.linhas: List = []                          # demais linhas (só as colunas mantidas)
+        self.colunas: Optional[List[int]] = None
+        self.decidido = False
+        self.largura = 0                      # maior largura útil (sem vazios à direita)
+        self.n_linhas = 0                     # linhas até a última com dado
+        self._linha: Dict[int, object] = {}
+        self._num_linha = 0
+        self._col = -1
+        self._tipo = 'n'
+        self._estilo = 0
+        self._texto: List[str] = []
+        self._capturar = False
+
+    # --- HANDLERS DO EXPAT ---
+    def inicio(self, nome, attrs):
+        local = nome.rsplit(' ', 1)[-1]
+        if local == 'c':
+            ref = attrs.get('r')
+            self._col = _indice_coluna(ref) if ref else self._col + 1
+            self._tipo = attrs.get('t', 'n')
+            self._estilo = int(attrs.get('s', 0))
+            self._texto = []
+        elif local == 'v' or (local == 't' and self._tipo == 'inlineStr'):
+            self._capturar = True
+        elif local == 'row':
+            r = attrs.get('r')
+            num = int(r) if r else self._num_linha + 1
+            # Linhas ausentes no XML são linhas vazias, como no openpyxl
+            while self._num_linha < num - 1:
+                self._fechar_linha({})
+            self._linha = {}
+            self._col = -1
+
+    def fim(self, nome):
+        local = nome.rsplit(' ', 1)[-1]
+        if local in ('v', 't'):
+            self._capturar = False
+        elif local == 'c':
+            if self._texto:
+                if self._tipo == 'n' and self._estilo in self.estilos_data:
+                    valor = self._data(''.join(self._texto))
+                else:
+                    valor = _converter(''.join(self._texto), self._tipo, self.compartilhadas)
+                if valor != '':
+                    self._linha[self._col] = valor
+        elif local == 'row':
+            self._fechar_linha(self._linha)
+
+    def texto(self, dados):
+        if self._capturar:
+            self._texto.append(dados)
+
+    def _data(self, texto: str):
+        try:
+            return from_excel(_numero(texto), self.epoca, timedelta=self._estilo in self.estilos_duracao)
+        except (OverflowError, ValueError):
+            return float('nan')  # o openpyxl trata a data fora dos limites como erro
+
+    # --- MONTAGEM DAS LINHAS ---
+    def _fechar_linha(self, celulas: Dict[int, object]):
+        self._num_linha += 1
+        if celulas:
+            self.largura = max(self.largura, max(celulas) + 1)
+            self.n_linhas = self._num_linha
+        if not self.decidido:
+            self.cabecalho.append(celulas)
+            if len(self.cabecalho) == LINHAS_CABECALHO:
+                self._decidir()
+        elif self.colunas is None:
+            self.linhas.append(celulas)
+        else:
+            self.linhas.append([celulas.get(c, '') for c in self.colunas])
+
+    def _decidir(self):
+        self.decidido = True
+        cabecalho = _dataframe(self._completas(self.cabecalho[:self.n_linhas]))
+        self.colunas = colunas_necessarias(cabecalho)
+
+    def _completas(self, linhas: List[Dict[int, object]]) -> List[list]:
+        return [[celulas.get(c, '') for c in range(self.largura)] for celulas in linhas]
+
+    def dataframe(self) -> pd.DataFrame:
+        if not self.decidido:
+            self._decidir()
+        if self.colunas is None:
+            colunas = list(range(self.largura))
+            linhas = self._completas((self.cabecalho + self.linhas)[:self.n_linhas])
+        else:
+            colunas = self.colunas
+            cabecalho = [[celulas.get(c, '') for c in colunas] for celulas in self.cabecalho]
+            linhas = (cabecalho + self.linhas)[:self.n_linhas]
+        df = _dataframe(linhas)
+        if not df.empty:
+            df.columns = colunas
+        return df
+
+
+def ler_abas_projetadas(arquivo_bytes: bytes) -> Dict[str, pd.DataFrame]:
+    """Todas as abas, com só as colunas de gaiola, endereço e bairro quando detectadas.
+
+    Levanta o erro do ZIP/XML quando o arquivo não pode ser lido por aqui;
+    quem chama cai no leitor completo.
+    """
+    abas = {}
+    with zipfile.ZipFile(io.BytesIO(arquivo_bytes)) as zf:
+        lista_abas, caminho_strings, caminho_estilos, epoca = _partes_do_pacote(zf)
+        compartilhadas = _strings_compartilhadas(zf, caminho_strings)
+        estilos_data, estilos_duracao = _estilos_data(zf, caminho_estilos)
+        for nome, caminho in lista_abas:
+            leitor = _LeitorAba(compartilhadas, estilos_data, estilos_duracao, epoca)
+            p = _parser()
+            p.StartElementHandler, p.EndElementHandler, p.CharacterDataHandler = leitor.inicio, leitor.fim, leitor.texto
+            with zf.open(caminho) as f:
+                _alimentar(p, f)
+            df = leitor.dataframe()
+            if leitor.colunas is not None:
+                esquema = inferir_esquema(df)
+                for col in {esquema.gaiola, esquema.gaiola_radar, esquema.bairro} - {None}:
+                    df[col] = df[col].astype('category')
+            abas[nome] = df
+    return abas
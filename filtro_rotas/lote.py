@@ -0,0 +1,90 @@
+"""Resumo em lote: pacotes, paradas e comércios de muitas gaiolas de uma vez.
+
+Em vez de filtrar e processar gaiola por gaiola, cada aba detecta a coluna
+de endereço uma única vez, junta as linhas de todas as gaiolas pedidas (pelo
+índice de gaiolas) e calcula as três métricas num único `groupby`.
+Os números batem com `processar_gaiola_unica` para cada gaiola.
+
+O resumo de cada gaiola fica num LRU do processo indexado por (hash do
+romaneio, gaiola), então só as gaiolas ainda não resumidas entram no groupby.
+"""
+import os
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache import CacheLRU
+from .comercio import COMERCIO, classificar_comercio_serie
+from .esquema import coluna_endereco_por_tamanho, inferir_esquema
+from .instrumentacao import etapa
+from .normalizacao import extrair_base_endereco_serie, limpar_string
+
+LIMITE_CACHE_RESUMOS_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_RESUMOS_MB", "16"))
+# Cada resumo é um dict pequeno de tamanho fixo: tamanho aproximado por entrada
+CACHE_RESUMOS = CacheLRU(LIMITE_CACHE_RESUMOS_MB * 1024 * 1024, medir=lambda _: 512)
+
+
+def _vazio(encontrado: bool = False) -> Dict:
+    return {'pacotes': 0, 'paradas': 0, 'comercios': 0, 'encontrado': encontrado}
+
+
+def resumir_gaiolas(manifesto, gaiolas: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """{gaiola: {'pacotes', 'paradas', 'comercios', 'encontrado'}} para todas as gaiolas pedidas.
+
+    Sem `gaiolas`, resume todas as gaiolas do romaneio.
+    """
+    if gaiolas is None:
+        gaiolas = manifesto.indice.gaiolas
+    resultados, faltando = {}, []
+    for g in gaiolas:
+        em_cache = CACHE_RESUMOS.obter((manifesto.hash, limpar_string(g)))
+        if em_cache is None:
+            faltando.append(g)
+        resultados[g] = dict(em_cache) if em_cache is not None else _vazio()
+
+    # Agrupa os pedidos pela aba/coluna onde o índice encontrou cada gaiola
+    por_aba: Dict[str, List] = {}
+    for g in faltando:
+        loc = manifesto.indice.localizar(g)
+        if loc is not None:
+            por_aba.setdefault(loc.aba, []).append((g, loc.linhas))
+
+    with etapa('resumo_gaiolas', gaiolas=len(gaiolas), calculadas=len(faltando)) as medicao:
+        for aba, pedidos in por_aba.items():
+            df = manifesto.abas[aba]
+            col_end = inferir_esquema(df).endereco
+            # {coluna de endereço: [(gaiola, linhas)]}; sem cabeçalho a coluna é escolhida por gaiola
+            por_coluna: Dict[Hashable, List] = {}
+            for g, linhas in pedidos:
+                col = col_end if col_end is not None else coluna_endereco_por_tamanho(df.iloc[linhas])
+                por_coluna.setdefault(col, []).append((g, linhas))
+
+            for col, grupo in por_coluna.items():
+                rotulos = np.concatenate([np.full(len(linhas), i) for i, (_, linhas) in enumerate(grupo)])
+                posicoes = np.concatenate([linhas for _, linhas in grupo])
+                enderecos = df[col].iloc[posicoes].reset_index(drop=True)
+                tabela = pd.DataFrame({
+                    'g': rotulos,
+                    'parada': extrair_base_endereco_serie(enderecos),
+                    'comercio': (classificar_comercio_serie(enderecos) == COMERCIO).to_numpy(),
+                })
+                agregado = tabela.groupby('g').agg(
+                    pacotes=('parada', 'size'), paradas=('parada', 'nunique'), comercios=('comercio', 'sum'))
+                for i, linha in agregado.iterrows():
+                    resultados[grupo[i][0]] = {
+                        'pacotes': int(linha['pacotes']), 'paradas': int(linha['paradas']),
+                        'comercios': int(linha['comercios']), 'encontrado': True,
+                    }
+        medicao.linhas = sum(r['pacotes'] for r in resultados.values())
+    for g in faltando:
+        CACHE_RESUMOS.guardar((manifesto.hash, limpar_string(g)), dict(resultados[g]))
+    return resultados
+
+
+def tabela_resumo(resultados: Dict[str, Dict]) -> pd.DataFrame:
+    return pd.DataFrame([
+        {'Gaiola': k, 'Status': '✅' if v['encontrado'] else '❌', 'Pacotes': v['pacotes'],
+         'Paradas': v['paradas'], 'Comércios': v['comercios']}
+        for k, v in resultados.items()
+    ])
@@ -0,0 +1,136 @@
+"""Geração das planilhas de rota para vários romaneios, fora da interface.
+
+Cada romaneio é processado num processo separado (lê o Excel ou o cache em
+disco, monta a rota de cada gaiola e grava um .xlsx por gaiola, ou um ZIP).
+O resumo sai no terminal ou em JSON, para medir a execução de ponta a ponta.
+
+Uso: python -m filtro_rotas rotas ENTRADA [ENTRADA...] --saida PASTA
+         [--gaiolas A-36 B-50 | --lista-gaiolas arquivo.txt] [--processos N] [--zip] [--json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from .exportacao import gerar_zip_gaiolas, nome_arquivo_gaiola, planilha_excel
+from .manifesto import obter_manifesto
+from .rota import processar_rota_gaiola
+
+
+@dataclass
+class ResultadoArquivo:
+    arquivo: str
+    gaiolas: int = 0
+    planilhas: int = 0
+    pacotes: int = 0
+    ausentes: List[str] = field(default_factory=list)
+    segundos: float = 0.0
+    erro: Optional[str] = None
+
+
+def listar_romaneios(entradas: List[str]) -> List[str]:
+    """Arquivos .xlsx das entradas (arquivos ou pastas), sem repetir."""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            arquivos += sorted(glob.glob(os.path.join(entrada, '*.xlsx')))
+        else:
+            arquivos.append(entrada)
+    return list(dict.fromkeys(os.path.abspath(a) for a in arquivos if not os.path.basename(a).startswith('~$')))
+
+
+def processar_arquivo(caminho: str, pasta_saida: str, gaiolas: Optional[List[str]] = None,
+                      zipar: bool = False) -> ResultadoArquivo:
+    """Grava as rotas das gaiolas pedidas (todas, se `gaiolas` for None) de um romaneio."""
+    inicio = time.perf_counter()
+    resultado = ResultadoArquivo(arquivo=caminho)
+    try:
+        with open(caminho, 'rb') as f:
+            manifesto = obter_manifesto(f.read())
+        pedidas = manifesto.indice.gaiolas if gaiolas is None else gaiolas
+        resultado.gaiolas = len(pedidas)
+        nome_base = os.path.splitext(os.path.basename(caminho))[0]
+        rotas = {}
+        for g in pedidas:
+            res = processar_rota_gaiola(manifesto, g)
+            if res is None:
+                resultado.ausentes.append(g)
+            else:
+                rotas[g] = res['dataframe']
+                resultado.pacotes += res['pacotes']
+        if zipar:
+            os.makedirs(pasta_saida, exist_ok=True)
+            # Um processo por arquivo já ocupa os núcleos: o ZIP é montado em série
+            exportado = gerar_zip_gaiolas(manifesto.hash, list(rotas), rotas.get, max_workers=1)
+            with open(os.path.join(pasta_saida, f'{nome_base}.zip'), 'wb') as f:
+                f.write(exportado.dados)
+        else:
+            pasta = os.path.join(pasta_saida, nome_base)
+            os.makedirs(pasta, exist_ok=True)
+            for g, df in rotas.items():
+                with open(os.path.join(pasta, nome_arquivo_gaiola(g)), 'wb') as f:
+                    f.write(planilha_excel(df))
+        resultado.planilhas = len(rotas)
+    except Exception as e:
+        resultado.erro = f"{type(e).__name__}: {e}"
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def processar_romaneios(arquivos: List[str], pasta_saida: str, gaiolas: Optional[List[str]] = None,
+                        processos: Optional[int] = None, zipar: bool = False) -> List[ResultadoArquivo]:
+    """Processa os romaneios em paralelo, um por processo; resultados na ordem dos arquivos."""
+    n = max(1, min(len(arquivos), processos or os.cpu_count() or 1))
+    if n == 1:
+        return [processar_arquivo(a, pasta_saida, gaiolas, zipar) for a in arquivos]
+    with ProcessPoolExecutor(max_workers=n) as executor:
+        futuros = [executor.submit(processar_arquivo, a, pasta_saida, gaiolas, zipar) for a in arquivos]
+        return [f.result() for f in futuros]
+
+
+def _ler_lista_gaiolas(caminho: str) -> List[str]:
+    with open(caminho, encoding='utf-8') as f:
+        return [linha.strip().upper() for linha in f if linha.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m filtro_rotas rotas',
+                                     description="Gera as planilhas de rota de vários romaneios.")
+    parser.add_argument('entradas', nargs='+', help="arquivos .xlsx ou pastas com romaneios")
+    parser.add_argument('--saida', required=True, help="pasta onde as planilhas são gravadas")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--gaiolas', nargs='+', help="códigos das gaiolas (padrão: todas de cada romaneio)")
+    grupo.add_argument('--lista-gaiolas', help="arquivo com um código de gaiola por linha")
+    parser.add_argument('--processos', type=int, default=None, help="processos em paralelo (padrão: núcleos da máquina)")
+    parser.add_argument('--zip', action='store_true', help="um ZIP por romaneio em vez de uma pasta")
+    parser.add_argument('--json', action='store_true', help="resumo em JSON na saída padrão")
+    args = parser.parse_args(argv)
+
+    gaiolas = _ler_lista_gaiolas(args.lista_gaiolas) if args.lista_gaiolas else (
+        [g.strip().upper() for g in args.gaiolas] if args.gaiolas else None)
+    arquivos = listar_romaneios(args.entradas)
+    if not arquivos:
+        print("Nenhum romaneio .xlsx encontrado.", file=sys.stderr)
+        return 1
+
+    inicio = time.perf_counter()
+    resultados = processar_romaneios(arquivos, args.saida, gaiolas, args.processos, args.zip)
+    total = time.perf_counter() - inicio
+
+    if args.json:
+        print(json.dumps({'segundos': total, 'arquivos': [asdict(r) for r in resultados]}, ensure_ascii=False, indent=2))
+    else:
+        for r in resultados:
+            nome = os.path.basename(r.arquivo)
+            if r.erro:
+                print(f"! {nome}: {r.erro}")
+            else:
+                faltando = f", não encontradas: {', '.join(r.ausentes)}" if r.ausentes else ""
+                print(f"+ {nome}: {r.planilhas}/{r.gaiolas} gaiola(s), {r.pacotes} pacotes em {r.segundos:.2f}s{faltando}")
+        print(f"{sum(r.planilhas for r in resultados)} planilha(s) de {len(resultados)} romaneio(s) em {total:.2f}s")
+    return 1 if any(r.erro for r in resultados) else 0
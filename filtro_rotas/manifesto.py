@@ -0,0 +1,119 @@
+"""Manifesto do romaneio: cada aba do Excel lida uma única vez por upload.
+
+O manifesto é indexado pelo hash do conteúdo do arquivo e fica num LRU do
+processo, então todas as abas da interface e todas as sessões que enviarem
+o mesmo romaneio leem os mesmos DataFrames em memória. Esses DataFrames são
+compartilhados: quem precisar alterá-los deve trabalhar numa cópia.
+"""
+import hashlib
+import io
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from .cache import CacheLRU
+from .cache_disco import CACHE_DISCO
+from .indice import IndiceGaiolas
+from .instrumentacao import etapa
+from .leitura import ler_abas_projetadas
+from .radar import IndiceBairros
+
+logger = logging.getLogger("filtro_rotas")
+
+# Limite de memória do cache de manifestos (MB), ajustável por variável de ambiente
+LIMITE_CACHE_MANIFESTOS_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_MB", "512"))
+
+
+def hash_conteudo(arquivo_bytes: bytes) -> str:
+    return hashlib.sha256(arquivo_bytes).hexdigest()
+
+
+def ler_abas_excel(arquivo_bytes: bytes) -> Dict[str, pd.DataFrame]:
+    try:
+        xl = pd.ExcelFile(io.BytesIO(arquivo_bytes), engine='openpyxl')
+        abas = {}
+        for sheet in xl.sheet_names:
+            try:
+                abas[sheet] = pd.read_excel(xl, sheet_name=sheet, header=None, engine='openpyxl')
+            except Exception:
+                abas[sheet] = pd.read_excel(io.BytesIO(arquivo_bytes), sheet_name=sheet, header=None)
+        return abas
+    except Exception:
+        logger.exception("Falha ao carregar abas do Excel")
+        raise
+
+
+def ler_abas_romaneio(arquivo_bytes: bytes) -> Dict[str, pd.DataFrame]:
+    """Abas do romaneio pelo leitor em streaming, ou pelo leitor completo se ele não servir."""
+    try:
+        return ler_abas_projetadas(arquivo_bytes)
+    except Exception as e:
+        logger.info("Leitura em streaming indisponível (%s); usando o leitor completo", e)
+        return ler_abas_excel(arquivo_bytes)
+
+
+def carregar_abas(arquivo_bytes: bytes, hash_arquivo: str) -> Tuple[Dict[str, pd.DataFrame], IndiceGaiolas]:
+    """(abas, índice de gaiolas) do cache em disco, se este romaneio já foi lido.
+
+    Senão lê o Excel, indexa as gaiolas e grava os dois no cache em disco.
+    """
+    if CACHE_DISCO is not None:
+        with etapa('leitura_cache_disco') as medicao:
+            em_disco = CACHE_DISCO.carregar(hash_arquivo)
+            if em_disco is not None:
+                medicao.linhas = sum(len(df) for df in em_disco[0].values())
+        if em_disco is not None:
+            logger.info("Romaneio %s lido do cache em disco", hash_arquivo[:12])
+            abas, indice = em_disco
+            return abas, indice if indice is not None else IndiceGaiolas(abas)
+    with etapa('leitura_excel', bytes=len(arquivo_bytes)) as medicao:
+        abas = ler_abas_romaneio(arquivo_bytes)
+        medicao.linhas = sum(len(df) for df in abas.values())
+    with etapa('indice_gaiolas', linhas=medicao.linhas):
+        indice = IndiceGaiolas(abas)
+    if CACHE_DISCO is not None:
+        CACHE_DISCO.guardar(hash_arquivo, abas, indice)
+    return abas, indice
+
+
+@dataclass
+class Manifesto:
+    hash: str
+    abas: Dict[str, pd.DataFrame]
+    indice: IndiceGaiolas
+    bairros: IndiceBairros
+    nbytes: int = field(default=0)
+
+    @classmethod
+    def de_bytes(cls, arquivo_bytes: bytes, hash_arquivo: str = None) -> 'Manifesto':
+        hash_arquivo = hash_arquivo or hash_conteudo(arquivo_bytes)
+        abas, indice = carregar_abas(arquivo_bytes, hash_arquivo)
+        nbytes = int(sum(df.memory_usage(deep=True).sum() for df in abas.values())) + indice.nbytes
+        with etapa('indice_bairros'):
+            bairros = IndiceBairros(abas)
+        return cls(hash=hash_arquivo, abas=abas, indice=indice, bairros=bairros, nbytes=nbytes)
+
+    @property
+    def volumetria(self) -> int:
+        """Total de pacotes (linhas de todas as abas, descontando o cabeçalho)."""
+        return sum(max(0, len(df) - 1) for df in self.abas.values())
+
+
+CACHE_MANIFESTOS = CacheLRU(LIMITE_CACHE_MANIFESTOS_MB * 1024 * 1024, medir=lambda m: m.nbytes)
+
+
+def obter_manifesto(arquivo_bytes: bytes) -> Manifesto:
+    """Manifesto do arquivo, lendo o Excel só se esse conteúdo ainda não estiver em cache."""
+    chave = hash_conteudo(arquivo_bytes)
+
+    def _ler() -> Manifesto:
+        logger.info("Lendo romaneio %s (%d bytes)", chave[:12], len(arquivo_bytes))
+        with etapa('carga_romaneio', hash=chave[:12]) as medicao:
+            manifesto = Manifesto.de_bytes(arquivo_bytes, chave)
+            medicao.linhas = manifesto.volumetria
+        return manifesto
+
+    return CACHE_MANIFESTOS.obter_ou_calcular(chave, _ler)
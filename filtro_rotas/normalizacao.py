@@ -0,0 +1,131 @@
+"""Normalização de textos do romaneio (códigos de gaiola e endereços).
+
+Cada função escalar tem uma versão vetorizada `*_serie` com saída idêntica.
+As versões vetorizadas processam só os valores distintos da coluna (gaiolas,
+bairros e endereços se repetem muito) e usam tabelas de tradução e regex
+compiladas uma única vez, com caminho rápido em bytes para textos ASCII.
+
+Não usamos as regex `.str` do dtype de string do pandas 3: elas passam pelo
+RE2 do pyarrow, onde `\\w` e `\\d` só reconhecem ASCII, e o resultado
+deixaria de bater com `str.isalnum` em endereços com acento.
+"""
+import re
+import unicodedata
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+# Bytes ASCII que não são alfanuméricos (removidos por bytes.translate)
+APAGAR_ASCII = bytes(c for c in range(128) if not chr(c).isalnum())
+# Acentos combinantes do latim; demais marcas (categoria Mn) caem no caminho lento
+RE_COMBINANTES_LATINOS = re.compile('[\u0300-\u036f]+')
+RE_NUMERO_APOS_VIRGULA = re.compile(r'^[^,]*,[^,\d]*(\d+)')
+RE_PRIMEIRO_NUMERO = re.compile(r'(\d+)')
+
+
+def _limpar_texto(texto: str) -> str:
+    if texto.isascii():
+        return texto.encode('ascii').translate(None, APAGAR_ASCII).decode('ascii').upper()
+    return "".join(filter(str.isalnum, texto)).upper()
+
+
+def _remover_acentos_texto(texto: str) -> str:
+    if texto.isascii():
+        return texto.upper()
+    texto = RE_COMBINANTES_LATINOS.sub('', unicodedata.normalize('NFD', texto))
+    if not texto.isascii():
+        texto = "".join(c for c in texto if unicodedata.category(c) != 'Mn')
+    return texto.upper()
+
+
+# --- VERSÕES ESCALARES ---
+def remover_acentos(texto) -> str:
+    return _remover_acentos_texto(str(texto))
+
+
+def limpar_string(s) -> str:
+    return _limpar_texto(str(s))
+
+
+def extrair_base_endereco(endereco_completo) -> str:
+    partes = str(endereco_completo).split(',')
+    base = partes[0].strip() + " " + partes[1].strip() if len(partes) >= 2 else partes[0].strip()
+    return limpar_string(base)
+
+
+def normalizar_nome_rua(endereco) -> str:
+    if not isinstance(endereco, str): return ""
+    nome = endereco.split(',')[0]
+    return limpar_string(remover_acentos(nome))
+
+
+def extrair_numero_correto(endereco) -> str:
+    if not isinstance(endereco, str): return "SN"
+    partes = endereco.split(',')
+    if len(partes) >= 2:
+        match = RE_PRIMEIRO_NUMERO.search(partes[1])
+        if match: return match.group(1)
+    match = RE_PRIMEIRO_NUMERO.search(endereco)
+    return match.group(1) if match else "SN"
+
+
+# --- VERSÕES VETORIZADAS ---
+def _por_valores_unicos(serie: pd.Series,
+                        transformar: Callable[[pd.Series, np.ndarray], pd.Series]) -> pd.Series:
+    """Aplica `transformar(texto, eh_texto)` aos valores distintos de `serie` e espalha o resultado.
+
+    `texto` é `str(valor)` em dtype object; `eh_texto` marca os valores que já eram `str`.
+    Valores não-str entram na chave junto com o tipo, para que 1, 1.0 e True
+    (iguais para o Python) continuem distintos, pois `str()` difere em cada um.
+    """
+    valores = serie.to_numpy(dtype=object)
+    mapa = {}
+    codigos = np.fromiter(
+        (mapa.setdefault(v if isinstance(v, str) else (type(v), str(v)), len(mapa)) for v in valores),
+        dtype=np.intp, count=len(valores))
+    texto = pd.Series([k if isinstance(k, str) else k[1] for k in mapa], dtype=object)
+    eh_texto = np.fromiter((isinstance(k, str) for k in mapa), dtype=bool, count=len(mapa))
+    resultado = transformar(texto, eh_texto).to_numpy(dtype=object)
+    return pd.Series(resultado[codigos] if len(codigos) else [], index=serie.index, dtype=object)
+
+
+def _limpar(texto: pd.Series) -> pd.Series:
+    return pd.Series([_limpar_texto(t) for t in texto], index=texto.index, dtype=object)
+
+
+def _remover_acentos(texto: pd.Series) -> pd.Series:
+    return pd.Series([_remover_acentos_texto(t) for t in texto], index=texto.index, dtype=object)
+
+
+def limpar_serie(serie: pd.Series) -> pd.Series:
+    return _por_valores_unicos(serie, lambda texto, _: _limpar(texto))
+
+
+def remover_acentos_serie(serie: pd.Series) -> pd.Series:
+    return _por_valores_unicos(serie, lambda texto, _: _remover_acentos(texto))
+
+
+def extrair_base_endereco_serie(serie: pd.Series) -> pd.Series:
+    # Os espaços do strip() somem junto com os demais não alfanuméricos
+    def _transformar(texto: pd.Series, _) -> pd.Series:
+        return _limpar(pd.Series(["".join(t.split(',', 2)[:2]) for t in texto], dtype=object))
+    return _por_valores_unicos(serie, _transformar)
+
+
+def normalizar_nome_rua_serie(serie: pd.Series) -> pd.Series:
+    def _transformar(texto: pd.Series, eh_texto: np.ndarray) -> pd.Series:
+        nomes = pd.Series([t.split(',', 1)[0] for t in texto], dtype=object)
+        return _limpar(_remover_acentos(nomes)).where(eh_texto, "")
+    return _por_valores_unicos(serie, _transformar)
+
+
+def _numero(texto: str) -> str:
+    match = RE_NUMERO_APOS_VIRGULA.match(texto) or RE_PRIMEIRO_NUMERO.search(texto)
+    return match.group(1) if match else "SN"
+
+
+def extrair_numero_serie(serie: pd.Series) -> pd.Series:
+    def _transformar(texto: pd.Series, eh_texto: np.ndarray) -> pd.Series:
+        return pd.Series([_numero(t) for t in texto], dtype=object).where(eh_texto, "SN")
+    return _por_valores_unicos(serie, _transformar)
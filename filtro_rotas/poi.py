@@ -0,0 +1,600 @@
+"""Pontos de interesse do Pit Stop e do SOS Mecânico, consultados sem rede.
+
+Um extrato do OSM do Ceará é importado uma vez para um arquivo .npz com a
+posição, as categorias e o nome de cada POI (posto, restaurante, mercado,
+borracharia, oficina, reboque). As categorias são bits de uma máscara: um
+"Auto Posto e Borracharia" aparece no Pit Stop e no SOS. Formatos aceitos: GeoJSON já filtrado
+(propriedades = tags do OSM), JSON do Overpass e PBF (este com pyosmium).
+
+O índice usa uma grade uniforme de células de 1 km: os pontos ficam
+ordenados por célula e a busca num raio percorre só os anéis de células
+que cabem nele. O Overpass serve para acrescentar
+ao arquivo os pontos em volta de uma posição, e de fonte na falta da base.
+
+A interface consulta por tiles (`buscar_pois`): a primeira busca num tile de
+~2 km traz de uma vez, da base local ou do Overpass, tudo o que está a até
+RAIO_MAX_M de qualquer ponto dele. Raios menores, outros k e motoristas
+vizinhos no mesmo tile só filtram esse array, já ordenado pela distância ao
+centro do tile. Um tile que falhou (sem rede, Overpass ocupado) não é
+consultado de novo por TEMPO_FALHA_TILE_S segundos.
+
+Uso: python -m filtro_rotas pois importar ARQUIVO [ARQUIVO...] | info
+         | atualizar LAT LON [--raio METROS]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache import CacheLRU
+from .geo import RAIO_TERRA_M, distancia_metros
+from .instrumentacao import etapa
+
+logger = logging.getLogger("filtro_rotas")
+
+ARQUIVO_POIS = os.environ.get(
+    "FILTRO_ROTAS_POIS", os.path.join(os.path.expanduser("~"), ".cache", "filtro_rotas", "pois.npz"))
+TAM_CELULA_M = 1000
+RAIO_MAX_M = 10000
+# Folga para a distorção da projeção plana usada na grade (menos de 1% no Ceará)
+FOLGA_PROJECAO = 0.98
+URL_OVERPASS = "https://overpass-api.de/api/interpreter"
+# Tiles de ~2 km: cada um guarda os POIs até RAIO_MAX_M de qualquer ponto dentro dele
+TAM_TILE_GRAUS = float(os.environ.get("FILTRO_ROTAS_POIS_TILE_GRAUS", "0.02"))
+RAIO_TILE_M = RAIO_MAX_M + TAM_TILE_GRAUS * math.pi / 180 * RAIO_TERRA_M / math.sqrt(2)
+MAX_FALHAS_PREFETCH = 3
+# No prefetch, o Overpass recebe uma consulta por área de LADO_AREA_TILES x LADO_AREA_TILES tiles
+# (com a folga de RAIO_TILE_M, ~25 km de lado), e não uma caixa para a rota inteira
+LADO_AREA_TILES = int(os.environ.get("FILTRO_ROTAS_POIS_AREA_TILES", "2"))
+TEMPO_FALHA_TILE_S = float(os.environ.get("FILTRO_ROTAS_POIS_FALHA_S", "60"))
+LIMITE_CACHE_POIS_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_POIS_MB", "32"))
+
+POSTO, RESTAURANTE, MERCADO, BORRACHARIA, OFICINA, REBOQUE = range(6)
+CATEGORIAS = {
+    POSTO: ("⛽ Posto", "⛽"),
+    RESTAURANTE: ("🍴 Restaurante", "🍴"),
+    MERCADO: ("🏪 Mercado", "🏪"),
+    BORRACHARIA: ("🔘 Borracharia", "🔘"),
+    OFICINA: ("🔧 Oficina", "🔧"),
+    REBOQUE: ("🛻 Reboque", "🛻"),
+}
+PIT_STOP = (POSTO, RESTAURANTE, MERCADO)
+SOS = (BORRACHARIA, OFICINA, REBOQUE)
+RE_NOME_SOS = re.compile(r'borracharia|oficina|reboque|mec[aâ]nica|auto center|pneus', re.IGNORECASE)
+
+# {(fonte.chave, tile): TilePOIs}, compartilhado entre sessões
+CACHE_TILES = CacheLRU(LIMITE_CACHE_POIS_MB * 1024 * 1024, medir=lambda t: t.nbytes + 256)
+# {(fonte.chave, tile): instante da última falha}
+_FALHAS_TILES: Dict[tuple, float] = {}
+_LOCK_FALHAS = threading.Lock()
+
+
+class FormatoNaoSuportado(Exception):
+    """Arquivo de POIs que não dá para importar (formato desconhecido ou sem pyosmium)."""
+
+
+class TileIndisponivel(Exception):
+    """A busca do tile falhou há menos de TEMPO_FALHA_TILE_S segundos."""
+
+
+def mascara(categorias: Iterable[int]) -> int:
+    """Máscara de bits das categorias."""
+    bits = 0
+    for c in categorias:
+        bits |= 1 << c
+    return bits
+
+
+def categorias_osm(tags: Dict[str, str]) -> Optional[int]:
+    """Máscara das categorias do POI pelas tags do OSM (as regras das antigas consultas ao Overpass).
+
+    Cada regra acrescenta o seu bit em vez de decidir sozinha: um posto com
+    borracharia (pelo nome ou por shop=tyres) continua no SOS. None se nenhuma serve.
+    """
+    nome = str(tags.get('name', '')).lower()
+    amenity, shop = tags.get('amenity', ''), tags.get('shop', '')
+    bits = 0
+    if amenity == 'fuel' or 'posto' in nome:
+        bits |= 1 << POSTO
+    if amenity in ('restaurant', 'cafe', 'fast_food'):
+        bits |= 1 << RESTAURANTE
+    if shop in ('convenience', 'supermarket'):
+        bits |= 1 << MERCADO
+    if shop in ('car_repair', 'tyres', 'motorcycle_repair') or tags.get('craft') == 'car_repair' or RE_NOME_SOS.search(nome):
+        if 'borracharia' in nome or shop == 'tyres':
+            bits |= 1 << BORRACHARIA
+        elif 'reboque' in nome:
+            bits |= 1 << REBOQUE
+        else:
+            bits |= 1 << OFICINA
+    return bits or None
+
+
+# --- IMPORTAÇÃO ---
+# (lat, lon, máscara das categorias, nome)
+Registro = Tuple[float, float, int, str]
+
+
+def _registro(tags: Dict, lat, lon) -> Optional[Registro]:
+    bits = categorias_osm(tags)
+    if bits is None or lat is None or lon is None:
+        return None
+    return float(lat), float(lon), bits, str(tags.get('name', 'Sem Nome'))
+
+
+def _centro(geometria: Dict) -> Tuple[Optional[float], Optional[float]]:
+    coords = np.asarray(_pontos(geometria.get('coordinates', [])), dtype=float)
+    if coords.size == 0:
+        return None, None
+    return float(coords[:, 1].mean()), float(coords[:, 0].mean())
+
+
+def _pontos(coords) -> List:
+    # Achata Point/LineString/Polygon/Multi* numa lista de [lon, lat]
+    if coords and isinstance(coords[0], (int, float)):
+        return [coords[:2]]
+    return [p for c in coords for p in _pontos(c)]
+
+
+def registros_geojson(dados: Dict) -> Iterator[Registro]:
+    for feature in dados.get('features', []):
+        lat, lon = _centro(feature.get('geometry') or {})
+        registro = _registro(feature.get('properties') or {}, lat, lon)
+        if registro:
+            yield registro
+
+
+def registros_overpass(dados: Dict) -> Iterator[Registro]:
+    for element in dados.get('elements', []):
+        centro = element.get('center', {})
+        registro = _registro(element.get('tags', {}), element.get('lat', centro.get('lat')), element.get('lon', centro.get('lon')))
+        if registro:
+            yield registro
+
+
+def registros_pbf(caminho: str) -> Iterator[Registro]:
+    try:
+        import osmium
+    except ImportError:
+        raise FormatoNaoSuportado("Importar .pbf requer o pacote 'osmium' (pyosmium)")
+    filtro = osmium.filter.KeyFilter('amenity', 'shop', 'craft', 'name')
+    for obj in osmium.FileProcessor(caminho).with_locations().with_filter(filtro):
+        tags = dict(obj.tags)
+        if categorias_osm(tags) is None:
+            continue
+        if obj.is_node():
+            lat, lon = obj.location.lat, obj.location.lon
+        elif obj.is_way():
+            pontos = [(n.lat, n.lon) for n in obj.nodes if n.location.valid()]
+            if not pontos:
+                continue
+            lat, lon = (sum(p[0] for p in pontos) / len(pontos), sum(p[1] for p in pontos) / len(pontos))
+        else:
+            continue
+        yield _registro(tags, lat, lon)
+
+
+def ler_registros(caminho: str) -> Iterator[Registro]:
+    """POIs de um arquivo .geojson/.json (GeoJSON ou Overpass) ou .pbf."""
+    if caminho.endswith('.pbf'):
+        yield from registros_pbf(caminho)
+        return
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+    if 'features' in dados:
+        yield from registros_geojson(dados)
+    elif 'elements' in dados:
+        yield from registros_overpass(dados)
+    else:
+        raise FormatoNaoSuportado(f"{caminho}: nem GeoJSON nem JSON do Overpass")
+
+
+# --- ÍNDICE EM GRADE ---
+class IndicePOIs:
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, categorias: np.ndarray, nomes: np.ndarray,
+                 tam_celula_m: float = TAM_CELULA_M):
+        self.tam_celula_m = tam_celula_m
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        # Projeção plana com o cosseno da latitude média (o Ceará inteiro cabe numa faixa estreita)
+        self._cos_ref = math.cos(math.radians(float(lat.mean()))) if len(lat) else 1.0
+        cx, cy = self._celula(lat, lon)
+        ordem = np.lexsort((cy, cx))
+        self.lat, self.lon = lat[ordem], lon[ordem]
+        self.categorias = np.asarray(categorias, dtype=np.uint8)[ordem]
+        self.nomes = np.asarray(nomes, dtype=str)[ordem]
+        chaves = self._chave(cx[ordem], cy[ordem])
+        self._chaves, self._inicios = np.unique(chaves, return_index=True)
+        self._fins = np.append(self._inicios[1:], len(chaves))
+        # Identifica o conteúdo nas chaves do cache de tiles
+        self.versao = hashlib.blake2b(self.lat.tobytes() + self.lon.tobytes() + self.categorias.tobytes(),
+                                      digest_size=8).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _celula(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        y = np.radians(lat) * RAIO_TERRA_M
+        x = np.radians(lon) * self._cos_ref * RAIO_TERRA_M
+        return np.floor(x / self.tam_celula_m).astype(np.int64), np.floor(y / self.tam_celula_m).astype(np.int64)
+
+    @staticmethod
+    def _chave(cx, cy) -> np.ndarray:
+        return (np.asarray(cx, dtype=np.int64) << 32) + (np.asarray(cy, dtype=np.int64) & 0xFFFFFFFF)
+
+    @classmethod
+    def de_registros(cls, registros: Iterable[Registro]) -> 'IndicePOIs':
+        # Um ponto por (nome, categorias, posição a ~1 m): o mesmo POI pode vir de vários arquivos
+        unicos = {(round(la, 5), round(lo, 5), c, n): None for la, lo, c, n in registros}
+        if not unicos:
+            vazio = np.zeros(0)
+            return cls(vazio, vazio, vazio.astype(np.uint8), np.zeros(0, dtype=str))
+        lat, lon, cat, nomes = zip(*unicos)
+        return cls(np.array(lat), np.array(lon), np.array(cat), np.array(nomes))
+
+    def registros(self) -> Iterator[Registro]:
+        return zip(self.lat.tolist(), self.lon.tolist(), self.categorias.tolist(), self.nomes.tolist())
+
+    def salvar(self, caminho: str = ARQUIVO_POIS) -> None:
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        temporario = caminho + '.tmp.npz'
+        np.savez_compressed(temporario, lat=self.lat, lon=self.lon, categorias=self.categorias, nomes=self.nomes)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho: str = ARQUIVO_POIS) -> 'IndicePOIs':
+        with np.load(caminho, allow_pickle=False) as dados:
+            return cls(dados['lat'], dados['lon'], dados['categorias'], dados['nomes'])
+
+    def _anel(self, cx: int, cy: int, r: int) -> np.ndarray:
+        """Posições dos pontos nas células à distância (Chebyshev) exatamente r da célula central."""
+        if r == 0:
+            dx, dy = np.array([0]), np.array([0])
+        else:
+            lado = np.arange(-r, r + 1)
+            dx = np.concatenate([lado, lado, np.full(2 * r - 1, -r), np.full(2 * r - 1, r)])
+            dy = np.concatenate([np.full(2 * r + 1, -r), np.full(2 * r + 1, r), lado[1:-1], lado[1:-1]])
+        chaves = self._chave(cx + dx, cy + dy)
+        pos = np.minimum(np.searchsorted(self._chaves, chaves), len(self._chaves) - 1)
+        pos = pos[self._chaves[pos] == chaves]
+        if not len(pos):
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate([np.arange(i, f) for i, f in zip(self._inicios[pos], self._fins[pos])])
+
+    def no_raio(self, lat: float, lon: float, raio_m: float) -> np.ndarray:
+        """Posições de todos os POIs a até `raio_m` do ponto."""
+        if not len(self):
+            return np.zeros(0, dtype=np.intp)
+        cx, cy = (int(v[0]) for v in self._celula(np.array([lat]), np.array([lon])))
+        aneis = int(math.ceil(raio_m / (self.tam_celula_m * FOLGA_PROJECAO)))
+        idx = np.concatenate([self._anel(cx, cy, r) for r in range(aneis + 1)])
+        return idx[distancia_metros(lat, lon, self.lat[idx], self.lon[idx]) <= raio_m]
+
+
+def _local(pois, i: int, distancia: float, categorias: Optional[Sequence[int]] = None) -> Dict:
+    """POI `i` de um índice ou tile no formato mostrado na interface, com a primeira das categorias pedidas."""
+    bits = int(pois.categorias[i])
+    tipo, icone = next(v for c, v in CATEGORIAS.items() if bits >> c & 1 and (categorias is None or c in categorias))
+    return {'nome': str(pois.nomes[i]), 'tipo': tipo, 'icone': icone, 'distancia': distancia,
+            'lat': float(pois.lat[i]), 'lon': float(pois.lon[i])}
+
+
+def carregar_indice(caminho: str = ARQUIVO_POIS) -> Optional[IndicePOIs]:
+    """Índice salvo, ou None se ainda não houve importação."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return IndicePOIs.carregar(caminho)
+    except Exception:
+        logger.warning("Arquivo de POIs ilegível: %s", caminho, exc_info=True)
+        return None
+
+
+# --- ATUALIZAÇÃO PELO OVERPASS (OPCIONAL) ---
+def _consulta(area: str) -> str:
+    return f"""
+    [out:json][timeout:25];
+    (
+      nwr["amenity"~"^(restaurant|fuel|cafe|fast_food)$"]({area});
+      nwr["shop"~"^(convenience|supermarket|car_repair|tyres|motorcycle_repair)$"]({area});
+      nwr["craft"~"car_repair"]({area});
+      nwr["name"~"Borracharia|Oficina|Reboque|Mecânica|Auto Center|Pneus", i]({area});
+    );
+    out center;
+    """
+
+
+def consulta_overpass(lat: float, lon: float, raio: int) -> str:
+    return _consulta(f"around:{raio},{lat},{lon}")
+
+
+def consulta_overpass_area(sul: float, oeste: float, norte: float, leste: float) -> str:
+    return _consulta(f"{sul:.6f},{oeste:.6f},{norte:.6f},{leste:.6f}")
+
+
+class FonteOverpass:
+    """Busca os POIs em volta de um ponto numa única consulta ao Overpass."""
+    chave = ('overpass',)
+
+    def __init__(self, sessao=None):
+        if sessao is None:
+            import requests
+            sessao = requests.Session()
+        self.sessao = sessao
+
+    def _consultar(self, consulta: str) -> List[Registro]:
+        resposta = self.sessao.get(URL_OVERPASS, params={'data': consulta}, timeout=25)
+        resposta.raise_for_status()
+        return list(registros_overpass(resposta.json()))
+
+    def registros(self, lat: float, lon: float, raio_m: float) -> List[Registro]:
+        return self._consultar(consulta_overpass(lat, lon, int(raio_m)))
+
+    def registros_area(self, sul: float, oeste: float, norte: float, leste: float) -> List[Registro]:
+        """Todos os POIs do retângulo, numa consulta (o prefetch da rota usa uma só para todos os tiles)."""
+        return self._consultar(consulta_overpass_area(sul, oeste, norte, leste))
+
+
+def atualizar_pelo_overpass(lat: float, lon: float, raio: int = 5000, sessao=None,
+                            caminho: str = ARQUIVO_POIS) -> IndicePOIs:
+    """Acrescenta ao arquivo de POIs os pontos do Overpass em volta da posição e devolve o índice novo."""
+    novos = FonteOverpass(sessao).registros(lat, lon, raio)
+    atual = carregar_indice(caminho)
+    indice = IndicePOIs.de_registros(list(atual.registros() if atual else []) + novos)
+    indice.salvar(caminho)
+    logger.info("POIs: %d do Overpass em volta de (%.4f, %.4f); %d no total", len(novos), lat, lon, len(indice))
+    return indice
+
+
+# --- BUSCA POR TILES ---
+class FonteLocal:
+    """Busca os POIs em volta de um ponto na base local."""
+
+    def __init__(self, indice: IndicePOIs):
+        self.indice = indice
+        self.chave = ('local', indice.versao)
+
+    def registros(self, lat: float, lon: float, raio_m: float) -> List[Registro]:
+        indice = self.indice
+        idx = indice.no_raio(lat, lon, raio_m)
+        return list(zip(indice.lat[idx].tolist(), indice.lon[idx].tolist(), indice.categorias[idx].tolist(), indice.nomes[idx].tolist()))
+
+
+def tile_de(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / TAM_TILE_GRAUS), math.floor(lon / TAM_TILE_GRAUS)
+
+
+def centro_tile(tile: Tuple[int, int]) -> Tuple[float, float]:
+    return (tile[0] + 0.5) * TAM_TILE_GRAUS, (tile[1] + 0.5) * TAM_TILE_GRAUS
+
+
+class TilePOIs:
+    """POIs a até RAIO_TILE_M do centro de um tile, ordenados pela distância ao centro.
+
+    Cobre qualquer busca de até RAIO_MAX_M feita de dentro do tile.
+    """
+
+    def __init__(self, tile: Tuple[int, int], registros: Sequence[Registro]):
+        self.tile = tile
+        self.lat_centro, self.lon_centro = centro_tile(tile)
+        lat, lon, categorias, nomes = (list(c) for c in zip(*registros)) if registros else ([], [], [], [])
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        dist = distancia_metros(self.lat_centro, self.lon_centro, lat, lon)
+        ordem = np.argsort(dist, kind='stable')
+        self.dist_centro = dist[ordem]
+        self.lat, self.lon = lat[ordem], lon[ordem]
+        self.categorias = np.asarray(categorias, dtype=np.uint8)[ordem]
+        self.nomes = np.asarray(nomes, dtype=str)[ordem]
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @property
+    def nbytes(self) -> int:
+        return self.lat.nbytes + self.lon.nbytes + self.dist_centro.nbytes + self.categorias.nbytes + self.nomes.nbytes
+
+    def proximos(self, lat: float, lon: float, raio_m: float = RAIO_MAX_M, k: int = 10,
+                 categorias: Optional[Sequence[int]] = None) -> List[Dict]:
+        raio_m = min(raio_m, RAIO_MAX_M)
+        # Desigualdade triangular: além de raio + (distância do ponto ao centro), nada serve
+        alcance = raio_m + float(distancia_metros(lat, lon, self.lat_centro, self.lon_centro))
+        n = int(np.searchsorted(self.dist_centro, alcance, side='right'))
+        dist = distancia_metros(lat, lon, self.lat[:n], self.lon[:n])
+        validos = dist <= raio_m
+        if categorias is not None:
+            validos &= (self.categorias[:n] & mascara(categorias)) != 0
+        idx = np.flatnonzero(validos)
+        idx = idx[np.argsort(dist[idx], kind='stable')[:k]]
+        return [_local(self, int(i), float(dist[i]), categorias) for i in idx]
+
+
+def tile_em_cache(fonte, tile: Tuple[int, int]) -> Optional[TilePOIs]:
+    """Tile já carregado, sem consultar a fonte."""
+    return CACHE_TILES.obter((fonte.chave, tile))
+
+
+def falhou_ha_pouco(fonte, tile: Tuple[int, int]) -> bool:
+    chave = (fonte.chave, tile)
+    with _LOCK_FALHAS:
+        instante = _FALHAS_TILES.get(chave)
+        if instante is not None and time.monotonic() - instante >= TEMPO_FALHA_TILE_S:
+            del _FALHAS_TILES[chave]
+            instante = None
+        return instante is not None
+
+
+def obter_tile(fonte, tile: Tuple[int, int]) -> TilePOIs:
+    """Tile em cache; na falta, uma única busca na fonte com o raio do tile inteiro.
+
+    Se a busca falhou há pouco, levanta TileIndisponivel sem consultar a fonte.
+    """
+    chave = (fonte.chave, tile)
+    pronto = CACHE_TILES.obter(chave)
+    if pronto is not None:
+        return pronto
+    if falhou_ha_pouco(fonte, tile):
+        raise TileIndisponivel(f"POIs do tile {tile} indisponíveis")
+
+    def calcular() -> TilePOIs:
+        lat, lon = centro_tile(tile)
+        try:
+            with etapa('carga_tile_pois', tile=tile):
+                return TilePOIs(tile, fonte.registros(lat, lon, RAIO_TILE_M))
+        except Exception:
+            with _LOCK_FALHAS:
+                _FALHAS_TILES[chave] = time.monotonic()
+            raise
+    return CACHE_TILES.obter_ou_calcular(chave, calcular)
+
+
+def tiles_da_rota(lat, lon) -> List[Tuple[int, int]]:
+    """Tiles das paradas, na ordem em que a rota passa por eles (sem coordenadas vazias ou zeradas)."""
+    lat = pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype=float)
+    validas = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & ((lat != 0) | (lon != 0))
+    ty = np.floor(lat[validas] / TAM_TILE_GRAUS).astype(np.int64)
+    tx = np.floor(lon[validas] / TAM_TILE_GRAUS).astype(np.int64)
+    return list(dict.fromkeys(zip(ty.tolist(), tx.tolist())))
+
+
+def area_tiles(tiles: Sequence[Tuple[int, int]]) -> Tuple[float, float, float, float]:
+    """(sul, oeste, norte, leste) que cobre RAIO_TILE_M em volta do centro de cada tile."""
+    lats, lons = zip(*(centro_tile(t) for t in tiles))
+    folga_lat = math.degrees(RAIO_TILE_M / RAIO_TERRA_M)
+    folga_lon = folga_lat / math.cos(math.radians(max(abs(min(lats)), abs(max(lats)))))
+    return min(lats) - folga_lat, min(lons) - folga_lon, max(lats) + folga_lat, max(lons) + folga_lon
+
+
+def areas_de_tiles(tiles: Sequence[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+    """Tiles agrupados em blocos de LADO_AREA_TILES x LADO_AREA_TILES, na ordem em que a rota chega a cada bloco."""
+    lado = max(1, LADO_AREA_TILES)
+    areas: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for tile in tiles:
+        areas.setdefault((tile[0] // lado, tile[1] // lado), []).append(tile)
+    return list(areas.values())
+
+
+def _repartir_area(fonte, tiles: Sequence[Tuple[int, int]]) -> int:
+    """Uma consulta `fonte.registros_area` para os tiles de uma área, repartida em TilePOIs no cache.
+
+    Se a consulta falha, só os tiles desta área ficam marcados como falhos.
+    """
+    with etapa('carga_area_pois', tiles=len(tiles)):
+        try:
+            registros = fonte.registros_area(*area_tiles(tiles))
+        except Exception:
+            with _LOCK_FALHAS:
+                agora = time.monotonic()
+                _FALHAS_TILES.update({(fonte.chave, t): agora for t in tiles})
+            raise
+        lat = np.array([r[0] for r in registros], dtype=float)
+        lon = np.array([r[1] for r in registros], dtype=float)
+        for tile in tiles:
+            perto = np.flatnonzero(distancia_metros(*centro_tile(tile), lat, lon) <= RAIO_TILE_M)
+            CACHE_TILES.guardar((fonte.chave, tile), TilePOIs(tile, [registros[i] for i in perto]))
+    return len(tiles)
+
+
+def aquecer_tiles(fonte, tiles: Sequence[Tuple[int, int]], tarefa=None) -> int:
+    """Deixa os tiles no cache e devolve quantos estão prontos.
+
+    Fontes remotas com `registros_area` (o Overpass) recebem uma consulta
+    por área de até LADO_AREA_TILES x LADO_AREA_TILES tiles que faltam
+    (`areas_de_tiles`), em vez de uma por tile.
+
+    Um tile ou área que falha (sem rede, Overpass ocupado) é registrado e
+    pulado; a busca dele só é refeita depois de TEMPO_FALHA_TILE_S. Depois de
+    MAX_FALHAS_PREFETCH falhas seguidas o resto fica para depois, para não
+    prender a thread do executor esperando timeouts.
+    """
+    prontos = falhas = 0
+    with etapa('prefetch_pois', tiles=len(tiles)):
+        if hasattr(fonte, 'registros_area'):
+            faltam = [t for t in tiles if tile_em_cache(fonte, t) is None and not falhou_ha_pouco(fonte, t)]
+            prontos = sum(1 for t in tiles if tile_em_cache(fonte, t) is not None)
+            areas = areas_de_tiles(faltam)
+            for i, area in enumerate(areas):
+                try:
+                    prontos += _repartir_area(fonte, area)
+                    falhas = 0
+                except Exception:
+                    falhas += 1
+                    logger.warning("POIs da área %s indisponíveis (%d tile(s))", area[0], len(area), exc_info=True)
+                    if falhas >= MAX_FALHAS_PREFETCH:
+                        break
+                if tarefa is not None:
+                    tarefa.atualizar((i + 1) / len(areas), f"{prontos}/{len(tiles)} área(s)")
+            return prontos
+        for i, tile in enumerate(tiles):
+            try:
+                obter_tile(fonte, tile)
+                prontos += 1
+                falhas = 0
+            except TileIndisponivel:
+                falhas += 1
+            except Exception:
+                falhas += 1
+                logger.warning("POIs do tile %s indisponíveis", tile, exc_info=True)
+                if falhas >= MAX_FALHAS_PREFETCH:
+                    break
+            if tarefa is not None:
+                tarefa.atualizar((i + 1) / len(tiles), f"{prontos}/{len(tiles)} área(s)")
+    return prontos
+
+
+def buscar_pois(lat: float, lon: float, fonte, raio_m: float = RAIO_MAX_M, k: int = 10,
+                categorias: Optional[Sequence[int]] = None) -> List[Dict]:
+    """Os k POIs mais próximos até `raio_m` (no máximo RAIO_MAX_M), filtrados do tile em cache."""
+    with etapa('busca_pois', k=k):
+        return obter_tile(fonte, tile_de(lat, lon)).proximos(lat, lon, raio_m, k, categorias)
+
+
+# --- LINHA DE COMANDO ---
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m filtro_rotas pois', description="Base local de POIs do Pit Stop e do SOS.")
+    parser.add_argument('--arquivo', default=ARQUIVO_POIS, help="arquivo .npz da base (padrão: %(default)s)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_importar = sub.add_parser('importar', help="importa extratos do OSM (.geojson, .json do Overpass, .pbf)")
+    p_importar.add_argument('entradas', nargs='+')
+    p_importar.add_argument('--acrescentar', action='store_true', help="mantém os POIs já importados")
+    sub.add_parser('info', help="quantos POIs há em cada categoria")
+    p_atualizar = sub.add_parser('atualizar', help="acrescenta os POIs do Overpass em volta de um ponto")
+    p_atualizar.add_argument('lat', type=float)
+    p_atualizar.add_argument('lon', type=float)
+    p_atualizar.add_argument('--raio', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'importar':
+        inicio = time.perf_counter()
+        atual = carregar_indice(args.arquivo) if args.acrescentar else None
+        registros = list(atual.registros()) if atual else []
+        try:
+            for entrada in args.entradas:
+                registros += list(ler_registros(entrada))
+        except (FormatoNaoSuportado, OSError, ValueError) as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 1
+        indice = IndicePOIs.de_registros(registros)
+        indice.salvar(args.arquivo)
+        print(f"{len(indice)} POI(s) em {args.arquivo} ({time.perf_counter() - inicio:.1f}s)")
+    elif args.comando == 'info':
+        indice = carregar_indice(args.arquivo)
+        if indice is None:
+            print(f"Nenhuma base em {args.arquivo}")
+            return 1
+        for categoria, (tipo, _) in CATEGORIAS.items():
+            print(f"{tipo:<16} {int((indice.categorias >> categoria & 1).sum())}")
+        print(f"{'Total':<16} {len(indice)}")
+    else:
+        indice = atualizar_pelo_overpass(args.lat, args.lon, args.raio, caminho=args.arquivo)
+        print(f"{len(indice)} POI(s) em {args.arquivo}")
+    return 0
@@ -0,0 +1,132 @@
+"""Radar de Bairros: índice bairro -> gaiola -> pacotes, montado uma vez por upload.
+
+A busca aproximada não compara cada termo com cada bairro via difflib. Os
+bairros distintos ficam num índice de trigramas (para a busca por trecho) e
+agrupados por tamanho com a contagem de letras de cada um. O `SequenceMatcher`
+só roda nos candidatos que passam pelo limite superior de `quick_ratio`, então
+o resultado é o mesmo da varredura completa.
+"""
+import difflib
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+import pandas as pd
+
+from .esquema import inferir_esquema
+from .instrumentacao import etapa
+from .lote import resumir_gaiolas
+from .normalizacao import limpar_serie, limpar_string
+
+LIMIAR_SEMELHANCA = 0.80
+# Gaiolas com menos pacotes que isso nos bairros buscados não entram no resultado
+MINIMO_PACOTES_RADAR = 20
+DIFERENCA_MAX_TAMANHO = 3
+
+
+def _trigramas(texto: str) -> Set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBairros:
+    def __init__(self, abas: Dict[str, pd.DataFrame]):
+        # {bairro como está no arquivo: {gaiola como está no arquivo: pacotes}}
+        self._contagens: Dict[str, Counter] = defaultdict(Counter)
+        for df in abas.values():
+            esquema = inferir_esquema(df)
+            col_bairro, col_gaiola = esquema.bairro, esquema.gaiola_radar
+            if col_bairro is None or col_gaiola is None:
+                continue
+            bairros = df[col_bairro]
+            validos = bairros.notna()
+            gaiolas = df.loc[validos, col_gaiola].map(str)
+            g_limpo = limpar_serie(gaiolas)
+            # Descarta o cabeçalho e valores que não são gaiola, como a varredura antiga
+            eh_gaiola = (g_limpo.str.len() > 1) & ~g_limpo.str.contains('GAIOLA', regex=False)
+            pares = pd.DataFrame({'bairro': bairros[validos].map(str), 'gaiola': gaiolas})[eh_gaiola.to_numpy()]
+            for (bairro, gaiola), qtd in pares.groupby(['bairro', 'gaiola'], sort=False).size().items():
+                self._contagens[bairro][gaiola] += int(qtd)
+
+        self._valores: List[str] = list(self._contagens)
+        self._limpos: List[str] = limpar_serie(pd.Series(self._valores, dtype=object)).tolist()
+        self._letras: List[Counter] = [Counter(v) for v in self._limpos]
+        self._por_trigrama: Dict[str, Set[int]] = defaultdict(set)
+        self._por_tamanho: Dict[int, List[int]] = defaultdict(list)
+        for i, limpo in enumerate(self._limpos):
+            for tri in _trigramas(limpo):
+                self._por_trigrama[tri].add(i)
+            self._por_tamanho[len(limpo)].append(i)
+
+    @property
+    def vazio(self) -> bool:
+        return not self._valores
+
+    def _contem(self, termo: str) -> Set[int]:
+        if len(termo) < 3:
+            return {i for i, v in enumerate(self._limpos) if termo in v}
+        candidatos = None
+        for tri in _trigramas(termo):
+            postagens = self._por_trigrama.get(tri, set())
+            candidatos = postagens if candidatos is None else candidatos & postagens
+            if not candidatos:
+                return set()
+        return {i for i in candidatos if termo in self._limpos[i]}
+
+    def _parecidos(self, termo: str) -> Set[int]:
+        letras = Counter(termo)
+        achados = set()
+        for tam in range(len(termo) - DIFERENCA_MAX_TAMANHO, len(termo) + DIFERENCA_MAX_TAMANHO + 1):
+            if tam + len(termo) == 0:
+                continue
+            for i in self._por_tamanho.get(tam, ()):
+                # Limite superior do ratio (mesmo cálculo de quick_ratio) antes do SequenceMatcher
+                if 2.0 * sum((letras & self._letras[i]).values()) / (len(termo) + tam) <= LIMIAR_SEMELHANCA:
+                    continue
+                if difflib.SequenceMatcher(None, termo, self._limpos[i]).ratio() > LIMIAR_SEMELHANCA:
+                    achados.add(i)
+        return achados
+
+    def bairros_aceitos(self, termos: List[str]) -> Dict[str, str]:
+        """{bairro no arquivo: termo buscado}; vale o primeiro termo da lista que casar."""
+        aceitos: Dict[str, str] = {}
+        for termo in termos:
+            for i in sorted(self._contem(termo) | self._parecidos(termo)):
+                aceitos.setdefault(self._valores[i], termo)
+        return aceitos
+
+    def consultar(self, termos: List[str]) -> Dict[str, Dict]:
+        """{gaiola: {'count': pacotes nos bairros buscados, 'bairros': termos encontrados}}."""
+        contagem: Dict[str, Dict] = {}
+        for bairro, termo in self.bairros_aceitos(termos).items():
+            for gaiola, qtd in self._contagens[bairro].items():
+                dados = contagem.setdefault(gaiola, {'count': 0, 'bairros': set()})
+                dados['count'] += qtd
+                dados['bairros'].add(termo)
+        return contagem
+
+
+def rastrear_gaiolas(manifesto, bairros: List[str], minimo: int = MINIMO_PACOTES_RADAR) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Gaiolas com pelo menos `minimo` pacotes nos bairros digitados.
+
+    Devolve (linhas da tabela do Radar, contagem de todas as gaiolas que
+    passam pelos bairros, relevantes ou não).
+    """
+    with etapa('radar_bairros', bairros=len(bairros)):
+        contagem = manifesto.bairros.consultar([limpar_string(b) for b in bairros if b.strip()])
+    relevantes = [g for g, dados in contagem.items() if dados['count'] >= minimo]
+    resumo = resumir_gaiolas(manifesto, relevantes)
+    linhas = []
+    for g in sorted(relevantes):
+        res = resumo[g]
+        if not res['encontrado']:
+            continue
+        otimizacao = res['pacotes'] - res['paradas']
+        pct = (otimizacao / res['pacotes']) * 100 if res['pacotes'] > 0 else 0
+        linhas.append({
+            'Gaiola': g,
+            'Bairros Encontrados': ", ".join([b.title() for b in contagem[g]['bairros']]),
+            'Pacotes': res['pacotes'],
+            'Paradas Reais': res['paradas'],
+            'Economia': f"{otimizacao} ({int(pct)}%)",
+            'Comércios': res['comercios'],
+        })
+    return linhas, contagem
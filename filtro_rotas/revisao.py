@@ -0,0 +1,121 @@
+"""Revisões do romaneio: o mesmo dia reenviado com algumas linhas corrigidas.
+
+Cada gaiola ganha uma assinatura com o hash das suas linhas (na ordem do
+arquivo), a aba, a coluna da gaiola e a coluna de endereço detectada. Entre
+duas versões, as gaiolas com a mesma assinatura dão exatamente a mesma rota,
+o mesmo resumo e a mesma planilha. Por isso os resultados já calculados para a
+versão anterior são copiados para o hash novo, e só as gaiolas alteradas ou
+novas são recalculadas quando forem pedidas.
+"""
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .esquema import inferir_esquema
+from .exportacao import CACHE_PLANILHAS
+from .instrumentacao import etapa
+from .lote import CACHE_RESUMOS
+from .normalizacao import limpar_string
+from .rota import CACHE_ROTAS
+
+# Fração mínima de gaiolas em comum para tratar o upload como revisão do anterior
+LIMIAR_REVISAO = 0.8
+
+
+@dataclass
+class DiferencaRomaneio:
+    hash_anterior: str
+    hash_novo: str
+    alteradas: List[str] = field(default_factory=list)
+    novas: List[str] = field(default_factory=list)
+    removidas: List[str] = field(default_factory=list)
+    inalteradas: List[str] = field(default_factory=list)
+    # {gaiola alterada: (linhas adicionadas, linhas removidas)}
+    linhas: Dict[str, tuple] = field(default_factory=dict)
+    aproveitados: int = 0
+
+    @property
+    def afetadas(self) -> List[str]:
+        return self.alteradas + self.novas + self.removidas
+
+    def tabela(self) -> pd.DataFrame:
+        registros = [{'Gaiola': g, 'Situação': 'Alterada', 'Linhas novas': self.linhas[g][0],
+                      'Linhas removidas': self.linhas[g][1]} for g in self.alteradas]
+        registros += [{'Gaiola': g, 'Situação': 'Nova', 'Linhas novas': None, 'Linhas removidas': None} for g in self.novas]
+        registros += [{'Gaiola': g, 'Situação': 'Removida', 'Linhas novas': None, 'Linhas removidas': None} for g in self.removidas]
+        return pd.DataFrame(registros, columns=['Gaiola', 'Situação', 'Linhas novas', 'Linhas removidas'])
+
+
+def _hashes_linhas(manifesto) -> Dict[str, np.ndarray]:
+    return {aba: pd.util.hash_pandas_object(df, index=False).to_numpy() for aba, df in manifesto.abas.items()}
+
+
+def assinaturas_gaiolas(manifesto, hashes: Dict[str, np.ndarray] = None) -> Dict[str, bytes]:
+    """{chave da gaiola (limpar_string): assinatura do conteúdo dela}."""
+    hashes = hashes if hashes is not None else _hashes_linhas(manifesto)
+    colunas_endereco = {aba: inferir_esquema(df).endereco for aba, df in manifesto.abas.items()}
+    assinaturas = {}
+    for g in manifesto.indice.gaiolas:
+        h = hashlib.blake2b(digest_size=16)
+        for loc in manifesto.indice.localizacoes(g):
+            h.update(repr((loc.aba, loc.coluna, colunas_endereco[loc.aba])).encode())
+            h.update(hashes[loc.aba][loc.linhas].tobytes())
+        assinaturas[limpar_string(g)] = h.digest()
+    return assinaturas
+
+
+def e_revisao(anterior, novo) -> bool:
+    """O novo romaneio parece uma correção do anterior (mesmas abas, quase as mesmas gaiolas)?"""
+    if anterior is None or anterior.hash == novo.hash or set(anterior.abas) != set(novo.abas):
+        return False
+    a = {limpar_string(g) for g in anterior.indice.gaiolas}
+    b = {limpar_string(g) for g in novo.indice.gaiolas}
+    return bool(a | b) and len(a & b) / len(a | b) >= LIMIAR_REVISAO
+
+
+def _contagem_linhas(manifesto, hashes: Dict[str, np.ndarray], gaiola: str) -> Counter:
+    return Counter(int(v) for loc in manifesto.indice.localizacoes(gaiola) for v in hashes[loc.aba][loc.linhas])
+
+
+def comparar_manifestos(anterior, novo) -> DiferencaRomaneio:
+    """Gaiolas alteradas, novas, removidas e inalteradas entre duas versões do romaneio."""
+    with etapa('diff_revisao', gaiolas=len(novo.indice.gaiolas)):
+        hashes_ant, hashes_novo = _hashes_linhas(anterior), _hashes_linhas(novo)
+        ass_ant = assinaturas_gaiolas(anterior, hashes_ant)
+        ass_novo = assinaturas_gaiolas(novo, hashes_novo)
+        rotulos = {limpar_string(g): g for g in anterior.indice.gaiolas}
+        rotulos.update({limpar_string(g): g for g in novo.indice.gaiolas})
+        dif = DiferencaRomaneio(hash_anterior=anterior.hash, hash_novo=novo.hash)
+        # Ordem do romaneio novo, com as removidas no fim
+        ordem = [limpar_string(g) for g in novo.indice.gaiolas] + [c for c in ass_ant if c not in ass_novo]
+        for chave in ordem:
+            g = rotulos[chave]
+            if chave not in ass_ant:
+                dif.novas.append(g)
+            elif chave not in ass_novo:
+                dif.removidas.append(g)
+            elif ass_ant[chave] == ass_novo[chave]:
+                dif.inalteradas.append(g)
+            else:
+                antes, depois = _contagem_linhas(anterior, hashes_ant, g), _contagem_linhas(novo, hashes_novo, g)
+                dif.alteradas.append(g)
+                dif.linhas[g] = (sum((depois - antes).values()), sum((antes - depois).values()))
+        return dif
+
+
+def aproveitar_resultados(dif: DiferencaRomaneio) -> int:
+    """Copia para o hash novo as rotas, resumos e planilhas já calculados das gaiolas inalteradas."""
+    copiados = 0
+    for cache in (CACHE_ROTAS, CACHE_RESUMOS, CACHE_PLANILHAS):
+        for g in dif.inalteradas:
+            chave = limpar_string(g)
+            valor = cache.obter((dif.hash_anterior, chave))
+            if valor is not None:
+                cache.guardar((dif.hash_novo, chave), valor)
+                copiados += 1
+    dif.aproveitados = copiados
+    return copiados
@@ -0,0 +1,90 @@
+"""Rota de uma gaiola: uma linha por pacote, com o número da parada e o tipo do endereço.
+
+As rotas ficam num LRU do processo indexado por (hash do romaneio, gaiola):
+sessões que consultam a mesma gaiola do mesmo romaneio recebem o mesmo
+resultado, que por isso não deve ser alterado por quem o recebe.
+"""
+import os
+from typing import Dict, Hashable, Optional
+
+import pandas as pd
+
+from .cache import CacheLRU
+from .comercio import COMERCIO, classificar_comercio_serie
+from .esquema import coluna_endereco_por_tamanho, inferir_esquema
+from .instrumentacao import etapa
+from .normalizacao import extrair_base_endereco_serie, limpar_serie, limpar_string
+
+SUFIXO_CIDADE = ", Fortaleza - CE"
+
+LIMITE_CACHE_ROTAS_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_ROTAS_MB", "128"))
+
+
+class ErroProcessamento(Exception):
+    """Falha inesperada ao montar a rota de uma gaiola (a causa fica em `__cause__`)."""
+
+
+def processar_gaiola_unica(df_raw: pd.DataFrame, gaiola_alvo: str, col_gaiola_idx: Hashable,
+                           linhas=None) -> Optional[Dict]:
+    """{'dataframe', 'pacotes', 'paradas', 'comercios'} da gaiola nesta aba, ou None se ela não aparece.
+
+    `linhas` são as posições já conhecidas pelo índice de gaiolas; sem elas a
+    coluna `col_gaiola_idx` é varrida.
+    """
+    try:
+        with etapa('filtro_gaiola', linhas=len(df_raw) if linhas is None else len(linhas)):
+            if linhas is not None:
+                df_filt = df_raw.iloc[linhas].copy()
+            else:
+                df_filt = df_raw[limpar_serie(df_raw[col_gaiola_idx]) == limpar_string(gaiola_alvo)].copy()
+        if df_filt.empty:
+            return None
+        col_end_idx = inferir_esquema(df_raw).endereco
+        if col_end_idx is None:
+            col_end_idx = coluna_endereco_por_tamanho(df_filt)
+        with etapa('classificacao', linhas=len(df_filt)):
+            df_filt['CHAVE_STOP'] = extrair_base_endereco_serie(df_filt[col_end_idx])
+            mapa_stops = {end: i + 1 for i, end in enumerate(df_filt['CHAVE_STOP'].unique())}
+            saida = pd.DataFrame()
+            saida['Parada'] = df_filt['CHAVE_STOP'].map(mapa_stops).astype(str)
+            saida['Gaiola'] = df_filt[col_gaiola_idx]
+            saida['Tipo'] = classificar_comercio_serie(df_filt[col_end_idx])
+        saida['Endereco_Completo'] = df_filt[col_end_idx].astype(str) + SUFIXO_CIDADE
+        return {'dataframe': saida, 'pacotes': len(saida), 'paradas': len(mapa_stops),
+                'comercios': int((saida['Tipo'] == COMERCIO).sum())}
+    except Exception as e:
+        raise ErroProcessamento(f"Erro ao processar gaiola {gaiola_alvo}") from e
+
+
+def _tamanho_rota(res: Optional[Dict]) -> int:
+    return 0 if res is None else int(res['dataframe'].memory_usage(deep=True).sum())
+
+
+CACHE_ROTAS = CacheLRU(LIMITE_CACHE_ROTAS_MB * 1024 * 1024, medir=_tamanho_rota)
+
+
+def processar_rota_gaiola(manifesto, gaiola: str) -> Optional[Dict]:
+    """Rota da gaiola (compartilhada entre sessões), montada só na primeira consulta."""
+    return CACHE_ROTAS.obter_ou_calcular((manifesto.hash, limpar_string(gaiola)),
+                                         lambda: _montar_rota_gaiola(manifesto, gaiola))
+
+
+def rota_em_cache(manifesto, gaiola: str) -> Optional[Dict]:
+    """Rota da gaiola se ela já está no cache (None se não está ou se a gaiola não existe), sem montar."""
+    return CACHE_ROTAS.obter((manifesto.hash, limpar_string(gaiola)))
+
+
+def _montar_rota_gaiola(manifesto, gaiola: str) -> Optional[Dict]:
+    """Rota da gaiola na primeira aba em que ela aparece (pelo índice, sem varrer as abas)."""
+    with etapa('rota_gaiola', gaiola=gaiola) as medicao:
+        for loc in manifesto.indice.localizacoes(gaiola):
+            res = processar_gaiola_unica(manifesto.abas[loc.aba], gaiola, loc.coluna, loc.linhas)
+            if res:
+                medicao.linhas = res['pacotes']
+                return res
+    return None
+
+
+def dataframe_rota_gaiola(manifesto, gaiola: str) -> Optional[pd.DataFrame]:
+    res = processar_rota_gaiola(manifesto, gaiola)
+    return res['dataframe'] if res else None
@@ -0,0 +1,116 @@
+"""Execução em segundo plano das operações pesadas da interface.
+
+Cada tarefa é identificada por uma chave (hash do romaneio + parâmetros) e
+roda numa thread do executor. Pedir de novo a mesma chave enquanto a tarefa
+roda devolve a mesma tarefa, então um rerun da interface (ou outra sessão) se
+reconecta a ela em vez de recalcular. Ao terminar, a tarefa sai do executor:
+o resultado fica só com quem a pediu, e os resultados reaproveitáveis ficam
+nos caches de cada módulo, que têm limite de memória. Threads, e não
+processos, porque as tarefas leem o manifesto que já está na memória deste
+processo.
+
+Com `medir=True`, as etapas medidas durante a tarefa (instrumentacao.etapa)
+ficam em `Tarefa.medicoes`; sem isso elas não são medidas.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .instrumentacao import Medicao, coletar
+
+THREADS_TAREFAS = int(os.environ.get("FILTRO_ROTAS_TAREFAS_THREADS", str(min(4, os.cpu_count() or 1))))
+
+
+class Tarefa:
+    def __init__(self, chave: Hashable, descricao: str = ""):
+        self.chave = chave
+        self.descricao = descricao
+        self.progresso: Optional[float] = None  # fração concluída, se a tarefa informar
+        self.mensagem = ""
+        self.inicio = time.monotonic()
+        self.fim: Optional[float] = None
+        self.medicoes: List[Medicao] = []
+        self.future: Optional[Future] = None
+
+    def atualizar(self, progresso: Optional[float] = None, mensagem: Optional[str] = None) -> None:
+        """Chamado de dentro da tarefa para informar o andamento."""
+        if progresso is not None:
+            self.progresso = max(0.0, min(1.0, progresso))
+        if mensagem is not None:
+            self.mensagem = mensagem
+
+    @property
+    def concluida(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    @property
+    def falhou(self) -> bool:
+        return self.concluida and (self.future.cancelled() or self.future.exception() is not None)
+
+    @property
+    def segundos(self) -> float:
+        return (self.fim or time.monotonic()) - self.inicio
+
+    def resultado(self) -> Any:
+        """Resultado da tarefa concluída (relança a exceção, se ela falhou)."""
+        return self.future.result(timeout=0)
+
+
+class ExecutorTarefas:
+    def __init__(self, max_workers: int = THREADS_TAREFAS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="filtro_rotas")
+        self._tarefas: Dict[Hashable, Tarefa] = {}  # só as em andamento
+        self._lock = threading.Lock()
+
+    def _executar(self, tarefa: Tarefa, func: Callable[[Tarefa], Any], medir: bool) -> Any:
+        try:
+            if not medir:
+                return func(tarefa)
+            with coletar() as coletor:
+                try:
+                    return func(tarefa)
+                finally:
+                    tarefa.medicoes = coletor.medicoes
+        finally:
+            tarefa.fim = time.monotonic()
+            with self._lock:
+                if self._tarefas.get(tarefa.chave) is tarefa:
+                    del self._tarefas[tarefa.chave]
+
+    def submeter(self, chave: Hashable, func: Callable[[Tarefa], Any], descricao: str = "",
+                 medir: bool = False) -> Tarefa:
+        """Tarefa da chave: a que ainda está em andamento ou uma nova.
+
+        `func` recebe a própria Tarefa, para informar o progresso com `atualizar`.
+        `medir` coleta as etapas da tarefa em `Tarefa.medicoes`.
+        """
+        with self._lock:
+            existente = self._tarefas.get(chave)
+            if existente is not None and not existente.concluida:
+                return existente
+            tarefa = Tarefa(chave, descricao)
+            tarefa.future = self._executor.submit(self._executar, tarefa, func, medir)
+            self._tarefas[chave] = tarefa
+            return tarefa
+
+    def obter(self, chave: Hashable) -> Optional[Tarefa]:
+        """Tarefa da chave ainda em andamento, se houver."""
+        with self._lock:
+            return self._tarefas.get(chave)
+
+    def descartar(self, chave: Hashable) -> None:
+        """Esquece a tarefa (cancela, se ainda não começou)."""
+        with self._lock:
+            tarefa = self._tarefas.pop(chave, None)
+        if tarefa is not None and tarefa.future is not None:
+            tarefa.future.cancel()
+
+    @property
+    def em_andamento(self) -> int:
+        with self._lock:
+            return sum(1 for t in self._tarefas.values() if not t.concluida)
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
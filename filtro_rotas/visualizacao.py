@@ -0,0 +1,97 @@
+"""Tabelas de resultado paginadas no servidor, para celulares em rede lenta.
+
+Em vez de mandar o DataFrame inteiro ao navegador a cada rerun, cada tabela
+de resultado é convertida uma única vez para Arrow e fica num cache do
+processo. A busca por rua e os filtros por parada e tipo rodam no servidor,
+sobre textos já normalizados (sem acento, em maiúsculas), e só as
+LINHAS_PAGINA linhas da página pedida seguem para o `st.dataframe`. O
+payload de cada rerun fica limitado qualquer que seja o tamanho da gaiola.
+
+Usa pyarrow, que o Streamlit já exige para desenhar tabelas.
+"""
+import math
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .cache import CacheLRU
+from .esquema import inferir_esquema
+from .exportacao import compativel_arrow
+from .normalizacao import remover_acentos, remover_acentos_serie
+
+LINHAS_PAGINA = int(os.environ.get("FILTRO_ROTAS_LINHAS_PAGINA", "50"))
+LIMITE_CACHE_TABELAS_MB = int(os.environ.get("FILTRO_ROTAS_CACHE_TABELAS_MB", "64"))
+COLUNA_TIPO = 'Tipo'
+
+
+@dataclass
+class Pagina:
+    tabela: pa.Table
+    numero: int
+    paginas: int
+    linhas_filtradas: int
+    linhas_total: int
+
+
+class TabelaPaginada:
+    def __init__(self, df: pd.DataFrame):
+        esquema = inferir_esquema(df)
+        self.col_endereco = None if esquema.endereco is None else str(esquema.endereco)
+        self.col_parada = None if esquema.parada is None else str(esquema.parada)
+        self.tabela = pa.Table.from_pandas(compativel_arrow(df), preserve_index=False)
+        # Sem coluna de endereço, a busca olha a linha inteira
+        alvo = df[esquema.endereco].astype(str) if esquema.endereco is not None else \
+            df.astype(str).agg(' '.join, axis=1)
+        self._busca = remover_acentos_serie(alvo).to_numpy(dtype=object)
+        self._paradas = None if esquema.parada is None else \
+            df[esquema.parada].astype(str).str.strip().to_numpy(dtype=object)
+        self._tipos = df[COLUNA_TIPO].astype(str).to_numpy(dtype=object) if COLUNA_TIPO in df.columns else None
+        self.tipos: List[str] = [] if self._tipos is None else sorted(set(self._tipos))
+
+    def __len__(self) -> int:
+        return self.tabela.num_rows
+
+    @property
+    def nbytes(self) -> int:
+        textos = sum(len(t) for t in self._busca) + (0 if self._paradas is None else 8 * len(self._paradas))
+        return int(self.tabela.nbytes) + textos
+
+    def filtrar(self, busca: str = '', parada: str = '', tipos: Sequence[str] = ()) -> np.ndarray:
+        """Posições das linhas que contêm todas as palavras de `busca` e batem com a parada e os tipos."""
+        mascara = np.ones(len(self), dtype=bool)
+        for termo in remover_acentos(busca).split():
+            mascara &= np.fromiter((termo in t for t in self._busca), dtype=bool, count=len(self))
+        if parada.strip() and self._paradas is not None:
+            mascara &= self._paradas == parada.strip()
+        if tipos and self._tipos is not None:
+            mascara &= np.isin(self._tipos, list(tipos))
+        return np.flatnonzero(mascara)
+
+    def pagina(self, numero: int, busca: str = '', parada: str = '', tipos: Sequence[str] = (),
+               linhas: int = LINHAS_PAGINA) -> Pagina:
+        """Página `numero` (a partir de 0, limitada às que existem) das linhas filtradas."""
+        posicoes = self.filtrar(busca, parada, tipos)
+        paginas = max(1, math.ceil(len(posicoes) / linhas))
+        numero = min(max(numero, 0), paginas - 1)
+        fatia = posicoes[numero * linhas:(numero + 1) * linhas]
+        return Pagina(tabela=self.tabela.take(pa.array(fatia, type=pa.int64())), numero=numero, paginas=paginas,
+                      linhas_filtradas=len(posicoes), linhas_total=len(self))
+
+
+CACHE_TABELAS = CacheLRU(LIMITE_CACHE_TABELAS_MB * 1024 * 1024, medir=lambda t: t.nbytes)
+
+
+def tabela_paginada(chave: tuple, montar: Callable[[], Optional[pd.DataFrame]]) -> Optional[TabelaPaginada]:
+    """Tabela do resultado `chave` (compartilhada entre sessões), montada só na primeira consulta.
+
+    None se `montar()` não tem o resultado; esse None não fica no cache.
+    """
+    tabela = CACHE_TABELAS.obter(chave)
+    if tabela is not None:
+        return tabela
+    df = montar()
+    return None if df is None else CACHE_TABELAS.obter_ou_calcular(chave, lambda: TabelaPaginada(df))
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from filtro_rotas.armazem import COMPARTILHADO, DESCARTADO, EM_DISCO, SESSAO, ArmazemBlobs, pegada_sessao
+
+
+def _bytes(conteudo):
+    # ler() devolve os bytes em memória ou o arquivo aberto (blobs em disco)
+    if conteudo is None or isinstance(conteudo, bytes):
+        return conteudo
+    with conteudo:
+        return conteudo.read()
+
+
+def test_blob_grande_vai_para_o_disco_uma_vez_por_conteudo(tmp_path):
+    armazem = ArmazemBlobs(str(tmp_path), 1024, 10 * 1024, 100)
+    pequeno, grande = b'x' * 10, b'PK' + b'y' * 500
+    ref_p, ref_g = armazem.guardar(pequeno), armazem.guardar(grande)
+    assert armazem.guardar(bytes(grande)) == ref_g
+    assert armazem.local(ref_p) == COMPARTILHADO and armazem.local(ref_g) == EM_DISCO
+    assert len(list(tmp_path.glob('*.bin'))) == 1
+    assert armazem.ler(ref_p) == pequeno and _bytes(armazem.ler(ref_g)) == grande
+    assert not isinstance(armazem.ler(ref_g), bytes)
+    # Outra instância (servidor reiniciado) encontra o que ficou na pasta
+    assert _bytes(ArmazemBlobs(str(tmp_path), 1024, 10 * 1024, 100).ler(ref_g)) == grande
+
+
+def test_limite_do_disco_descarta_o_usado_ha_mais_tempo(tmp_path):
+    armazem = ArmazemBlobs(str(tmp_path), 1024, 1000, 100)
+    refs = [armazem.guardar(bytes([i]) * 400) for i in range(3)]
+    assert armazem.local(refs[0]) == DESCARTADO and armazem.ler(refs[0]) is None
+    assert _bytes(armazem.ler(refs[2])) == bytes([2]) * 400
+    assert armazem.info()['bytes_disco'] == 800
+
+
+def test_pegada_separa_sessao_de_compartilhado(tmp_path):
+    armazem = ArmazemBlobs(str(tmp_path), 1024, 10 * 1024, 100)
+    df = pd.DataFrame({'a': range(1000)})
+    pegada = pegada_sessao({'df': df, 'zip': armazem.guardar(b'z' * 500), 'codigo': 'A-1'}, armazem)
+    assert pegada['Chave'].tolist()[0] == 'df'
+    onde = dict(zip(pegada['Chave'], pegada['Onde']))
+    assert onde == {'df': SESSAO, 'zip': EM_DISCO, 'codigo': SESSAO}
+    assert pegada.set_index('Chave').loc['zip', 'Bytes'] == 500
+
+
+def test_sem_disco_o_blob_e_gerado_de_novo_em_memoria(tmp_path):
+    (tmp_path / 'arquivo').write_bytes(b'')
+    # A pasta fica "dentro" de um arquivo: criar a pasta falha com OSError
+    armazem = ArmazemBlobs(str(tmp_path / 'arquivo' / 'blobs'), 10 * 1024, 10 * 1024, 100)
+    chamadas = []
+
+    def gerar():
+        chamadas.append(1)
+        return (b'x' * 60 for _ in range(5))
+
+    ref = armazem.guardar_partes(gerar)
+    assert len(chamadas) == 2 and ref.tamanho == 300
+    assert armazem.local(ref) == COMPARTILHADO and armazem.ler(ref) == b'x' * 300
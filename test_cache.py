@@ -0,0 +1,61 @@
+import threading
+import time
+
+from filtro_rotas.cache import CacheLRU
+
+
+def test_limite_de_bytes_descarta_o_menos_usado():
+    cache = CacheLRU(10, medir=len)
+    cache.guardar('a', b'xxxx')
+    cache.guardar('b', b'xxxx')
+    assert cache.obter('a') == b'xxxx'  # 'a' passa a ser o mais recente
+    cache.guardar('c', b'xxxx')
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.bytes_usados == 8
+    # Regravar a mesma chave troca o tamanho em vez de somar
+    cache.guardar('a', b'x')
+    assert cache.bytes_usados == 5
+    assert (cache.acertos, cache.falhas) == (1, 0)
+
+
+def test_valor_maior_que_o_limite_nao_fica():
+    cache = CacheLRU(10, medir=len)
+    cache.guardar('a', b'xxxx')
+    cache.guardar('grande', b'x' * 11)
+    assert 'grande' not in cache and 'a' in cache
+    assert cache.obter_ou_calcular('grande', lambda: b'y' * 11) == b'y' * 11
+    assert 'grande' not in cache and cache.bytes_usados == 4
+
+
+def test_obter_ou_calcular_calcula_uma_vez_com_sessoes_concorrentes():
+    cache = CacheLRU(1024, medir=lambda _: 1)
+    chamadas = []
+    inicio = threading.Barrier(8)
+
+    def calcular():
+        chamadas.append(1)
+        time.sleep(0.05)
+        return 'valor'
+
+    resultados = []
+
+    def sessao():
+        inicio.wait()
+        resultados.append(cache.obter_ou_calcular('k', calcular))
+
+    threads = [threading.Thread(target=sessao) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(chamadas) == 1 and resultados == ['valor'] * 8
+    assert cache._locks_chave == {}
+
+
+def test_none_tambem_fica_em_cache():
+    # Gaiola inexistente: o None da rota é lembrado em vez de procurado de novo
+    cache = CacheLRU(1024, medir=lambda _: 1)
+    chamadas = []
+    for _ in range(2):
+        assert cache.obter_ou_calcular('k', lambda: chamadas.append(1)) is None
+    assert len(chamadas) == 1 and 'k' in cache
@@ -0,0 +1,67 @@
+import json
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from filtro_rotas import cache_disco
+from filtro_rotas.cache_disco import CacheDisco
+from filtro_rotas.indice import IndiceGaiolas
+
+
+def _abas():
+    romaneio = pd.DataFrame({
+        0: pd.Series(['Gaiola', 'A-1', 'A-2', np.nan, 'A-1']).astype('category'),
+        3: pd.Series(['Endereço', 'Rua A, 1', 'Rua B, 2', np.nan, 'Rua A, 1'], dtype='str'),
+        5: pd.Series(['Seq', 1, 2.5, np.nan, True], dtype=object),
+    })
+    return {'Romaneio': romaneio, 'Vazia': pd.DataFrame()}
+
+
+def test_ida_e_volta_preserva_tipos_e_indice(tmp_path):
+    cache = CacheDisco(str(tmp_path), 10 * 2**20)
+    abas = _abas()
+    indice = IndiceGaiolas(abas)
+    assert cache.guardar('h1', abas, indice)
+    lidas, indice_lido = cache.carregar('h1')
+    for nome, df in abas.items():
+        assert lidas[nome].equals(df)
+        assert (lidas[nome].dtypes == df.dtypes).all()
+    assert [type(v) for v in lidas['Romaneio'][5]] == [str, int, float, float, bool]
+    assert indice_lido.gaiolas == indice.gaiolas == ['A-1', 'A-2']
+    assert indice_lido.localizar('a1').linhas.tolist() == [1, 4]
+
+
+def test_limite_descarta_o_usado_ha_mais_tempo(tmp_path):
+    cache = CacheDisco(str(tmp_path), 10 * 2**20)
+    for chave in ('h1', 'h2', 'h3'):
+        cache.guardar(chave, _abas())
+    os.utime(tmp_path / 'h1' / cache_disco.ARQUIVO_META, (1, 1))
+    cache.carregar('h2')
+    tamanho = cache.entradas()[0]['bytes']
+    cache.limite_bytes = 2 * tamanho
+    cache.aplicar_limite()
+    assert sorted(e['chave'] for e in cache.entradas()) == ['h2', 'h3']
+
+
+def test_versao_antiga_e_regravada(tmp_path):
+    cache = CacheDisco(str(tmp_path), 10 * 2**20)
+    cache.guardar('h1', _abas())
+    meta = tmp_path / 'h1' / cache_disco.ARQUIVO_META
+    meta.write_text(json.dumps({**json.loads(meta.read_text()), 'versao': 0}))
+    assert cache.carregar('h1') is None
+    assert cache.guardar('h1', _abas()) and cache.carregar('h1') is not None
+
+
+def test_cli_aquecer(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_disco, 'CACHE_DISCO', CacheDisco(str(tmp_path / 'cache'), 10 * 2**20))
+    pasta = tmp_path / 'romaneios'
+    pasta.mkdir()
+    wb = openpyxl.Workbook()
+    wb.active.append(['Gaiola', 'Endereço', 'Bairro'])
+    wb.active.append(['A-1', 'Rua A, 1', 'Centro'])
+    wb.save(pasta / 'dia1.xlsx')
+    assert cache_disco.main(['aquecer', str(pasta)]) == 0
+    assert cache_disco.aquecer([str(pasta)]) == 0  # segunda vez: já está em cache
+    assert len(cache_disco.CACHE_DISCO.entradas()) == 1
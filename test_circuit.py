@@ -0,0 +1,163 @@
+import functools
+import math
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from filtro_rotas.circuit import gerar_planilha_otimizada_circuit_pro
+
+ROMANEIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PM 31_01 ROMANEIO.xlsx')
+
+
+# --- Circuit Pro antigo (laço com iloc), usado como referência ---
+def limpar_string(s: str) -> str:
+    return "".join(filter(str.isalnum, str(s))).upper()
+
+def remover_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn').upper()
+
+def extrair_numero_correto(endereco):
+    if not isinstance(endereco, str): return "SN"
+    partes = endereco.split(',')
+    if len(partes) >= 2:
+        match = re.search(r'(\d+)', partes[1].strip())
+        if match: return match.group(1)
+    todos_numeros = re.findall(r'(\d+)', endereco)
+    if todos_numeros: return todos_numeros[0]
+    return "SN"
+
+def normalizar_nome_rua(endereco):
+    if not isinstance(endereco, str): return ""
+    return limpar_string(remover_acentos(endereco.split(',')[0]))
+
+def calcular_distancia_gps(lat1, lon1, lat2, lon2):
+    try:
+        lat1, lon1, lat2, lon2 = float(lat1), float(lon1), float(lat2), float(lon2)
+    except Exception:
+        return 999999
+    R = 6371000
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2) * math.sin(dlambda/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return R * c
+
+def devem_agrupar(row1, row2):
+    num1 = row1['tmp_num']; nome1 = row1['tmp_nome']
+    lat1, lon1 = row1.get('tmp_lat', 0), row1.get('tmp_lon', 0)
+    num2 = row2['tmp_num']; nome2 = row2['tmp_nome']
+    lat2, lon2 = row2.get('tmp_lat', 0), row2.get('tmp_lon', 0)
+    if num1 != num2: return False
+    if nome1 == nome2: return True
+    if lat1 != 0 and lat2 != 0:
+        dist = calcular_distancia_gps(lat1, lon1, lat2, lon2)
+        if dist <= 10: return True
+    return False
+
+def escolher_melhor_endereco(serie_enderecos):
+    candidatos = [str(x).strip() for x in serie_enderecos if pd.notna(x) and str(x).strip() != '']
+    if not candidatos: return ""
+    return max(candidatos, key=len)
+
+def gerar_planilha_antiga(df):
+    col_end = next((c for c in df.columns if any(t in str(c).upper() for t in ['ADDRESS', 'ENDERE', 'DESTINATION'])), None)
+    col_seq = next((c for c in df.columns if 'SEQUENCE' in str(c).upper()), None)
+    col_lat = next((c for c in df.columns if any(t in str(c).upper() for t in ['LATITUDE', 'LAT'])), None)
+    col_lon = next((c for c in df.columns if any(t in str(c).upper() for t in ['LONGITUDE', 'LON', 'LNG'])), None)
+    if not col_end or not col_seq: return None
+    df_temp = df.copy()
+    df_temp['tmp_num'] = df_temp[col_end].apply(extrair_numero_correto)
+    df_temp['tmp_nome'] = df_temp[col_end].apply(normalizar_nome_rua)
+    if col_lat and col_lon:
+        df_temp['tmp_lat'] = pd.to_numeric(df_temp[col_lat], errors='coerce').fillna(0)
+        df_temp['tmp_lon'] = pd.to_numeric(df_temp[col_lon], errors='coerce').fillna(0)
+    else:
+        df_temp['tmp_lat'] = 0; df_temp['tmp_lon'] = 0
+    df_temp = df_temp.sort_values(by=['tmp_num', 'tmp_nome']).reset_index(drop=True)
+    group_ids = [0] * len(df_temp); current_id = 0
+    for i in range(1, len(df_temp)):
+        if devem_agrupar(df_temp.iloc[i-1], df_temp.iloc[i]): group_ids[i] = current_id
+        else: current_id += 1; group_ids[i] = current_id
+    df_temp['CLUSTER_ID'] = group_ids
+    agg_dict = {col: 'first' for col in df_temp.columns if col not in ['CLUSTER_ID', col_seq, col_end, 'tmp_num', 'tmp_nome', 'tmp_lat', 'tmp_lon']}
+    agg_dict[col_end] = escolher_melhor_endereco
+    def unir_seqs(x):
+        vals = sorted(list(set(x.astype(str))));
+        try: vals.sort(key=int)
+        except: pass
+        return ', '.join(vals)
+    df_final = df_temp.groupby('CLUSTER_ID').agg({**agg_dict, col_seq: unir_seqs}).reset_index()
+    cols_drop = [c for c in ['CLUSTER_ID', 'tmp_num', 'tmp_nome', 'tmp_lat', 'tmp_lon'] if c in df_final.columns]
+    df_final = df_final.drop(columns=cols_drop)
+    try:
+        df_final['SortKey'] = df_final[col_seq].apply(lambda x: int(str(x).split(',')[0]))
+        return df_final.sort_values('SortKey').drop(columns=['SortKey'])
+    except Exception:
+        return df_final
+
+
+@functools.lru_cache(maxsize=None)
+def _romaneio():
+    return pd.read_excel(ROMANEIO)
+
+
+def planilha_circuit(n_linhas=3000, com_gps=True, semente=7):
+    """Planilha no layout do Circuit a partir do romaneio de exemplo, com GPS sintético.
+
+    Endereços repetidos ganham coordenadas a poucos metros (casadinhas) ou a
+    dezenas de metros (mesmo número, outro ponto), e parte das linhas fica sem GPS.
+    """
+    rng = np.random.default_rng(semente)
+    df = _romaneio().head(n_linhas).copy()
+    df['Sequence'] = np.arange(1, len(df) + 1)
+    if com_gps:
+        base = {end: (-3.73 + rng.uniform(-0.1, 0.1), -38.52 + rng.uniform(-0.1, 0.1)) for end in df['Address'].unique()}
+        desvio = rng.choice([0.00001, 0.00005, 0.0005], size=len(df))
+        df['Latitude'] = [base[e][0] for e in df['Address']] + desvio * rng.standard_normal(len(df))
+        df['Longitude'] = [base[e][1] for e in df['Address']] + desvio * rng.standard_normal(len(df))
+        df.loc[rng.random(len(df)) < 0.05, 'Latitude'] = np.nan
+    return df
+
+
+def test_agrupamento_vetorizado_identico_ao_antigo():
+    for com_gps in (True, False):
+        df = planilha_circuit(com_gps=com_gps)
+        esperado = gerar_planilha_antiga(df)
+        resultado = gerar_planilha_otimizada_circuit_pro(df)
+        pd.testing.assert_frame_equal(resultado, esperado)
+        assert len(resultado) < len(df)
+
+
+def test_sem_colunas_necessarias():
+    assert gerar_planilha_otimizada_circuit_pro(pd.DataFrame({'Address': ['Rua A, 1']})) is None
+
+
+def test_modo_espacial_une_casadinhas_nao_adjacentes():
+    df = pd.DataFrame({
+        'Sequence': [1, 2, 3],
+        'Address': ['Rua Alfa, 100', 'Rua Beta, 100', 'Rua Gama, 100'],
+        'Latitude': [-3.730000, -3.740000, -3.730030],
+        'Longitude': [-38.520000, -38.530000, -38.520010],
+    })
+    adjacente = gerar_planilha_otimizada_circuit_pro(df)
+    espacial = gerar_planilha_otimizada_circuit_pro(df, modo='espacial')
+    assert len(adjacente) == 3
+    assert espacial['Sequence'].tolist() == ['1, 3', '2']
+    assert espacial.attrs['casadinhas'] == {'modo': 'espacial', 'clusters_adjacentes': 3, 'fusoes_extras': 1}
+
+
+def test_modo_espacial_nunca_desfaz_agrupamentos_adjacentes():
+    df = planilha_circuit()
+    adjacente = gerar_planilha_otimizada_circuit_pro(df)
+    espacial = gerar_planilha_otimizada_circuit_pro(df, modo='espacial')
+    assert len(espacial) <= len(adjacente)
+    assert espacial.attrs['casadinhas']['fusoes_extras'] == len(adjacente) - len(espacial)
+
+    sem_gps = planilha_circuit(com_gps=False)
+    pd.testing.assert_frame_equal(
+        gerar_planilha_otimizada_circuit_pro(sem_gps, modo='espacial').reset_index(drop=True),
+        gerar_planilha_otimizada_circuit_pro(sem_gps).reset_index(drop=True))
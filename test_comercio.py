@@ -0,0 +1,60 @@
+import os
+import unicodedata
+
+import pandas as pd
+import pytest
+
+from filtro_rotas.comercio import (
+    COMERCIO, RESIDENCIAL, TERMOS_ANULADORES, TERMOS_COMERCIAIS, classificar_comercio_serie,
+    identificar_comercio,
+)
+
+ROMANEIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PM 31_01 ROMANEIO.xlsx')
+
+
+# Classificador antigo (palavra x termo), usado como gabarito
+def remover_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn').upper()
+
+def identificar_comercio_antigo(endereco: str) -> str:
+    end_limpo = remover_acentos(endereco)
+    for parte in end_limpo.split(','):
+        palavras = parte.split()
+        for i, palavra in enumerate(palavras):
+            p_limpa = "".join(filter(str.isalnum, palavra))
+            if any(termo == p_limpa for termo in TERMOS_COMERCIAIS):
+                if not any(anul in " ".join(palavras[:i]) for anul in TERMOS_ANULADORES):
+                    return "🏪 Comércio"
+    return "🏠 Residencial"
+
+
+CASOS = [
+    ("Rua A, 10, Loja 2", COMERCIO),
+    ("Rua A, 10, em frente à Farmácia", RESIDENCIAL),
+    ("Rua A, 10, ao lado da padaria, Sala 3", COMERCIO),
+    ("Rua A, 10, prox. mercadinho", RESIDENCIAL),
+    ("Rua A, 10, próximo ao Posto", RESIDENCIAL),
+    ("Rua Salgado Filho, 10", RESIDENCIAL),
+    ("Av. Frei Cirilo, 3480 - Mercado (L.T.D.A.)", COMERCIO),
+    ("Rua Vidraçaria, 1", RESIDENCIAL),
+    ("Rua B, 5, depois do (hotel) azul", RESIDENCIAL),
+    ("Rua C, 5, casa, MEI", COMERCIO),
+    (float('nan'), RESIDENCIAL),
+]
+
+
+@pytest.mark.parametrize("endereco,esperado", CASOS)
+def test_casos_conhecidos(endereco, esperado):
+    assert identificar_comercio_antigo(endereco) == esperado
+    assert identificar_comercio(endereco) == esperado
+
+
+def test_gabarito_romaneio_de_exemplo():
+    df = pd.read_excel(ROMANEIO, header=None)
+    enderecos = df[3]
+    gabarito = enderecos.apply(identificar_comercio_antigo)
+    resultado = classificar_comercio_serie(enderecos)
+    divergentes = enderecos[gabarito != resultado]
+    assert divergentes.empty, divergentes.head().tolist()
+    assert resultado.index.equals(enderecos.index)
+    assert (gabarito == COMERCIO).sum() > 0
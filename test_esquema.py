@@ -0,0 +1,50 @@
+import pandas as pd
+
+from filtro_rotas.esquema import CACHE_ESQUEMAS, Esquema, coluna_endereco_por_tamanho, inferir_esquema
+
+
+def test_layout_do_romaneio_sem_header():
+    df = pd.DataFrame([
+        ['Letra', 'Sequence', 'Total Distance', 'Address', 'Neighborhood', 'Stop'],
+        ['A-36', 1, '50.198km', 'Rua Antônio Pontes, 1157', 'Cajazeiras', 1],
+    ])
+    assert inferir_esquema(df) == Esquema(gaiola=0, gaiola_radar=0, sequencia=1, endereco=3, bairro=4, parada=5, linha_cabecalho=0)
+
+
+def test_titulo_acima_do_cabecalho_e_rotulos_do_circuit():
+    df = pd.DataFrame([['Romaneio da rota', None, None], ['Gaiola', 'Endereço', 'Bairro'], ['A-1', 'Rua A, 1', 'Centro']])
+    assert inferir_esquema(df) == Esquema(gaiola=0, gaiola_radar=0, endereco=1, bairro=2, linha_cabecalho=1)
+    circuit = pd.DataFrame({'Sequence': [1], 'Address': ['Rua A, 1'], 'Latitude': [-3.7], 'Longitude': [-38.5]})
+    esquema = inferir_esquema(circuit)
+    assert (esquema.sequencia, esquema.endereco, esquema.latitude, esquema.longitude) == ('Sequence', 'Address', 'Latitude', 'Longitude')
+    assert esquema.linha_cabecalho == -1
+
+
+def test_mesmo_cabecalho_reaproveita_a_inferencia():
+    CACHE_ESQUEMAS.limpar()
+    df = pd.DataFrame([['Gaiola', 'Endereço'], ['A-1', 'Rua A, 1']])
+    inferir_esquema(df)
+    inferir_esquema(df.copy())
+    assert CACHE_ESQUEMAS.acertos >= 1 and len(CACHE_ESQUEMAS) == 1
+
+
+def test_sem_cabecalho():
+    df = pd.DataFrame([['A-1', 'Av. Central, 1000 - Apto 12', 3]])
+    assert inferir_esquema(df) == Esquema()
+    assert coluna_endereco_por_tamanho(df) == 1
+
+
+def test_linhas_de_dados_com_rua_nao_viram_cabecalho():
+    # Cada linha de dados tem mais termos curtos ('ROTA', 'RUA', 'LAT') que o cabeçalho
+    df = pd.DataFrame([
+        ['Letra', 'Endereço', 'Bairro', 'Complemento'],
+        ['ROTA 2', 'Rua das Flores, 10', 'Platô', 'Rua lateral'],
+        ['ROTA 3', 'Rua Nova, 5', 'Platô', 'Rua de trás'],
+    ])
+    assert inferir_esquema(df) == Esquema(gaiola=0, gaiola_radar=0, endereco=1, bairro=2, linha_cabecalho=0)
+
+
+def test_lpn_e_a_gaiola_do_radar():
+    df = pd.DataFrame([['LPN', 'Gaiola', 'Endereço', 'Bairro'], ['BR123', 'A-1', 'Rua A, 1', 'Centro']])
+    esquema = inferir_esquema(df)
+    assert (esquema.gaiola, esquema.gaiola_radar) == (1, 0)
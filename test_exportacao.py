@@ -0,0 +1,66 @@
+import gzip
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from filtro_rotas import exportacao
+
+
+def test_planilha_igual_ao_to_excel():
+    df = pd.DataFrame({'Parada': ['1', '2', '3'], 'Lat': [-3.7, np.nan, -3.8], 'Endereco': ['Rua A, 1', None, 'Rua Ç, 3']})
+    lida = pd.read_excel(io.BytesIO(exportacao.planilha_excel(df)), dtype=str)
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine='openpyxl') as w:
+        df.to_excel(w, index=False)
+    assert lida.equals(pd.read_excel(buf, dtype=str))
+
+
+def test_zip_usa_cache_por_gaiola():
+    exportacao.CACHE_PLANILHAS.limpar()
+    chamadas = []
+
+    def montar(g):
+        chamadas.append(g)
+        return None if g == 'Z-9' else pd.DataFrame({'Gaiola': [g] * 3, 'Parada': ['1', '2', '2']})
+
+    z = exportacao.gerar_zip_gaiolas('h1', ['A-1', 'B/2', 'Z-9'], montar, max_workers=2)
+    assert (z.arquivos, z.em_cache, z.ausentes) == (2, 0, ['Z-9'])
+    nomes = zipfile.ZipFile(io.BytesIO(z.dados)).namelist()
+    assert sorted(nomes) == ['Rota_A-1.xlsx', 'Rota_B_2.xlsx']
+
+    z = exportacao.gerar_zip_gaiolas('h1', ['A-1', 'B/2'], montar)
+    assert (z.arquivos, z.em_cache) == (2, 2)
+    assert chamadas == ['A-1', 'B/2', 'Z-9']
+
+    # Outro romaneio usa o mesmo pool de processos em vez de criar um por clique
+    pool = exportacao._POOL
+    exportacao.gerar_zip_gaiolas('h2', ['A-1', 'B/2'], montar, max_workers=2)
+    assert pool is not None and exportacao._POOL is pool
+
+
+def test_formatos_em_blocos(monkeypatch):
+    monkeypatch.setattr(exportacao, 'LINHAS_BLOCO', 2)
+    df = pd.DataFrame({'Parada': ['1', '2', '2'], 'Gaiola': ['A-1'] * 3, 'Tipo': ['Casa', None, 'Loja'],
+                       'Endereco_Completo': ['Rua A, 1', 'Rua B, 2', 'Rua B, 2']})
+    csv = b''.join(exportacao.partes_csv(df))
+    lido = pd.read_csv(io.BytesIO(csv))
+    assert list(lido.columns) == ['Address', 'Notes']
+    assert lido['Address'].tolist() == df['Endereco_Completo'].tolist()
+    assert lido['Notes'][1] == 'Parada: 2 · Gaiola: A-1'
+    assert gzip.decompress(b''.join(exportacao.partes_gzip(exportacao.partes_csv(df)))) == csv
+    # Coluna de tipos misturados vira texto; um row group por bloco
+    df['Seq'] = pd.Series([1, 'x', None], dtype=object)
+    arquivo = pq.ParquetFile(io.BytesIO(b''.join(exportacao.partes_parquet(df))))
+    assert arquivo.num_row_groups == 2
+    assert arquivo.read().column('Seq').to_pylist() == ['1', 'x', None]
+
+
+def test_resultado_expirado_nao_fica_lembrado():
+    chave = ('circuit', 'expirado', 'adjacente')
+    assert exportacao.exportar(chave, 'csv', lambda: None) is None
+    df = pd.DataFrame({'Parada': ['1'], 'Endereco_Completo': ['Rua A, 5']})
+    arquivo = exportacao.exportar(chave, 'csv', lambda: df)
+    assert arquivo is not None and arquivo.linhas == 1
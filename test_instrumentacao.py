@@ -0,0 +1,46 @@
+import logging
+
+import pytest
+
+from filtro_rotas import Manifesto
+from filtro_rotas.instrumentacao import coletar, etapa, tabela_medicoes
+from filtro_rotas.rota import processar_rota_gaiola
+
+
+def test_etapas_coletadas_com_linhas_e_aninhamento(romaneio):
+    manifesto = Manifesto.de_bytes(romaneio(['A-1' if i % 2 else 'B-2' for i in range(30)]))
+    with coletar() as coletor:
+        processar_rota_gaiola(manifesto, 'A-1')
+    etapas = {m.etapa: m for m in coletor.medicoes}
+    assert [m.etapa for m in coletor.medicoes] == ['rota_gaiola', 'filtro_gaiola', 'classificacao']
+    assert etapas['rota_gaiola'].nivel == 0 and etapas['classificacao'].nivel == 1
+    assert etapas['rota_gaiola'].linhas == 15
+    assert etapas['rota_gaiola'].detalhes == {'gaiola': 'A-1'}
+    assert all(m.segundos >= 0 for m in coletor.medicoes)
+    assert len(tabela_medicoes(coletor.medicoes)) == 3
+
+
+def test_sem_coletor_nada_e_medido():
+    with etapa('qualquer', linhas=10) as medicao:
+        pass
+    assert medicao.segundos == 0.0 and medicao.rss_mb is None
+
+
+def test_logger_do_app_em_info_nao_liga_a_medicao():
+    # O app põe "filtro_rotas" em INFO; as etapas têm nível próprio
+    app = logging.getLogger("filtro_rotas")
+    nivel = app.level
+    app.setLevel(logging.INFO)
+    try:
+        with etapa('qualquer') as medicao:
+            pass
+    finally:
+        app.setLevel(nivel)
+    assert medicao.segundos == 0.0 and medicao.rss_mb is None
+
+
+def test_erro_fica_registrado():
+    with coletar() as coletor, pytest.raises(ValueError):
+        with etapa('falha'):
+            raise ValueError
+    assert coletor.medicoes[0].erro == 'ValueError'
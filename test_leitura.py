@@ -0,0 +1,72 @@
+import datetime
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+from filtro_rotas.leitura import ler_abas_projetadas
+from filtro_rotas.manifesto import ler_abas_excel
+
+
+def _bytes(wb) -> bytes:
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _romaneio_misto() -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Romaneio'
+    ws.append(['Obs', 'Gaiola', 'Seq', 'Endereço', 'Bairro', 'Valor'])
+    ws.append(['x', 'A-1', 1, 'Rua A, 10', 'Centro', 1.5])
+    ws.append([None, 'A-2', 2.0, '=CONCAT("Rua ","B")', '#N/A', True])
+    ws.append([None] * 6)
+    ws.append(['y', 'A-3', 3, 'Rua_x000D_ C, 5', 'NA', None])
+    ws['B6'], ws['C6'] = 'B-1', 1e20
+    ws['D6'] = CellRichText('Rua ', TextBlock(InlineFont(b=True), 'Rica'), ', 9')
+    ws['B8'], ws['D8'], ws['E8'] = 'C-1', 'Rua X, 1', '  '
+    sem_cabecalho = wb.create_sheet('SemCabecalho')
+    sem_cabecalho.append(['A-1', 'Rua Z, 1', 3])
+    sem_cabecalho.append(['A-2', 'Rua Y, 2', 4.25])
+    wb.create_sheet('Vazia')
+    return _bytes(wb)
+
+
+def _iguais_ao_leitor_completo(arquivo: bytes) -> dict:
+    completo, projetado = ler_abas_excel(arquivo), ler_abas_projetadas(arquivo)
+    assert list(projetado) == list(completo)
+    for aba, df in projetado.items():
+        assert len(df) == len(completo[aba])
+        for col in df.columns:
+            assert df[col].astype(object).equals(completo[aba][col].astype(object)), (aba, col)
+    return projetado
+
+
+def test_colunas_mantidas_iguais_ao_leitor_completo():
+    projetado = _iguais_ao_leitor_completo(_romaneio_misto())
+    assert list(projetado['Romaneio'].columns) == [1, 3, 4]
+    assert list(projetado['SemCabecalho'].columns) == [0, 1, 2]
+    assert projetado['Vazia'].empty
+    assert isinstance(projetado['Romaneio'][1].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize('epoca', [CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904])
+def test_datas_iguais_ao_leitor_completo(epoca):
+    wb = openpyxl.Workbook()
+    wb.epoch = epoca
+    ws = wb.active
+    ws.append(['Gaiola', 'Endereço', 'Bairro', 'Entrega'])
+    ws.append([datetime.date(2024, 1, 2), 'Rua A, 1', 'Centro', datetime.datetime(2024, 1, 2, 8, 30)])
+    ws.append(['A-2', 'Rua B, 2', datetime.datetime(2024, 3, 4), datetime.time(9, 15)])
+    ws['A5'], ws['B5'], ws['C5'] = 'A-3', 'Rua C, 3', '#N/A'
+    ws['A6'], ws['B6'], ws['C6'] = 'A-4', 'Rua D, 4', datetime.timedelta(hours=30)
+    ws['C6'].number_format = '[h]:mm:ss'
+    projetado = _iguais_ao_leitor_completo(_bytes(wb))
+    assert list(projetado['Sheet'].columns) == [0, 1, 2]
+    assert projetado['Sheet'][0].iloc[1] == datetime.datetime(2024, 1, 2)
+
@@ -0,0 +1,49 @@
+from filtro_rotas import Manifesto
+from filtro_rotas.comercio import COMERCIO, identificar_comercio
+from filtro_rotas.lote import resumir_gaiolas, tabela_resumo
+from filtro_rotas.normalizacao import extrair_base_endereco
+
+
+GAIOLAS = [['A-1', 'B-2', 'C-10'][i % 3] for i in range(60)]
+
+
+def _endereco(i: int) -> str:
+    return f"Rua {'Padaria' if i % 7 == 0 else 'Central'} {i % 5}, {i % 4}"
+
+
+def test_resumo_em_lote_bate_com_contagem_por_gaiola(romaneio):
+    manifesto = Manifesto.de_bytes(romaneio(GAIOLAS, _endereco))
+    resumo = resumir_gaiolas(manifesto)
+    df = manifesto.abas[next(iter(manifesto.abas))].iloc[1:]
+    assert set(resumo) == {'A-1', 'B-2', 'C-10'}
+    for g, v in resumo.items():
+        enderecos = df.loc[df[0] == g, 2]
+        assert v == {
+            'pacotes': len(enderecos),
+            'paradas': enderecos.map(extrair_base_endereco).nunique(),
+            'comercios': int((enderecos.map(identificar_comercio) == COMERCIO).sum()),
+            'encontrado': True,
+        }
+
+
+def test_gaiola_ausente(romaneio):
+    manifesto = Manifesto.de_bytes(romaneio(GAIOLAS, _endereco))
+    resumo = resumir_gaiolas(manifesto, ['a1', 'Z-9'])
+    assert resumo['a1']['pacotes'] == 20
+    assert resumo['Z-9'] == {'pacotes': 0, 'paradas': 0, 'comercios': 0, 'encontrado': False}
+    assert tabela_resumo(resumo)['Status'].tolist() == ['✅', '❌']
+
+
+def test_resumos_e_rotas_compartilhados_por_hash(romaneio):
+    from filtro_rotas.lote import CACHE_RESUMOS
+    from filtro_rotas.rota import processar_rota_gaiola
+
+    conteudo = romaneio(GAIOLAS, _endereco)
+    CACHE_RESUMOS.limpar()
+    primeiro = resumir_gaiolas(Manifesto.de_bytes(conteudo), ['A-1'])
+    acertos = CACHE_RESUMOS.acertos
+    # Outra "sessão" com o mesmo arquivo: mesmo hash, resumo e rota reaproveitados
+    outro = Manifesto.de_bytes(conteudo)
+    assert resumir_gaiolas(outro, ['a1', 'B-2'])['a1'] == primeiro['A-1']
+    assert CACHE_RESUMOS.acertos == acertos + 1
+    assert processar_rota_gaiola(outro, 'A-1') is processar_rota_gaiola(Manifesto.de_bytes(conteudo), 'a1')
@@ -0,0 +1,39 @@
+import json
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from filtro_rotas import lote_arquivos
+from filtro_rotas.rota import ErroProcessamento, processar_gaiola_unica
+
+
+def _endereco(i: int) -> str:
+    return f'Rua {i % 2}, {i}'
+
+
+def test_cli_gera_uma_planilha_por_gaiola(tmp_path, capsys, romaneio):
+    entrada = tmp_path / 'romaneios'
+    entrada.mkdir()
+    romaneio(['A-1', 'A-1', 'B-2'], _endereco, caminho=entrada / 'dia1.xlsx')
+    romaneio(['B-2', 'C-3'], _endereco, caminho=entrada / 'dia2.xlsx')
+    codigo = lote_arquivos.main([str(entrada), '--saida', str(tmp_path / 'saida'),
+                                 '--gaiolas', 'a-1', 'B-2', '--processos', '1', '--json'])
+    assert codigo == 0
+    resumo = json.loads(capsys.readouterr().out)
+    assert [(r['planilhas'], r['pacotes'], r['ausentes']) for r in resumo['arquivos']] == [(2, 3, []), (1, 1, ['A-1'])]
+    rota = pd.read_excel(tmp_path / 'saida' / 'dia1' / 'Rota_A-1.xlsx')
+    assert rota['Parada'].tolist() == [1, 2]
+
+
+def test_erro_vira_excecao_do_pacote():
+    df = pd.DataFrame({0: ['Gaiola', 'A-1'], 1: ['Endereço', 'Rua A, 1']})
+    with pytest.raises(ErroProcessamento):
+        processar_gaiola_unica(df, 'A-1', 99)
+
+
+def test_pacote_nao_importa_streamlit():
+    codigo = ("import sys, filtro_rotas, filtro_rotas.rota, filtro_rotas.radar, filtro_rotas.circuit, "
+              "filtro_rotas.lote_arquivos; assert 'streamlit' not in sys.modules")
+    subprocess.run([sys.executable, '-c', codigo], check=True)
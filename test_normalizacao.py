@@ -0,0 +1,65 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from filtro_rotas import normalizacao
+
+
+# Implementações antigas (por célula), usadas como referência
+def limpar_string(s) -> str:
+    return "".join(filter(str.isalnum, str(s))).upper()
+
+def remover_acentos(texto) -> str:
+    return "".join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn').upper()
+
+def extrair_base_endereco(endereco_completo) -> str:
+    partes = str(endereco_completo).split(',')
+    base = partes[0].strip() + " " + partes[1].strip() if len(partes) >= 2 else partes[0].strip()
+    return limpar_string(base)
+
+def extrair_numero_correto(endereco):
+    if not isinstance(endereco, str): return "SN"
+    partes = endereco.split(',')
+    if len(partes) >= 2:
+        match = re.search(r'(\d+)', partes[1].strip())
+        if match: return match.group(1)
+    todos_numeros = re.findall(r'(\d+)', endereco)
+    return todos_numeros[0] if todos_numeros else "SN"
+
+def normalizar_nome_rua(endereco):
+    if not isinstance(endereco, str): return ""
+    return limpar_string(remover_acentos(endereco.split(',')[0]))
+
+
+AMOSTRA = pd.Series([
+    'Rua São João, nº 12, ap ３', 'Av. Bezerra de Menezes,, 5', ',7', 'sem número',
+    'ß straße,  ٣٤', 'Travessa Ǆ ǰ, 10 - Fundos', 'x\ny, 3\n4', 'a_b-c', 'B-50', 'b 50',
+    np.nan, None, 1, 1.0, True, 12.5, '',
+], dtype=object)
+
+
+def test_versoes_vetorizadas_identicas_as_antigas():
+    pares = [
+        (normalizacao.limpar_serie, limpar_string),
+        (normalizacao.remover_acentos_serie, remover_acentos),
+        (normalizacao.extrair_base_endereco_serie, extrair_base_endereco),
+        (normalizacao.extrair_numero_serie, extrair_numero_correto),
+        (normalizacao.normalizar_nome_rua_serie, normalizar_nome_rua),
+    ]
+    for vetorizada, antiga in pares:
+        assert vetorizada(AMOSTRA).tolist() == AMOSTRA.apply(antiga).tolist(), vetorizada.__name__
+
+
+def test_versoes_escalares_identicas_as_antigas():
+    for valor in AMOSTRA:
+        assert normalizacao.limpar_string(valor) == limpar_string(valor)
+        assert normalizacao.remover_acentos(valor) == remover_acentos(valor)
+        assert normalizacao.extrair_numero_correto(valor) == extrair_numero_correto(valor)
+
+
+def test_preserva_indice_e_serie_vazia():
+    serie = pd.Series(['B-50', 'A-36'], index=[10, 20])
+    assert normalizacao.limpar_serie(serie).index.tolist() == [10, 20]
+    assert normalizacao.limpar_serie(pd.Series([], dtype=object)).empty
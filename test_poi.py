@@ -0,0 +1,177 @@
+import json
+
+import numpy as np
+import pytest
+
+from filtro_rotas import poi
+from filtro_rotas.geo import distancia_metros
+from filtro_rotas.poi import (BORRACHARIA, CACHE_TILES, PIT_STOP, POSTO, SOS, IndicePOIs, TileIndisponivel, aquecer_tiles,
+                              buscar_pois, categorias_osm, falhou_ha_pouco, ler_registros, mascara, obter_tile, tile_de,
+                              tile_em_cache, tiles_da_rota)
+
+
+def _indice_aleatorio(n=3000, semente=0):
+    rng = np.random.default_rng(semente)
+    lat = -3.75 + rng.uniform(-0.15, 0.15, n)
+    lon = -38.55 + rng.uniform(-0.15, 0.15, n)
+    # Máscaras de 1 a 63: parte dos pontos está em mais de uma categoria
+    return IndicePOIs(lat, lon, rng.integers(1, 64, n), np.array([f"P{i}" for i in range(n)]))
+
+
+def test_categorias_como_nas_consultas_do_overpass():
+    assert categorias_osm({'amenity': 'fuel', 'name': 'Shell'}) == mascara([POSTO])
+    assert categorias_osm({'shop': 'tyres'}) & mascara(SOS)
+    assert categorias_osm({'name': 'Reboque do Zé'}) & mascara(SOS)
+    assert categorias_osm({'amenity': 'cafe'}) & mascara(PIT_STOP)
+    assert categorias_osm({'amenity': 'bank'}) is None
+    # Posto com borracharia fica nos dois
+    assert categorias_osm({'name': 'Auto Posto e Borracharia'}) == mascara([POSTO, BORRACHARIA])
+    assert categorias_osm({'amenity': 'fuel', 'shop': 'tyres'}) == mascara([POSTO, BORRACHARIA])
+
+
+def _forca_bruta(indice, lat, lon, k, categorias=None, raio_m=poi.RAIO_MAX_M):
+    """Os k POIs mais próximos comparando a distância a todos os pontos do índice."""
+    dist = distancia_metros(lat, lon, indice.lat, indice.lon)
+    aceitos = dist <= raio_m
+    if categorias is not None:
+        aceitos &= (indice.categorias & mascara(categorias)) != 0
+    idx = np.flatnonzero(aceitos)
+    idx = idx[np.argsort(dist[idx], kind='stable')][:k]
+    return [poi._local(indice, int(i), float(dist[i]), categorias) for i in idx]
+
+
+def test_no_raio_igual_a_forca_bruta():
+    indice = _indice_aleatorio()
+    for lat, lon in [(-3.75, -38.55), (-3.62, -38.41), (-3.0, -38.0)]:
+        for raio in (800, 5000, 12000):
+            dist = distancia_metros(lat, lon, indice.lat, indice.lon)
+            assert sorted(indice.no_raio(lat, lon, raio).tolist()) == np.flatnonzero(dist <= raio).tolist()
+    assert len(indice.no_raio(-3.0, -38.0, 1000)) == 0
+
+
+def test_importa_geojson_e_salva(tmp_path):
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'amenity': 'fuel', 'name': 'Posto A'},
+         'geometry': {'type': 'Point', 'coordinates': [-38.5, -3.7]}},
+        {'type': 'Feature', 'properties': {'shop': 'car_repair', 'name': 'Oficina B'},
+         'geometry': {'type': 'Polygon', 'coordinates': [[[-38.51, -3.71], [-38.51, -3.72], [-38.52, -3.72]]]}},
+        {'type': 'Feature', 'properties': {'amenity': 'bank'},
+         'geometry': {'type': 'Point', 'coordinates': [-38.5, -3.7]}},
+    ]}
+    entrada = tmp_path / 'ceara.geojson'
+    entrada.write_text(json.dumps(geojson), encoding='utf-8')
+    indice = IndicePOIs.de_registros(list(ler_registros(str(entrada))) * 2)
+    assert len(indice) == 2
+    indice.salvar(str(tmp_path / 'pois.npz'))
+    carregado = IndicePOIs.carregar(str(tmp_path / 'pois.npz'))
+    assert list(carregado.registros()) == list(indice.registros())
+    assert buscar_pois(-3.7, -38.5, poi.FonteLocal(carregado), k=1)[0]['nome'] == 'Posto A'
+    CACHE_TILES.limpar()
+
+
+class _FonteContada:
+    chave = ('teste',)
+
+    def __init__(self, indice):
+        self.indice, self.chamadas = indice, 0
+
+    def registros(self, lat, lon, raio_m):
+        self.chamadas += 1
+        idx = self.indice.no_raio(lat, lon, raio_m)
+        return list(zip(self.indice.lat[idx], self.indice.lon[idx], self.indice.categorias[idx], self.indice.nomes[idx]))
+
+
+def test_tile_busca_uma_vez_e_responde_raios_menores():
+    CACHE_TILES.limpar()
+    indice = _indice_aleatorio()
+    fonte = _FonteContada(indice)
+    lat, lon = -3.751, -38.549
+    for raio, k in [(1500, 10), (3000, 10), (5000, 3), (10000, 15)]:
+        esperado = _forca_bruta(indice, lat, lon, k, SOS, raio)
+        assert buscar_pois(lat, lon, fonte, raio_m=raio, k=k, categorias=SOS) == esperado
+    # Outro motorista no mesmo tile
+    buscar_pois(lat + 0.001, lon + 0.001, fonte, raio_m=5000)
+    assert fonte.chamadas == 1
+    CACHE_TILES.limpar()
+
+
+def test_prefetch_dos_tiles_da_rota():
+    CACHE_TILES.limpar()
+    fonte = _FonteContada(_indice_aleatorio())
+    lat = ['-3.751', -3.752, None, 0, -3.70, -3.751]
+    lon = [-38.549, -38.548, -38.5, 0, -38.50, -38.549]
+    tiles = tiles_da_rota(lat, lon)
+    assert tiles == [tile_de(-3.751, -38.549), tile_de(-3.70, -38.50)]
+    assert aquecer_tiles(fonte, tiles) == 2 and fonte.chamadas == 2
+    buscar_pois(-3.70, -38.50, fonte, k=3)
+    assert fonte.chamadas == 2
+    CACHE_TILES.limpar()
+
+
+class _FonteFora:
+    chave = ('fora',)
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def registros(self, lat, lon, raio_m):
+        self.chamadas += 1
+        raise ConnectionError("sem rede")
+
+
+def test_tile_que_falhou_nao_e_consultado_de_novo_logo_em_seguida(monkeypatch):
+    fonte, tile = _FonteFora(), tile_de(-3.75, -38.55)
+    with pytest.raises(ConnectionError):
+        obter_tile(fonte, tile)
+    with pytest.raises(TileIndisponivel):
+        obter_tile(fonte, tile)
+    assert fonte.chamadas == 1 and falhou_ha_pouco(fonte, tile) and tile_em_cache(fonte, tile) is None
+    monkeypatch.setattr(poi, 'TEMPO_FALHA_TILE_S', 0)
+    with pytest.raises(ConnectionError):
+        obter_tile(fonte, tile)
+    assert fonte.chamadas == 2
+
+
+class _FonteArea(_FonteContada):
+    chave = ('teste_area',)
+
+    def registros_area(self, sul, oeste, norte, leste):
+        self.chamadas += 1
+        i = self.indice
+        dentro = (i.lat >= sul) & (i.lat <= norte) & (i.lon >= oeste) & (i.lon <= leste)
+        return list(zip(i.lat[dentro], i.lon[dentro], i.categorias[dentro], i.nomes[dentro]))
+
+
+def test_prefetch_com_uma_consulta_por_area_da_rota():
+    CACHE_TILES.limpar()
+    indice = _indice_aleatorio()
+    fonte = _FonteArea(indice)
+    pontos = [(-3.751, -38.549), (-3.731, -38.529), (-3.70, -38.50), (-3.80, -38.60)]
+    tiles = tiles_da_rota(*zip(*pontos))
+    # Os dois primeiros tiles são vizinhos e caem na mesma área
+    assert [len(area) for area in poi.areas_de_tiles(tiles)] == [2, 1, 1]
+    assert aquecer_tiles(fonte, tiles) == 4 and fonte.chamadas == 3
+    for lat, lon in pontos:
+        assert buscar_pois(lat, lon, fonte, k=15, categorias=SOS) == _forca_bruta(indice, lat, lon, 15, SOS)
+    assert fonte.chamadas == 3
+    CACHE_TILES.limpar()
+
+
+class _FonteAreaFalha(_FonteArea):
+    chave = ('teste_area_falha',)
+
+    def registros_area(self, sul, oeste, norte, leste):
+        if sul <= -3.80 <= norte:
+            self.chamadas += 1
+            raise ConnectionError("429")
+        return super().registros_area(sul, oeste, norte, leste)
+
+
+def test_area_que_falha_marca_so_os_seus_tiles():
+    CACHE_TILES.limpar()
+    fonte = _FonteAreaFalha(_indice_aleatorio())
+    tiles = tiles_da_rota([-3.80, -3.60], [-38.60, -38.40])
+    assert aquecer_tiles(fonte, tiles) == 1 and fonte.chamadas == 2
+    assert falhou_ha_pouco(fonte, tiles[0]) and not falhou_ha_pouco(fonte, tiles[1])
+    assert tile_em_cache(fonte, tiles[1]) is not None
+    CACHE_TILES.limpar()
@@ -0,0 +1,57 @@
+import difflib
+import numpy as np
+import pandas as pd
+
+from filtro_rotas.normalizacao import limpar_string
+from filtro_rotas.radar import IndiceBairros
+
+BAIRROS = [
+    'Centro', 'CENTRO ', 'Messejana', 'Mesejana', 'Maraponga', 'Jardim Cearense', 'Jardim Cearence',
+    'Parangaba', 'Parquelândia', 'Parquelandia', 'São João do Tauape', 'Sao Joao do Tauape', 'Aldeota',
+    'Meireles', 'Mucuripe', 'Joaquim Távora', 'Antônio Bezerra', 'Dionísio Torres', 'Benfica', 'Fátima',
+    'Praia de Iracema', 'Conjunto Ceará I', 'Conjunto Ceará II', 'Vila União', 'Itaperi', 'A', '',
+    np.nan, None, 'Bom Jardim', 'Granja Lisboa', 'Granja Portugal', 'Jangurussu', 'Cajazeiras',
+]
+TERMOS = ['centro', 'mesejana', 'jardim cearense', 'parquelandia', 'sao joao', 'an', 'ju', 'fatima',
+          'conjunto ceara', 'granja', 'aldeota', 'bom jardin', 'maraponga', 'xyz', 'c', 'iracema praia']
+
+
+def _aba() -> pd.DataFrame:
+    linhas = [['Letra', 'Address', 'Bairro']]
+    for i in range(400):
+        linhas.append([f"{'ABC'[i % 3]}-{i % 11 + 1}", f"Rua {i}, {i}", BAIRROS[(i * 7) % len(BAIRROS)]])
+    return pd.DataFrame(linhas)
+
+
+def _varredura_antiga(df: pd.DataFrame, termos) -> dict:
+    """Pré-contagem do Radar antes do índice: comparação de cada bairro com cada termo via difflib."""
+    contagem = {}
+    validos = df[df[2].notna()]  # o índice não guarda bairros vazios (a varredura antiga via 'NAN')
+    aceitos = {}
+    for val in validos[2].astype(str).unique():
+        val_limpo = limpar_string(val)
+        for alvo in termos:
+            if alvo in val_limpo or (abs(len(alvo) - len(val_limpo)) <= 3
+                                     and difflib.SequenceMatcher(None, alvo, val_limpo).ratio() > 0.80):
+                aceitos[val] = alvo
+                break
+    for gaiola, bairro in zip(validos[0].astype(str), validos[2].astype(str)):
+        g_limpo = limpar_string(gaiola)
+        if bairro in aceitos and len(g_limpo) > 1 and 'GAIOLA' not in g_limpo:
+            dados = contagem.setdefault(gaiola, {'count': 0, 'bairros': set()})
+            dados['count'] += 1
+            dados['bairros'].add(aceitos[bairro])
+    return contagem
+
+
+def test_indice_aceita_os_mesmos_bairros_da_varredura_antiga():
+    df = _aba()
+    indice = IndiceBairros({'Romaneio': df})
+    termos = [limpar_string(t) for t in TERMOS]
+    assert indice.consultar(termos) == _varredura_antiga(df, termos)
+    # Um termo por vez também (a ordem dos termos decide o bairro atribuído)
+    for termo in termos:
+        assert indice.consultar([termo]) == _varredura_antiga(df, [termo]), termo
+    assert indice.consultar(list(reversed(termos))) == _varredura_antiga(df, list(reversed(termos)))
+    # O golden só vale se boa parte dos termos acha alguma coisa
+    assert sum(bool(indice.consultar([t])) for t in termos) >= 10
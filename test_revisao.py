@@ -0,0 +1,37 @@
+from filtro_rotas import Manifesto
+from filtro_rotas.lote import CACHE_RESUMOS, resumir_gaiolas
+from filtro_rotas.revisao import aproveitar_resultados, comparar_manifestos, e_revisao
+from filtro_rotas.rota import CACHE_ROTAS, processar_rota_gaiola
+
+
+GAIOLAS = [f"A-{i % 6 + 1}" for i in range(60)]
+
+
+def _corrigir(linhas):
+    linhas[1][2] = "Rua Nova, 10"          # A-1: endereço corrigido
+    linhas[2][1] = 999                      # A-2: só a sequência (coluna que não entra na rota)
+    linhas.append(['A-7', 61, "Rua Central 1, 1", 'Centro'])
+    linhas[:] = [l for l in linhas if l[0] != 'A-6']
+
+
+def test_revisao_aponta_gaiolas_afetadas_e_reaproveita_o_resto(romaneio):
+    anterior = Manifesto.de_bytes(romaneio(GAIOLAS))
+    novo = Manifesto.de_bytes(romaneio(GAIOLAS, ajuste=_corrigir))
+    # Com 6 gaiolas, trocar uma já fica abaixo do limiar (5 de 7 em comum); só corrigir linhas, não
+    assert not e_revisao(anterior, novo)
+    assert e_revisao(anterior, Manifesto.de_bytes(romaneio(GAIOLAS, ajuste=lambda linhas: linhas[1].__setitem__(2, "Rua Nova, 10"))))
+    resumir_gaiolas(anterior)
+    rota_a3 = processar_rota_gaiola(anterior, 'A-3')
+
+    dif = comparar_manifestos(anterior, novo)
+    assert dif.alteradas == ['A-1'] and dif.linhas['A-1'] == (1, 1)
+    assert dif.novas == ['A-7'] and dif.removidas == ['A-6']
+    assert dif.inalteradas == ['A-2', 'A-3', 'A-4', 'A-5']
+    assert aproveitar_resultados(dif) == 5  # 4 resumos + 1 rota
+
+    assert processar_rota_gaiola(novo, 'A-3') is rota_a3
+    assert CACHE_ROTAS.obter((novo.hash, 'A1')) is None
+    falhas = CACHE_RESUMOS.falhas
+    resumir_gaiolas(novo)
+    assert CACHE_RESUMOS.falhas == falhas + 2  # só A-1 e A-7 são recalculadas
+    assert len(dif.tabela()) == 3
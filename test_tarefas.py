@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from filtro_rotas.instrumentacao import etapa
+from filtro_rotas.tarefas import ExecutorTarefas
+
+
+def test_mesma_chave_reconecta_a_tarefa_em_andamento():
+    executor = ExecutorTarefas(max_workers=2)
+    liberar = threading.Event()
+    chamadas = []
+
+    def trabalho(tarefa):
+        chamadas.append(1)
+        tarefa.atualizar(0.5, "metade")
+        liberar.wait(5)
+        with etapa('trabalho', linhas=3):
+            return 42
+
+    t1 = executor.submeter(('x', 1), trabalho, medir=True)
+    t2 = executor.submeter(('x', 1), trabalho)
+    assert t1 is t2 and not t1.concluida
+    liberar.set()
+    assert t1.future.result(5) == 42
+    assert t1.resultado() == 42 and t1.progresso == 0.5 and t1.mensagem == "metade"
+    assert [m.etapa for m in t1.medicoes] == ['trabalho']
+    assert len(chamadas) == 1
+    # Concluída, sai do executor: pedir de novo recalcula
+    assert executor.obter(('x', 1)) is None
+    t3 = executor.submeter(('x', 1), trabalho)
+    assert t3 is not t1 and t3.future.result(5) == 42 and len(chamadas) == 2
+    executor.encerrar()
+
+
+def test_tarefa_com_erro_e_refeita():
+    executor = ExecutorTarefas(max_workers=1)
+
+    def falha(tarefa):
+        raise ValueError("ruim")
+
+    t1 = executor.submeter('k', falha)
+    with pytest.raises(ValueError):
+        t1.future.result(5)
+    assert t1.falhou
+    with pytest.raises(ValueError):
+        t1.resultado()
+    t2 = executor.submeter('k', lambda t: 'ok')
+    assert t2 is not t1 and t2.future.result(5) == 'ok'
+    executor.encerrar()
+
+
+def test_concluidas_saem_do_executor():
+    executor = ExecutorTarefas(max_workers=1)
+    tarefas = [executor.submeter(i, lambda t, i=i: i) for i in range(4)]
+    assert [t.future.result(5) for t in tarefas] == [0, 1, 2, 3]
+    assert all(executor.obter(i) is None for i in range(4)) and executor.em_andamento == 0
+    executor.encerrar()
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from filtro_rotas.visualizacao import CACHE_TABELAS, TabelaPaginada, tabela_paginada
+
+
+def _rota():
+    return pd.DataFrame({
+        'Parada': [str(i // 2 + 1) for i in range(7)],
+        'Gaiola': ['A-1'] * 7,
+        'Tipo': ['🏠 Residencial', '🏪 Comércio'] * 3 + ['🏠 Residencial'],
+        'Endereco_Completo': ['Rua São João, 1', 'Rua Sao Joao, 1', 'Av. Beira Mar, 2', 'Av. Beira Mar, 2',
+                              'Rua Ceará, 3', 'Rua Ceara, 3', 'Travessa B, 4'],
+    })
+
+
+def test_pagina_tem_no_maximo_as_linhas_pedidas():
+    tabela = TabelaPaginada(_rota())
+    pagina = tabela.pagina(1, linhas=3)
+    assert (pagina.paginas, pagina.tabela.num_rows) == (3, 3)
+    assert pagina.tabela.column('Endereco_Completo').to_pylist()[0] == 'Av. Beira Mar, 2'
+    # Página que não existe cai na última
+    assert tabela.pagina(9, linhas=3).numero == 2
+
+
+def test_busca_sem_acento_e_filtros_no_servidor():
+    tabela = TabelaPaginada(_rota())
+    assert tabela.filtrar('sao joão').tolist() == [0, 1]
+    assert tabela.filtrar('rua', tipos=['🏪 Comércio']).tolist() == [1, 5]
+    assert tabela.filtrar(parada='2').tolist() == [2, 3]
+    assert tabela.tipos == ['🏠 Residencial', '🏪 Comércio']
+
+
+def test_resultado_ausente_nao_fica_no_cache():
+    chave = ('teste', 'ausente')
+    assert tabela_paginada(chave, lambda: None) is None
+    assert chave not in CACHE_TABELAS
+    assert len(tabela_paginada(chave, _rota)) == 7
+    CACHE_TABELAS.descartar(chave)